@@ -1,138 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from typing import AsyncIterator, List, Tuple
+import asyncio
 
 from models.user import User
 from models.paper import Paper
 from models.analysis import Analysis
-from schemas.analysis import AnalysisCreate, AnalysisResponse
+from models.job import AIJob
+from schemas.analysis import AnalysisCreate, AnalysisResponse, AIJobResponse
 from schemas.common import BackgroundTaskResponse
-from utils.auth import get_current_user, get_db
-from services.ai_service import (
-    generate_summaries,
-    extract_insights,
-    generate_literature_review
-)
-from database import SessionLocal
+from utils.auth import get_current_user, get_db, get_read_db
+from utils.aggregates import join_blob, paper_text
+from services.ai_jobs import submit_job
+from services.ai_stream import get_stream, format_sse
+from database import AsyncSessionLocal
 
 router = APIRouter(prefix="/api/ai-tools", tags=["AI Tools"])
 
 
+async def _requested_papers(db: AsyncSession, user_id: int, paper_ids: List[int]) -> Tuple[List[Paper], bool]:
+    # Jobs read paper text from the chunk index; here it is only checked
+    # for presence, in SQL, so the full text is never loaded.
+    has_text = or_(
+        and_(paper_text().isnot(None), paper_text() != ""),
+        and_(Paper.abstract.isnot(None), Paper.abstract != "")
+    )
+    stmt = join_blob(select(Paper, has_text.label("has_text")).options(defer(Paper.extracted_text)))
+    result = await db.execute(stmt.where(
+        Paper.id.in_(paper_ids),
+        Paper.owner_id == user_id
+    ))
+    rows = result.all()
+    return [row.Paper for row in rows], any(row.has_text for row in rows)
+
+
+async def _job_events(job_id: int) -> AsyncIterator[str]:
+    # Live output when the job runs in this process; otherwise wait for
+    # it to finish and send the stored result in one piece.
+    while True:
+        stream = get_stream(job_id)
+        if stream is not None:
+            async for event, data in stream.events():
+                yield format_sse(event, data)
+            return
+
+        async with AsyncSessionLocal() as db:
+            job = await db.get(AIJob, job_id)
+            if job is None:
+                # Deleted (e.g. with its user) while the client was waiting.
+                yield format_sse("error", {"status": "failed", "error": "Job not found"})
+                return
+            if job.status == "failed":
+                yield format_sse("error", {"status": "failed", "error": job.error})
+                return
+            if job.status == "completed":
+                analysis = await db.get(Analysis, job.analysis_id) if job.analysis_id else None
+                if analysis:
+                    yield format_sse("token", {"text": analysis.content})
+                yield format_sse("done", {"status": "completed", "analysis_id": job.analysis_id})
+                return
+        await asyncio.sleep(1.0)
+
+
+def _event_stream(job_id: int) -> StreamingResponse:
+    return StreamingResponse(
+        _job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/summaries", response_model=BackgroundTaskResponse)
 async def create_summaries(
     analysis_data: AnalysisCreate,
-    background_tasks: BackgroundTasks,
+    stream: bool = Query(False, description="Stream the model output as Server-Sent Events"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    papers = db.query(Paper).filter(
-        Paper.id.in_(analysis_data.paper_ids),
-        Paper.owner_id == current_user.id
-    ).all()
+    papers, has_text = await _requested_papers(db, current_user.id, analysis_data.paper_ids)
 
     if not papers:
         raise HTTPException(status_code=404, detail="No valid papers found")
 
-    texts = [p.extracted_text or p.abstract for p in papers if p.extracted_text or p.abstract]
-
-    if not texts:
+    if not has_text:
         raise HTTPException(status_code=400, detail="Papers have no text content")
 
-    def generate_and_save(paper_ids, user_id, titles, texts):
-        db_session = SessionLocal()
-        try:
-            summary = generate_summaries(texts, titles)
-
-            db_analysis = Analysis(
-                analysis_type="summary",
-                title=f"Summary of {len(paper_ids)} papers",
-                content=summary,
-                analysis_metadata={  
-                    "paper_ids": paper_ids,
-                    "paper_titles": titles
-                },
-                user_id=user_id
-            )
-
-            db_session.add(db_analysis)
-            db_session.commit()
-
-        except Exception as e:
-            print(f"Error generating summary: {e}")
-            db_session.rollback()
-        finally:
-            db_session.close()
-
-    background_tasks.add_task(
-        generate_and_save,
-        analysis_data.paper_ids,
-        current_user.id,
-        [p.title for p in papers],
-        texts
-    )
+    job = await submit_job(db, current_user.id, "summary", analysis_data.paper_ids, papers)
+    if stream:
+        return _event_stream(job.id)
 
     return {
         "message": "Summary generation started",
-        "status": "processing"
+        "status": job.status,
+        "job_id": job.id
     }
 
 
 @router.post("/insights", response_model=BackgroundTaskResponse)
 async def extract_paper_insights(
     analysis_data: AnalysisCreate,
-    background_tasks: BackgroundTasks,
+    stream: bool = Query(False, description="Stream the model output as Server-Sent Events"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    papers = db.query(Paper).filter(
-        Paper.id.in_(analysis_data.paper_ids),
-        Paper.owner_id == current_user.id
-    ).all()
+    papers, has_text = await _requested_papers(db, current_user.id, analysis_data.paper_ids)
 
     if not papers:
         raise HTTPException(status_code=404, detail="No valid papers found")
 
-    texts = [p.extracted_text or p.abstract for p in papers if p.extracted_text or p.abstract]
-
-    if not texts:
+    if not has_text:
         raise HTTPException(status_code=400, detail="Papers have no text content")
 
-    def generate_and_save(paper_ids, user_id, titles, texts):
-        db_session = SessionLocal()
-        try:
-            insights = extract_insights(texts, titles)
-
-            db_analysis = Analysis(
-                analysis_type="insights",
-                title=f"Insights from {len(paper_ids)} papers",
-                content=insights,
-                analysis_metadata={  
-                    "paper_ids": paper_ids,
-                    "paper_titles": titles
-                },
-                user_id=user_id
-            )
-
-            db_session.add(db_analysis)
-            db_session.commit()
-
-        except Exception as e:
-            print(f"Error generating insights: {e}")
-            db_session.rollback()
-        finally:
-            db_session.close()
-
-    background_tasks.add_task(
-        generate_and_save,
-        analysis_data.paper_ids,
-        current_user.id,
-        [p.title for p in papers],
-        texts
-    )
+    job = await submit_job(db, current_user.id, "insights", analysis_data.paper_ids, papers)
+    if stream:
+        return _event_stream(job.id)
 
     return {
         "message": "Insights extraction started",
-        "status": "processing"
+        "status": job.status,
+        "job_id": job.id
     }
 
 
@@ -141,74 +130,72 @@ async def extract_paper_insights(
 @router.post("/literature-review", response_model=BackgroundTaskResponse)
 async def create_literature_review(
     analysis_data: AnalysisCreate,
-    background_tasks: BackgroundTasks,
+    stream: bool = Query(False, description="Stream the model output as Server-Sent Events"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    papers = db.query(Paper).filter(
-        Paper.id.in_(analysis_data.paper_ids),
-        Paper.owner_id == current_user.id
-    ).all()
+    papers, _ = await _requested_papers(db, current_user.id, analysis_data.paper_ids)
 
     if len(papers) < 2:
         raise HTTPException(status_code=400, detail="Need at least 2 papers")
 
-    paper_data = [{
-        "title": p.title,
-        "authors": p.authors,
-        "abstract": p.abstract,
-        "text": p.extracted_text or "",
-        "year": p.publication_date.year if p.publication_date else None
-    } for p in papers]
-
-    def generate_and_save(paper_ids, user_id, paper_data):
-        db_session = SessionLocal()
-        try:
-            review = generate_literature_review(paper_data)
-
-            db_analysis = Analysis(
-                analysis_type="literature_review",
-                title=f"Literature Review of {len(paper_ids)} papers",
-                content=review,
-                analysis_metadata={  
-                    "paper_ids": paper_ids,
-                    "paper_count": len(paper_ids)
-                },
-                user_id=user_id
-            )
-
-            db_session.add(db_analysis)
-            db_session.commit()
-
-        except Exception as e:
-            print(f"Error generating literature review: {e}")
-            db_session.rollback()
-        finally:
-            db_session.close()
-
-    background_tasks.add_task(
-        generate_and_save,
-        analysis_data.paper_ids,
-        current_user.id,
-        paper_data
-    )
+    job = await submit_job(db, current_user.id, "literature_review", analysis_data.paper_ids, papers)
+    if stream:
+        return _event_stream(job.id)
 
     return {
         "message": "Literature review generation started",
-        "status": "processing"
+        "status": job.status,
+        "job_id": job.id
     }
 
 
 
+@router.get("/jobs/{job_id}", response_model=AIJobResponse)
+async def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(select(AIJob).where(
+        AIJob.id == job_id,
+        AIJob.user_id == current_user.id
+    ))
+    job = result.scalars().first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job
+
+
+@router.get("/jobs/{job_id}/stream")
+async def stream_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    job = await db.scalar(select(AIJob.id).where(
+        AIJob.id == job_id,
+        AIJob.user_id == current_user.id
+    ))
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return _event_stream(job_id)
+
+
 @router.get("/analyses", response_model=List[AnalysisResponse])
 async def get_recent_analyses(
     limit: int = 10,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    analyses = db.query(Analysis).filter(
+    result = await db.execute(select(Analysis).where(
         Analysis.user_id == current_user.id
-    ).order_by(Analysis.created_at.desc()).limit(limit).all()
+    ).order_by(Analysis.created_at.desc()).limit(limit))
+    analyses = result.scalars().all()
     
     return analyses
 
@@ -217,12 +204,13 @@ async def get_recent_analyses(
 async def get_analysis(
     analysis_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    analysis = db.query(Analysis).filter(
+    result = await db.execute(select(Analysis).where(
         Analysis.id == analysis_id,
         Analysis.user_id == current_user.id
-    ).first()
+    ))
+    analysis = result.scalars().first()
 
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
@@ -233,17 +221,18 @@ async def get_analysis(
 async def delete_analysis(
     analysis_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    analysis = db.query(Analysis).filter(
+    result = await db.execute(select(Analysis).where(
         Analysis.id == analysis_id,
         Analysis.user_id == current_user.id
-    ).first()
+    ))
+    analysis = result.scalars().first()
 
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
 
-    db.delete(analysis)
-    db.commit()
+    await db.delete(analysis)
+    await db.commit()
     
     return {"message": "Analysis deleted successfully"}
\ No newline at end of file
@@ -1,112 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from models.user import User
 from models.document import Document
 from schemas.document import DocumentCreate, DocumentResponse, DocumentUpdate
-from utils.auth import get_current_user, get_db
+from utils.auth import get_current_user, get_db, get_read_db
+from utils.pagination import paginate, set_next_cursor
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
+
+async def _get_owned_document(db: AsyncSession, document_id: int, owner_id: int) -> Document:
+    result = await db.execute(select(Document).where(
+        Document.id == document_id,
+        Document.owner_id == owner_id
+    ))
+    document = result.scalars().first()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
+
 @router.post("/", response_model=DocumentResponse)
 async def create_document(
     document: DocumentCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     db_document = Document(
         **document.dict(),
         owner_id=current_user.id
     )
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    await db.commit()
+    await db.refresh(db_document)
     return db_document
 
 @router.get("/", response_model=List[DocumentResponse])
 async def get_documents(
+    response: Response,
     workspace_id: Optional[int] = None,
     document_type: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Document).filter(Document.owner_id == current_user.id)
+    stmt = select(Document).where(Document.owner_id == current_user.id)
     
     if workspace_id:
-        query = query.filter(Document.workspace_id == workspace_id)
+        stmt = stmt.where(Document.workspace_id == workspace_id)
     
     if document_type:
-        query = query.filter(Document.document_type == document_type)
+        stmt = stmt.where(Document.document_type == document_type)
     
-    documents = query.all()
+    documents, next_cursor = await paginate(db, stmt, Document.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     return documents
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    return document
+    return await _get_owned_document(db, document_id, current_user.id)
 
 @router.put("/{document_id}", response_model=DocumentResponse)
 async def update_document(
     document_id: int,
     document_update: DocumentUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    document = await _get_owned_document(db, document_id, current_user.id)
     
     for key, value in document_update.dict(exclude_unset=True).items():
         setattr(document, key, value)
     
-    db.commit()
-    db.refresh(document)
+    await db.commit()
+    await db.refresh(document)
     return document
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    document = await _get_owned_document(db, document_id, current_user.id)
     
-    db.delete(document)
-    db.commit()
+    await db.delete(document)
+    await db.commit()
     return {"message": "Document deleted successfully"}
 
 @router.post("/{document_id}/star")
 async def toggle_star(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.owner_id == current_user.id
-    ).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    document = await _get_owned_document(db, document_id, current_user.id)
     
     document.is_starred = not document.is_starred
-    db.commit()
-    return {"is_starred": document.is_starred}
\ No newline at end of file
+    await db.commit()
+    return {"is_starred": document.is_starred}
@@ -1,165 +1,294 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 from typing import List, Optional
 import os
-import shutil
 import json
 from datetime import datetime
 
 from models.user import User
 from models.paper import Paper
-from models.workspace import Workspace
-from schemas.paper import PaperCreate, PaperResponse, PaperDetailResponse
-from utils.auth import get_current_user, get_db
+from models.blob import PaperBlob
+from models.workspace import Workspace, workspace_papers
+from schemas.paper import PaperCreate, PaperResponse, PaperDetailResponse, PaperExtractionStatus, PaperSearchHit, RelatedPaperResponse
+from utils.auth import get_current_user, get_db, get_read_db
+from utils.pagination import paginate, set_next_cursor
+from utils.aggregates import with_analyzed_flag
 from config import settings
-from services.pdf_extractor import extract_text_from_pdf
+from services.ingestion import schedule_extraction, schedule_embedding, copy_blob_state
+from services.storage import receive_multipart, acquire_blob, discard_blob, release_blob, UploadTooLarge, InvalidUpload
+from services.fulltext import search_papers as search_library, index_papers, remove_papers
+from services.vector_index import related_papers, remove_embeddings
 
 router = APIRouter(prefix="/api/papers", tags=["Papers"])
 
+
+async def _get_owned_paper(db: AsyncSession, paper_id: int, owner_id: int, stmt=None) -> Paper:
+    stmt = stmt if stmt is not None else select(Paper)
+    result = await db.execute(stmt.where(
+        Paper.id == paper_id,
+        Paper.owner_id == owner_id
+    ))
+    paper = result.scalars().first()
+    if not paper:
+        raise HTTPException(status_code=404, detail="Paper not found")
+    return paper
+
+
+async def _owned_workspaces(db: AsyncSession, workspace_ids: List[int], owner_id: int) -> List[Workspace]:
+    result = await db.execute(select(Workspace).where(
+        Workspace.id.in_(workspace_ids),
+        Workspace.owner_id == owner_id
+    ))
+    return list(result.scalars().all())
+
+
+async def _papers_by_ids(db: AsyncSession, paper_ids: List[int]) -> List[Paper]:
+    result = await db.execute(
+        select(Paper).options(defer(Paper.extracted_text)).where(Paper.id.in_(paper_ids))
+    )
+    return result.scalars().all()
+
 @router.post("/", response_model=PaperResponse)
 async def create_paper(
     paper: PaperCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     db_paper = Paper(
         **paper.dict(exclude={"workspace_ids"}),
         owner_id=current_user.id
     )
-    db.add(db_paper)
-    db.commit()
-    db.refresh(db_paper)
     
    
     if paper.workspace_ids:
-        workspaces = db.query(Workspace).filter(
-            Workspace.id.in_(paper.workspace_ids),
-            Workspace.owner_id == current_user.id
-        ).all()
-        db_paper.workspaces.extend(workspaces)
-        db.commit()
+        db_paper.workspaces = await _owned_workspaces(db, paper.workspace_ids, current_user.id)
+    
+    db.add(db_paper)
+    await db.commit()
+    await db.refresh(db_paper)
     
+    await index_papers(db, [db_paper.id])
+    schedule_embedding([db_paper.id])
     return db_paper
 
-@router.post("/upload", response_model=PaperResponse)
+# The body is parsed by hand (see receive_multipart), so the form is
+# described to OpenAPI here instead of through File()/Form() parameters.
+_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "title": {"type": "string"},
+                "workspace_ids": {"type": "string", "description": "JSON list of workspace ids", "default": "[]"},
+            },
+        }}},
+    }
+}
+
+@router.post("/upload", response_model=PaperResponse, openapi_extra=_UPLOAD_FORM)
 async def upload_paper(
-    file: UploadFile = File(...),
-    title: Optional[str] = Form(None),
-    workspace_ids: str = Form("[]"),
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-   
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > settings.MAX_UPLOAD_SIZE:
+    # The multipart body is at least as large as the file, so an oversized
+    # Content-Length can be rejected before reading anything.
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_SIZE + 64 * 1024:
         raise HTTPException(status_code=400, detail="File too large")
     
-   
-    user_upload_dir = os.path.join(settings.UPLOAD_DIR, str(current_user.id))
-    os.makedirs(user_upload_dir, exist_ok=True)
-    
-    file_path = os.path.join(user_upload_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Streamed off the socket straight into the upload temp dir, so a
+    # chunked body without Content-Length is cut off at the size limit too.
+    try:
+        upload = await receive_multipart(request.headers.get("content-type"), request.stream())
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail="File too large")
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stored = upload.stored
+    title = upload.fields.get("title")
     
-    extracted_text = extract_text_from_pdf(file_path)
-    
-    paper_title = title or file.filename.replace('.pdf', '')
-    db_paper = Paper(
-        title=paper_title,
-        file_path=file_path,
-        file_size=file_size,
-        extracted_text=extracted_text,
-        owner_id=current_user.id
-    )
-    db.add(db_paper)
-    db.commit()
-    db.refresh(db_paper)
+    try:
+        ws_ids = json.loads(upload.fields.get("workspace_ids") or "[]")
+    except ValueError:
+        ws_ids = None
+    if not isinstance(ws_ids, list):
+        os.remove(stored.path)
+        raise HTTPException(status_code=400, detail="workspace_ids must be a JSON list")
     
+    # Files are stored once per content hash and shared between papers.
+    # The blob reference commits together with the paper row.
+    blob, created = await acquire_blob(db, stored)
+    try:
+        paper_title = title or upload.filename.replace('.pdf', '')
+        db_paper = Paper(
+            title=paper_title,
+            file_path=blob.file_path,
+            file_size=blob.file_size,
+            content_hash=blob.sha256,
+            blob_id=blob.id,
+            extraction_status="pending",
+            owner_id=current_user.id
+        )
+        
+        if ws_ids:
+            db_paper.workspaces = await _owned_workspaces(db, ws_ids, current_user.id)
+        
+        db.add(db_paper)
+        await db.commit()
+    except BaseException:
+        await discard_blob(db, blob, created)
+        raise
+    await db.refresh(db_paper)
     
-    ws_ids = json.loads(workspace_ids)
-    if ws_ids:
-        workspaces = db.query(Workspace).filter(
-            Workspace.id.in_(ws_ids),
-            Workspace.owner_id == current_user.id
-        ).all()
-        db_paper.workspaces.extend(workspaces)
-        db.commit()
+    # Text extraction runs in the ingestion process pool; clients poll
+    # /{paper_id}/status until it is "completed". Known content reuses
+    # the text already extracted for its blob.
+    if created:
+        schedule_extraction(blob.id, blob.file_path)
+    else:
+        await copy_blob_state(db, db_paper, blob)
+        if db_paper.extraction_status == "completed":
+            schedule_embedding([db_paper.id])
     
+    await index_papers(db, [db_paper.id])
     return db_paper
 
 @router.get("/", response_model=List[PaperResponse])
 async def get_papers(
+    response: Response,
     workspace_id: Optional[int] = Query(None, description="Filter papers by workspace ID"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(Paper).filter(Paper.owner_id == current_user.id)
+    # extracted_text can be megabytes per row and is never part of PaperResponse.
+    stmt = with_analyzed_flag(select(Paper).options(defer(Paper.extracted_text))).where(
+        Paper.owner_id == current_user.id
+    )
     
     if workspace_id:
        
-        query = query.filter(Paper.workspaces.any(id=workspace_id))
+        stmt = stmt.where(Paper.workspaces.any(Workspace.id == workspace_id))
     
-    papers = query.all()
-   
-    for paper in papers:
-        paper.analyzed = len(paper.analyses) > 0
+    papers, next_cursor = await paginate(db, stmt, Paper.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     
     return papers
 
+@router.get("/search", response_model=List[PaperSearchHit])
+async def search_my_papers(
+    q: str = Query(..., min_length=1, description="Full-text query over title, abstract and paper text"),
+    workspace_id: Optional[int] = Query(None, description="Restrict to a workspace"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    hits = await search_library(db, current_user.id, q, limit=limit, offset=offset, workspace_id=workspace_id)
+    if not hits:
+        return []
+    
+    papers = await _papers_by_ids(db, [hit["id"] for hit in hits])
+    papers_by_id = {paper.id: paper for paper in papers}
+    
+    results = []
+    for hit in hits:
+        paper = papers_by_id.get(hit["id"])
+        if paper:
+            result = PaperSearchHit.model_validate(paper)
+            result.rank = hit["rank"]
+            result.snippet = hit["snippet"]
+            results.append(result)
+    return results
+
 @router.get("/{paper_id}", response_model=PaperDetailResponse)
 async def get_paper(
     paper_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    paper = db.query(Paper).filter(
-        Paper.id == paper_id,
-        Paper.owner_id == current_user.id
-    ).first()
-    if not paper:
-        raise HTTPException(status_code=404, detail="Paper not found")
+    paper = await _get_owned_paper(db, paper_id, current_user.id, stmt=with_analyzed_flag(select(Paper)))
+    detail = PaperDetailResponse.model_validate(paper)
+    if detail.extracted_text is None and paper.blob_id:
+        # Text extracted from the paper's PDF is kept on its blob.
+        detail.extracted_text = await db.scalar(select(PaperBlob.extracted_text).where(PaperBlob.id == paper.blob_id))
+    return detail
+
+@router.get("/{paper_id}/related", response_model=List[RelatedPaperResponse])
+async def get_related_papers(
+    paper_id: int,
+    workspace_id: Optional[int] = Query(None, description="Only consider papers in this workspace"),
+    k: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    await _get_owned_paper(db, paper_id, current_user.id)
     
-    paper.analyzed = len(paper.analyses) > 0
-    return paper
+    matches = await related_papers(db, current_user.id, paper_id, k=k, workspace_id=workspace_id)
+    if not matches:
+        return []
+    
+    papers = await _papers_by_ids(db, [match_id for match_id, _ in matches])
+    papers_by_id = {p.id: p for p in papers}
+    
+    results = []
+    for match_id, score in matches:
+        if match_id in papers_by_id:
+            result = RelatedPaperResponse.model_validate(papers_by_id[match_id])
+            result.score = score
+            results.append(result)
+    return results
+
+@router.get("/{paper_id}/status", response_model=PaperExtractionStatus)
+async def get_paper_status(
+    paper_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await _get_owned_paper(db, paper_id, current_user.id)
 
 @router.delete("/{paper_id}")
 async def delete_paper(
     paper_id: int,
     workspace_id: Optional[int] = Query(None, description="Remove from workspace only"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    paper = db.query(Paper).filter(
-        Paper.id == paper_id,
-        Paper.owner_id == current_user.id
-    ).first()
-    
-    if not paper:
-        raise HTTPException(status_code=404, detail="Paper not found")
+    paper = await _get_owned_paper(db, paper_id, current_user.id)
     
     if workspace_id:
       
-        workspace = db.query(Workspace).filter(
+        workspace = await db.scalar(select(Workspace.id).where(
             Workspace.id == workspace_id,
             Workspace.owner_id == current_user.id
-        ).first()
+        ))
         
         if workspace:
-            paper.workspaces.remove(workspace)
-            db.commit()
+            await db.execute(delete(workspace_papers).where(
+                workspace_papers.c.workspace_id == workspace_id,
+                workspace_papers.c.paper_id == paper_id
+            ))
+            await db.commit()
             return {"message": "Paper removed from workspace successfully"}
     else:
         
-        if paper.file_path and os.path.exists(paper.file_path):
+        blob_id = paper.blob_id
+        if not blob_id and paper.file_path and os.path.exists(paper.file_path):
             os.remove(paper.file_path)
         
-        db.delete(paper)
-        db.commit()
+        await remove_embeddings(db, [paper_id])
+        await db.delete(paper)
+        if blob_id:
+            # Commits the delete together with dropping its blob reference.
+            await release_blob(db, blob_id)
+        else:
+            await db.commit()
+        await remove_papers(db, [paper_id])
         return {"message": "Paper deleted successfully"}
\ No newline at end of file
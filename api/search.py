@@ -1,75 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import httpx
-import xml.etree.ElementTree as ET
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+import json
 
+from models.paper import Paper
 from models.user import User
-from schemas.paper import PaperSearchParams, PaperCreate
+from schemas.paper import PaperSearchParams, PaperResponse, PaperImport, BulkImportRequest, BulkImportResponse
 from utils.auth import get_current_user, get_db
-from services.search_service import search_arxiv, search_crossref
+from utils.pagination import encode_cursor_state, decode_cursor_state
+from services.search_service import SourcePage, search_all_sources, stream_all_sources
+from services.paper_import import import_papers
 
 router = APIRouter(prefix="/api/search", tags=["Search"])
 
+async def _ndjson_results(params: PaperSearchParams, state: Optional[Dict]):
+    # One JSON object per line: a "result" as each source produces it, then
+    # "done" with the cursor for the next page.
+    page = SourcePage()
+    async for result in stream_all_sources(params, state, page):
+        yield json.dumps({"event": "result", "data": result}) + "\n"
+    next_cursor = encode_cursor_state(page.next) if page.next else None
+    yield json.dumps({"event": "done", "data": {"next_cursor": next_cursor}}) + "\n"
+
 @router.post("/papers")
 async def search_papers(
     params: PaperSearchParams,
+    stream: bool = Query(False),
     current_user: User = Depends(get_current_user)
 ):
-    results = []
-    
-   
-    if not params.source or params.source == "All Sources" or params.source == "arXiv":
-        arxiv_results = await search_arxiv(params)
-        results.extend(arxiv_results)
-    
+    state = decode_cursor_state(params.cursor)
+    if stream:
+        return StreamingResponse(_ndjson_results(params, state), media_type="application/x-ndjson")
     
-    if not params.source or params.source == "All Sources":
-        crossref_results = await search_crossref(params)
-        results.extend(crossref_results)
+    results, next_state = await search_all_sources(params, state)
     
-    return {"results": results[:params.max_results]}
+    return {
+        "results": results,
+        "next_cursor": encode_cursor_state(next_state) if next_state else None
+    }
 
-@router.post("/import")
+@router.post("/import", response_model=PaperResponse)
 async def import_paper(
-    paper_data: dict,
+    paper_data: PaperImport,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    from models.paper import Paper
-    from models.workspace import Workspace
+    # Importing a DOI already in the user's library refreshes that paper.
+    # The full text follows in the background; clients poll
+    # /api/papers/{paper_id}/status as for uploads.
+    result = await import_papers(db, current_user.id, [paper_data])
+    return await db.get(Paper, result.paper_ids[0])
 
-    workspace_id = paper_data.get("workspace_id")
-
-   
-    db_paper = Paper(
-        title=paper_data.get("title"),
-        authors=paper_data.get("authors", []),
-        abstract=paper_data.get("abstract"),
-        source=paper_data.get("source"),
-        source_url=paper_data.get("url"),
-        doi=paper_data.get("doi"),
-        publication_date=datetime.strptime(
-            paper_data.get("date"), "%Y-%m-%d"
-        ) if paper_data.get("date") else None,
-        citation_count=paper_data.get("citations", 0),
-        tags=paper_data.get("tags", []),
-        owner_id=current_user.id
+@router.post("/import/bulk", response_model=BulkImportResponse)
+async def import_papers_bulk(
+    request: BulkImportRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await import_papers(db, current_user.id, request.papers, request.workspace_id)
+    return BulkImportResponse(
+        created=len(result.created),
+        updated=len(set(result.paper_ids)) - len(result.created),
+        paper_ids=result.paper_ids
     )
-
-    
-    if workspace_id:
-        workspace = db.query(Workspace).filter(
-            Workspace.id == workspace_id,
-            Workspace.owner_id == current_user.id
-        ).first()
-
-        if workspace:
-            db_paper.workspaces.append(workspace)
-
-    db.add(db_paper)
-    db.commit()
-    db.refresh(db_paper)
-
-    return db_paper
\ No newline at end of file
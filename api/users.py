@@ -1,29 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.user import User
 from models.workspace import Workspace
 from models.paper import Paper
 from schemas.user import UserResponse
-from utils.auth import get_current_user, get_db
+from utils.auth import get_current_user, get_db, get_read_db
+from utils.aggregates import with_paper_counts
 
 router = APIRouter(prefix="/api", tags=["Dashboard"])
 
 @router.get("/dashboard")
 async def get_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     
-    workspaces = db.query(Workspace).filter(Workspace.owner_id == current_user.id).all()
+    result = await db.execute(
+        with_paper_counts(select(Workspace)).where(Workspace.owner_id == current_user.id)
+    )
+    workspaces = result.scalars().all()
     
-    total_papers = db.query(Paper).filter(Paper.owner_id == current_user.id).count()
+    total_papers = await db.scalar(
+        select(func.count(Paper.id)).where(Paper.owner_id == current_user.id)
+    )
     
-    papers_analyzed = db.query(Paper).filter(
-        Paper.owner_id == current_user.id,
-        Paper.analyses.any()
-    ).count()
+    papers_analyzed = await db.scalar(
+        select(func.count(Paper.id)).where(
+            Paper.owner_id == current_user.id,
+            Paper.analyses.any()
+        )
+    )
     
     workspace_list = []
     for ws in workspaces:
@@ -33,7 +41,7 @@ async def get_dashboard(
             "description": ws.description,
             "color": ws.color,
             "created": ws.created_at.strftime("%m/%d/%Y"),
-            "papers": len(ws.papers)
+            "papers": ws.papers_count
         })
     
     return {
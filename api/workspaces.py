@@ -1,90 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from models.user import User
 from models.workspace import Workspace
 from models.paper import Paper
 from schemas.workspace import WorkspaceCreate, WorkspaceResponse, WorkspaceUpdate
-from utils.auth import get_current_user, get_db
+from utils.auth import get_current_user, get_db, get_read_db
+from utils.pagination import paginate, set_next_cursor
+from utils.aggregates import with_paper_counts, count_workspace_papers
 
 router = APIRouter(prefix="/api/workspaces", tags=["Workspaces"])
 
+
+async def _get_owned_workspace(db: AsyncSession, workspace_id: int, owner_id: int, with_counts: bool = False) -> Workspace:
+    stmt = select(Workspace)
+    if with_counts:
+        stmt = with_paper_counts(stmt)
+    result = await db.execute(stmt.where(
+        Workspace.id == workspace_id,
+        Workspace.owner_id == owner_id
+    ))
+    workspace = result.scalars().first()
+    if not workspace:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    return workspace
+
 @router.post("/", response_model=WorkspaceResponse)
 async def create_workspace(
     workspace: WorkspaceCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     db_workspace = Workspace(
         **workspace.dict(),
         owner_id=current_user.id
     )
     db.add(db_workspace)
-    db.commit()
-    db.refresh(db_workspace)
+    await db.commit()
+    await db.refresh(db_workspace)
+    db_workspace.papers_count = 0
     return db_workspace
 
 @router.get("/", response_model=List[WorkspaceResponse])
 async def get_workspaces(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    workspaces = db.query(Workspace).filter(Workspace.owner_id == current_user.id).all()
-    for ws in workspaces:
-        ws.papers_count = len(ws.papers)
+    stmt = with_paper_counts(select(Workspace)).where(Workspace.owner_id == current_user.id)
+    workspaces, next_cursor = await paginate(db, stmt, Workspace.id, cursor, limit)
+    set_next_cursor(response, next_cursor)
     return workspaces
 
 @router.get("/{workspace_id}", response_model=WorkspaceResponse)
 async def get_workspace(
     workspace_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    workspace = db.query(Workspace).filter(
-        Workspace.id == workspace_id,
-        Workspace.owner_id == current_user.id
-    ).first()
-    if not workspace:
-        raise HTTPException(status_code=404, detail="Workspace not found")
-    workspace.papers_count = len(workspace.papers)
-    return workspace
+    return await _get_owned_workspace(db, workspace_id, current_user.id, with_counts=True)
 
 @router.put("/{workspace_id}", response_model=WorkspaceResponse)
 async def update_workspace(
     workspace_id: int,
     workspace_update: WorkspaceUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    workspace = db.query(Workspace).filter(
-        Workspace.id == workspace_id,
-        Workspace.owner_id == current_user.id
-    ).first()
-    if not workspace:
-        raise HTTPException(status_code=404, detail="Workspace not found")
+    workspace = await _get_owned_workspace(db, workspace_id, current_user.id)
     
     for key, value in workspace_update.dict(exclude_unset=True).items():
         setattr(workspace, key, value)
     
-    db.commit()
-    db.refresh(workspace)
-    workspace.papers_count = len(workspace.papers)
+    await db.commit()
+    await db.refresh(workspace)
+    workspace.papers_count = await count_workspace_papers(db, workspace.id)
     return workspace
 
 @router.delete("/{workspace_id}")
 async def delete_workspace(
     workspace_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    workspace = db.query(Workspace).filter(
-        Workspace.id == workspace_id,
-        Workspace.owner_id == current_user.id
-    ).first()
-    if not workspace:
-        raise HTTPException(status_code=404, detail="Workspace not found")
+    workspace = await _get_owned_workspace(db, workspace_id, current_user.id)
     
-    db.delete(workspace)
-    db.commit()
-    return {"message": "Workspace deleted successfully"}
\ No newline at end of file
+    await db.delete(workspace)
+    await db.commit()
+    return {"message": "Workspace deleted successfully"}
@@ -0,0 +1,134 @@
+"""Tokens and wall time of multi-paper analyses: map-reduce against one prompt.
+
+Runs the analyses against a stub model whose latency grows with prompt and
+output length (`--prefill` and `--decode` tokens/s plus `--base` seconds a
+call). Answers run to `--output-tokens` or the call's max_tokens, whichever
+is smaller. The old path is the single prompt generate_summaries and
+extract_insights used to send, which saw the first 1000 characters of each
+paper. Map-reduce summarizes each paper from up to PAPER_SUMMARY_INPUT_TOKENS
+of its text, caches the summary, and reduces the summaries. Each path is
+timed on `--papers` papers and then again after one paper is added.
+
+    python benchmarks/ai_map_reduce.py [--papers 20] [--prefill 5000] [--decode 100]
+"""
+import argparse
+import asyncio
+import time
+
+import common  # noqa: F401  (scratch settings, before any app import)
+
+import main  # noqa: F401  (creates the tables the analysis cache uses)
+from config import settings
+from services import llm_client
+from services.llm_client import LLMClient, estimate_tokens
+from services.map_reduce import map_reduce_insights, map_reduce_summaries
+
+SUMMARY_PROMPT = """Please provide concise summaries of the following research papers:
+
+{papers}
+
+Please provide a well-structured summary for each paper, highlighting the key contributions, methods, and findings.
+"""
+
+INSIGHTS_PROMPT = """Extract the most important insights and trends from the following research papers:
+
+{papers}
+
+Please identify:
+1. Key findings and contributions
+2. Common themes across papers
+3. Novel methodologies or approaches
+4. Limitations and future directions
+5. Potential applications
+"""
+
+
+class TimedStub:
+    """Stub model that takes as long as a real one would to read the prompt
+    and write the answer."""
+
+    name = "stub"
+    model = "bench"
+
+    def __init__(self, base: float, prefill: float, decode: float, output_tokens: int):
+        self.base = base
+        self.prefill = prefill
+        self.decode = decode
+        self.output_tokens = output_tokens
+
+    async def complete(self, messages, temperature, max_tokens, on_token):
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        await asyncio.sleep(self.base + prompt_tokens / self.prefill)
+        parts = []
+        remaining = min(max_tokens, self.output_tokens)
+        while remaining > 0:
+            count = min(remaining, 16)
+            await asyncio.sleep(count / self.decode)
+            text = " tok" * count  # ~1 token per word by estimate_tokens
+            parts.append(text)
+            if on_token:
+                on_token(text)
+            remaining -= count
+        return "".join(parts)
+
+    async def close(self):
+        pass
+
+
+def papers(count: int, words: int):
+    titles = [f"Paper {i}: a study of topic {i}" for i in range(count)]
+    texts = [f"paper{i} " + " ".join(f"word{(i * 7 + j) % 997}" for j in range(words)) for i in range(count)]
+    return titles, texts
+
+
+def single_prompt(template: str, texts, titles) -> str:
+    block = "\n\n".join(f"Paper {i+1}: {titles[i]}\nAbstract/Text: {texts[i][:1000]}..." for i in range(len(texts)))
+    return template.format(papers=block)
+
+
+async def old_path(client: LLMClient, template: str, max_tokens: int, texts, titles):
+    return await client.complete("You are a research assistant.", single_prompt(template, texts, titles), 0.3, max_tokens)
+
+
+async def measure(client: LLMClient, label: str, coro):
+    prompt, completion, requests = client.stats.prompt_tokens, client.stats.completion_tokens, client.stats.requests
+    started = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44} {elapsed:6.1f}s  {client.stats.requests - requests:3d} calls  "
+          f"prompt={client.stats.prompt_tokens - prompt:7d}  completion={client.stats.completion_tokens - completion:6d}")
+
+
+async def run(args):
+    client = llm_client._clients["stub"] = LLMClient(TimedStub(args.base, args.prefill, args.decode, args.output_tokens))
+    titles, texts = papers(args.papers + 1, args.words)
+    old_titles, old_texts = titles[:-1], texts[:-1]
+
+    print(f"{args.papers} papers of {args.words} words, stub model: {args.base}s + {args.prefill:.0f} prompt tok/s "
+          f"+ {args.decode:.0f} output tok/s, LLM concurrency up to {settings.LLM_MAX_CONCURRENCY}")
+    old = estimate_tokens(single_prompt(INSIGHTS_PROMPT, old_texts, old_titles))
+    read = sum(min(estimate_tokens(text), settings.PAPER_SUMMARY_INPUT_TOKENS) for text in old_texts)
+    print(f"old prompt (1000 chars/paper): ~{old} tokens; one prompt over the text map-reduce reads: ~{read} tokens "
+          f"(context {settings.LLM_CONTEXT_TOKENS})")
+
+    await measure(client, f"old summaries, {args.papers} papers", old_path(client, SUMMARY_PROMPT, 2000, old_texts, old_titles))
+    await measure(client, f"old insights, {args.papers} papers", old_path(client, INSIGHTS_PROMPT, 2500, old_texts, old_titles))
+    await measure(client, f"old insights, {args.papers + 1} papers (one added)", old_path(client, INSIGHTS_PROMPT, 2500, texts, titles))
+    await measure(client, f"map-reduce insights, {args.papers} papers (cold)", map_reduce_insights(old_texts, old_titles))
+    await measure(client, f"map-reduce insights, {args.papers + 1} papers (one added)", map_reduce_insights(texts, titles))
+    await measure(client, f"map-reduce summaries, {args.papers + 1} papers (cached)", map_reduce_summaries(texts, titles))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=20)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--base", type=float, default=0.2, help="seconds of fixed latency per call")
+    parser.add_argument("--prefill", type=float, default=5000, help="prompt tokens/s")
+    parser.add_argument("--decode", type=float, default=100, help="output tokens/s")
+    parser.add_argument("--output-tokens", type=int, default=1000)
+    args = parser.parse_args()
+    # The stub has no provider quota; keep the client's bucket out of the way.
+    settings.LLM_REQUESTS_PER_MINUTE = 100000
+    settings.LLM_TOKENS_PER_MINUTE = 100000000
+    asyncio.run(run(args))
@@ -0,0 +1,63 @@
+"""Per-request cost of authentication, with and without the auth caches.
+
+Calls GET /api/me, which does nothing but authenticate, on the app
+served in-process, and counts the SQL statements each request runs.
+"uncached" sizes the token and user caches to zero entries, so every
+request verifies the JWT and loads the user from the database, as before
+the caches existed.
+
+    python benchmarks/auth_latency.py [--requests 2000]
+"""
+import argparse
+import time
+
+from common import register, report, serve_app
+
+import httpx
+from sqlalchemy import event
+
+from database import async_engine
+from utils.auth import token_cache, user_cache
+
+statements = 0
+
+
+def _count(*args):
+    global statements
+    statements += 1
+
+
+def measure(client, headers, requests: int):
+    global statements
+    client.get("/api/me", headers=headers).raise_for_status()  # warm up
+    statements = 0
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get("/api/me", headers=headers).raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples, statements / requests
+
+
+def main(args):
+    base_url = serve_app()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count)
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        headers = register(client)
+        sizes = (token_cache.max_entries, user_cache.max_entries)
+
+        token_cache.max_entries = user_cache.max_entries = 0
+        uncached, uncached_queries = measure(client, headers, args.requests)
+        token_cache.max_entries, user_cache.max_entries = sizes
+        cached, cached_queries = measure(client, headers, args.requests)
+
+    report(f"uncached ({uncached_queries:.1f} queries/request)", uncached)
+    report(f"cached ({cached_queries:.1f} queries/request)", cached)
+    saved = sum(uncached) / len(uncached) - sum(cached) / len(cached)
+    print(f"mean latency saved per request: {saved * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    main(parser.parse_args())
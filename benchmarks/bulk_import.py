@@ -0,0 +1,70 @@
+"""Import throughput: one bulk request against one request per paper.
+
+For each batch size, imports that many new search results into a
+workspace on the app served in-process, once through a POST
+/api/search/import per paper and once through a single POST
+/api/search/import/bulk, then re-imports the bulk batch (every DOI already
+in the library, so every row is an update). Results carry no pdf_url, so
+nothing is fetched in the background.
+
+    python benchmarks/bulk_import.py [--sizes 10 100 1000]
+"""
+import argparse
+import time
+import uuid
+
+from common import register, serve_app
+
+import httpx
+
+
+def batch(size: int):
+    run = uuid.uuid4().hex[:8]
+    return [{
+        "title": f"Imported paper {i} ({run})",
+        "authors": ["A. Author", "B. Author"],
+        "abstract": "An abstract of a few sentences. " * 5,
+        "source": "CrossRef",
+        "url": f"https://doi.org/10.5555/{run}.{i}",
+        "doi": f"10.5555/{run}.{i}",
+        "date": "2024-01-01",
+        "citations": i,
+        "tags": ["bench"],
+    } for i in range(size)]
+
+
+def line(label: str, size: int, elapsed: float, requests: int):
+    print(f"{label:<34} {elapsed * 1000:9.0f}ms  {size / elapsed:8.0f} papers/s  {requests:5d} requests")
+
+
+def main(args):
+    base_url = serve_app()
+    with httpx.Client(base_url=base_url, timeout=300) as client:
+        client.headers.update(register(client))
+        workspace_id = client.post("/api/workspaces/", json={"name": "Imports"}).raise_for_status().json()["id"]
+
+        for size in args.sizes:
+            print(f"batch of {size}")
+            papers = batch(size)
+            started = time.perf_counter()
+            for paper in papers:
+                client.post("/api/search/import", json={**paper, "workspace_id": workspace_id}).raise_for_status()
+            line("  per-item /api/search/import", size, time.perf_counter() - started, size)
+
+            papers = batch(size)
+            body = {"papers": papers, "workspace_id": workspace_id}
+            started = time.perf_counter()
+            result = client.post("/api/search/import/bulk", json=body).raise_for_status().json()
+            line("  bulk, new papers", size, time.perf_counter() - started, 1)
+            assert result["created"] == size, result
+
+            started = time.perf_counter()
+            result = client.post("/api/search/import/bulk", json=body).raise_for_status().json()
+            line("  bulk, re-import (updates)", size, time.perf_counter() - started, 1)
+            assert result["updated"] == size, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    main(parser.parse_args())
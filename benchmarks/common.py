@@ -0,0 +1,234 @@
+"""Shared setup for the benchmark scripts.
+
+Import this before anything from the app. Like tests/conftest.py, it points
+the settings at a scratch directory and SQLite database, so a run never
+touches a real deployment (set BENCH_DATABASE_URL to benchmark against
+Postgres instead). Run the scripts from the repository root, e.g.
+
+    python benchmarks/search_fanout.py
+"""
+import atexit
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Inherited by spawned worker processes, which import this module again.
+WORKDIR = os.environ.get("BENCH_WORKDIR") or tempfile.mkdtemp(prefix="researchhub-bench-")
+os.environ["BENCH_WORKDIR"] = WORKDIR
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["GROQ_API_KEY"] = ""
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["CACHE_BACKEND"] = "memory"
+sys.path.insert(0, ROOT)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples: List[float], unit: float = 1000.0, suffix: str = "ms"):
+    """Prints p50/p99/mean of `samples` (seconds, shown in ms by default)."""
+    mean = sum(samples) / len(samples)
+    print(
+        f"{label:<44} n={len(samples):<5} p50={percentile(samples, 50) * unit:8.1f}{suffix}"
+        f"  p99={percentile(samples, 99) * unit:8.1f}{suffix}  mean={mean * unit:8.1f}{suffix}"
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_app(workers: int = 0) -> str:
+    """Runs the app under uvicorn and returns its base URL once it accepts
+    requests. By default the server runs in a background thread, so the
+    benchmark can patch the app; with `workers` it runs as a separate
+    uvicorn process with that many workers, so load generation does not
+    share its GIL."""
+    import httpx
+
+    port = free_port()
+    if workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "error"],
+            env={**os.environ, "PYTHONPATH": ROOT}
+        )
+
+        @atexit.register
+        def stop():
+            server.terminate()
+            server.wait(timeout=30)
+    else:
+        import uvicorn
+
+        import main
+
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="error"))
+        threading.Thread(target=server.run, daemon=True).start()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/health", timeout=1)
+            return base_url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("app did not start")
+
+
+def register(client, password: str = "pw") -> Dict[str, str]:
+    """Registers a new user on an httpx client and returns its auth headers."""
+    name = uuid.uuid4().hex[:12]
+    email = f"{name}@example.com"
+    response = client.post("/api/auth/register", json={"email": email, "username": name, "password": password})
+    response.raise_for_status()
+    token = client.post("/api/auth/token", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+_WORDS = (
+    "attention transformer sparse kernel gradient protein folding graph network "
+    "retrieval corpus quantum circuit benchmark latency throughput encoder decoder"
+).split()
+
+
+def synthetic_pdf(page_count: int, lines: int = 40, sparse_every: int = 0) -> bytes:
+    """A text PDF of `page_count` pages with `lines` lines each. With
+    `sparse_every`, every n-th page carries only a page number, which sends
+    it down the pdfplumber path of the extractor."""
+    objects = ["<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    kids = []
+    for number in range(page_count):
+        if sparse_every and number % sparse_every == 0:
+            text = [str(number)]
+        else:
+            text = [" ".join(_WORDS[(number + line + i) % len(_WORDS)] for i in range(12)) for line in range(lines)]
+        stream = "BT /F1 10 Tf 40 760 Td 12 TL " + " ".join(f"({line}) Tj T*" for line in text) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+            "/Resources << /Font << /F1 1 0 R >> >> >>"
+        )
+        kids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(f"{kid} 0 R" for kid in kids), len(kids))
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {len(objects)} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+ATOM_ENTRY = (
+    "<entry><id>http://arxiv.org/abs/{id}</id><title>{title}</title><summary>{summary}</summary>"
+    "<author><name>A. Author</name></author><published>2024-01-01T00:00:00Z</published>"
+    '<link href="http://arxiv.org/abs/{id}" rel="alternate"/><link title="pdf" href="http://arxiv.org/pdf/{id}"/></entry>'
+)
+
+
+class Upstream:
+    """Local stand-ins for the arXiv and Crossref APIs. Each page takes
+    `delay` seconds per source (arXiv streams its entries over that time,
+    the way a large Atom feed arrives), so latency is predictable."""
+
+    def __init__(self, arxiv_delay: float = 0.0, crossref_delay: float = 0.0):
+        self.delays = {"arxiv": arxiv_delay, "crossref": crossref_delay}
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path.endswith("/query"):
+                    upstream._arxiv(self, query)
+                elif url.path.endswith("/works"):
+                    upstream._crossref(self, query)
+                else:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        # Clients that time out hang up mid-response; that is expected.
+        self.server.handle_error = lambda request, address: None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def configure(self):
+        from config import settings
+
+        settings.ARXIV_BASE_URL = f"{self.url}/api"
+        settings.CROSSREF_BASE_URL = self.url
+
+    def _arxiv(self, handler, query):
+        start, rows = int(query.get("start", 0)), int(query.get("max_results", 10))
+        term = query.get("search_query", "").replace("all:", "")
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/atom+xml")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def chunk(data: str):
+            data = data.encode()
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            handler.wfile.flush()
+
+        chunk('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+              'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+              "<opensearch:totalResults>100000</opensearch:totalResults>")
+        for i in range(start, start + rows):
+            time.sleep(self.delays["arxiv"] / rows)
+            chunk(ATOM_ENTRY.format(
+                id=f"2401.{i:05d}", title=f"Preprint {i} on {term} methods", summary=f"We study {term} at scale. " * 10
+            ))
+        chunk("</feed>")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+
+    def _crossref(self, handler, query):
+        time.sleep(self.delays["crossref"])
+        rows, term = int(query.get("rows", 10)), query.get("query", "")
+        offset = 0 if query.get("cursor", "*") == "*" else int(query["cursor"])
+        items = [{
+            "title": [f"Article {i} about {term} systems"],
+            "author": [{"given": "B.", "family": "Author"}],
+            "published": {"date-parts": [[2023, 5, 1]]},
+            "DOI": f"10.5555/{term}.{i}",
+            "container-title": ["Journal"],
+            "is-referenced-by-count": i,
+            "abstract": f"Results on {term}. " * 10,
+        } for i in range(offset, offset + rows)]
+        body = json.dumps({"message": {"items": items, "next-cursor": str(offset + rows)}}).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
@@ -0,0 +1,102 @@
+"""Event-loop responsiveness while large PDFs are being extracted.
+
+Serves the app with uvicorn, then probes an unrelated authenticated
+endpoint (GET /api/papers/) at a fixed rate: first idle, then while a batch
+of large uploads is extracted. `--inline` runs the extraction on the event
+loop instead, the way upload_paper used to, for comparison.
+
+    python benchmarks/extraction_load.py [--uploads 4] [--pages 400] [--inline]
+"""
+import argparse
+import threading
+import time
+
+from common import register, report, serve_app, synthetic_pdf
+
+import httpx
+
+from services import ingestion
+from services.pdf_extractor import _join_pages, count_pages, extract_page_range
+
+
+async def _extract_on_loop(file_path: str, executor=None) -> str:
+    return _join_pages(extract_page_range(file_path, 0, count_pages(file_path)))
+
+
+def probe(base_url: str, headers, stop: threading.Event, interval: float = 0.02):
+    samples = []
+    with httpx.Client(base_url=base_url, headers=headers, timeout=120) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get("/api/papers/", params={"limit": 20}).raise_for_status()
+            samples.append(time.perf_counter() - started)
+            time.sleep(interval)
+    return samples
+
+
+def run_probe(base_url, headers, seconds=None, until=None):
+    stop = threading.Event()
+    result = []
+    thread = threading.Thread(target=lambda: result.extend(probe(base_url, headers, stop)))
+    thread.start()
+    if seconds:
+        time.sleep(seconds)
+    else:
+        until()
+    stop.set()
+    thread.join()
+    return result
+
+
+def main(args):
+    if args.inline:
+        ingestion.extract_text_parallel = _extract_on_loop
+    base_url = serve_app()
+    client = httpx.Client(base_url=base_url, timeout=300)
+    headers = register(client)
+    content = synthetic_pdf(args.pages)
+    print(f"{args.uploads} uploads of {args.pages} pages ({len(content) / 1e6:.1f}MB), "
+          f"extraction {'on the event loop' if args.inline else 'in the process pool'}")
+
+    report("probe latency, idle", run_probe(base_url, headers, seconds=2))
+
+    upload_times, extraction = [], {}
+
+    def upload_all():
+        started = time.perf_counter()
+
+        def upload(i):
+            # Distinct content per upload, so every one is extracted.
+            body = content + f"% {i} {time.time()}\n".encode()
+            t = time.perf_counter()
+            with httpx.Client(base_url=base_url, headers=headers, timeout=300) as uploader:
+                response = uploader.post("/api/papers/upload", files={"file": (f"{i}.pdf", body, "application/pdf")})
+                response.raise_for_status()
+                upload_times.append(time.perf_counter() - t)
+                paper_id = response.json()["id"]
+                while uploader.get(f"/api/papers/{paper_id}/status").json()["extraction_status"] not in ("completed", "failed"):
+                    time.sleep(0.1)
+
+        threads = [threading.Thread(target=upload, args=(i,)) for i in range(args.uploads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        extraction["wall"] = time.perf_counter() - started
+
+    report("probe latency, during extraction", run_probe(base_url, headers, until=upload_all))
+    report("upload response time", upload_times)
+    print(f"all extractions finished in {extraction['wall']:.1f}s")
+
+    # Let the embedding stage that follows extraction finish before exit.
+    deadline = time.monotonic() + 120
+    while ingestion.pending_jobs() and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--inline", action="store_true", help="extract on the event loop (old behaviour)")
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""A burst of logins against one worker, and what it does to other requests.
+
+Fires `--logins` concurrent POST /api/auth/token requests at the app served
+in-process while a probe keeps calling GET /api/me. Reports login outcomes
+(200, or 503 once the hashing queue is full) and latencies for both.
+`--inline` verifies passwords on the event loop instead, as the handlers
+used to.
+
+    python benchmarks/login_storm.py [--logins 200] [--inline]
+"""
+import argparse
+import asyncio
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from common import report, serve_app
+
+import httpx
+
+from config import settings
+from utils import auth
+
+
+async def _on_loop(fn, *args):
+    return fn(*args)
+
+
+def probe(base_url, headers, stop: threading.Event):
+    samples = []
+    with httpx.Client(base_url=base_url, headers=headers, timeout=300) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get("/api/me").raise_for_status()
+            samples.append(time.perf_counter() - started)
+            time.sleep(0.02)
+    return samples
+
+
+async def storm(base_url, email, logins: int):
+    samples = defaultdict(list)
+    limits = httpx.Limits(max_connections=logins)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as client:
+        async def login():
+            started = time.perf_counter()
+            response = await client.post("/api/auth/token", data={"username": email, "password": "pw"})
+            samples[response.status_code].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        return samples, time.perf_counter() - started
+
+
+def main(args):
+    if args.inline:
+        auth._run_hashing = _on_loop
+    base_url = serve_app()
+    name = uuid.uuid4().hex[:12]
+    email = f"{name}@example.com"
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        client.post("/api/auth/register", json={"email": email, "username": name, "password": "pw"}).raise_for_status()
+        token = client.post("/api/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    mode = "on the event loop" if args.inline else (
+        f"{settings.PASSWORD_HASH_WORKERS} hashing threads, {settings.PASSWORD_HASH_MAX_PENDING} pending max"
+    )
+    print(f"{args.logins} concurrent logins, bcrypt {mode}")
+
+    stop = threading.Event()
+    idle = []
+    thread = threading.Thread(target=lambda: idle.extend(probe(base_url, headers, stop)))
+    thread.start()
+    time.sleep(2)
+    stop.set()
+    thread.join()
+    report("probe GET /api/me, idle", idle)
+
+    stop = threading.Event()
+    during = []
+    thread = threading.Thread(target=lambda: during.extend(probe(base_url, headers, stop)))
+    thread.start()
+    samples, elapsed = asyncio.run(storm(base_url, email, args.logins))
+    stop.set()
+    thread.join()
+
+    report("probe GET /api/me, during storm", during)
+    for code, latencies in sorted(samples.items()):
+        report(f"login latency, {code} responses", latencies)
+    print(f"storm took {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop (old behaviour)")
+    main(parser.parse_args())
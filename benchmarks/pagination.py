@@ -0,0 +1,95 @@
+"""GET /api/papers/ over a library of 50k papers.
+
+Seeds one user with `--papers` papers carrying `--text-kb` of extracted
+text each, then walks the whole library page by page through the cursor
+and reports per-page latency and response size. For comparison it times
+the old unpaginated query, which loaded every row with its text.
+
+    python benchmarks/pagination.py [--papers 50000] [--limit 200]
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+from common import report, serve_app
+
+import httpx
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database import engine
+from models.paper import Paper
+from schemas.paper import PaperResponse
+from utils.pagination import NEXT_CURSOR_HEADER
+
+
+def seed(owner_id: int, papers: int, text_kb: int):
+    text = ("lorem ipsum dolor sit amet " * 40 * text_kb)[:text_kb * 1024]
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        for start in range(0, papers, 5000):
+            conn.execute(insert(Paper), [{
+                "title": f"Seeded paper {i}",
+                "authors": ["A. Author", "B. Author"],
+                "abstract": "An abstract of a few sentences. " * 5,
+                "source": "arXiv",
+                "doi": f"10.5555/seed.{i}",
+                "tags": ["seed"],
+                "extracted_text": text,
+                "extraction_status": "completed",
+                "owner_id": owner_id,
+                "created_at": now,
+                "updated_at": now,
+            } for i in range(start, min(start + 5000, papers))])
+
+
+def main(args):
+    base_url = serve_app()
+    client = httpx.Client(base_url=base_url, timeout=300)
+    name = uuid.uuid4().hex[:12]
+    user = client.post("/api/auth/register", json={"email": f"{name}@example.com", "username": name, "password": "pw"}).json()
+    token = client.post("/api/auth/token", data={"username": f"{name}@example.com", "password": "pw"}).json()["access_token"]
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    started = time.perf_counter()
+    seed(user["id"], args.papers, args.text_kb)
+    print(f"seeded {args.papers} papers with {args.text_kb}KB of text each in {time.perf_counter() - started:.1f}s")
+
+    samples, sizes, cursor, seen = [], [], None, 0
+    walk_started = time.perf_counter()
+    while True:
+        params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+        started = time.perf_counter()
+        response = client.get("/api/papers/", params=params)
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        sizes.append(len(response.content))
+        seen += len(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+    assert seen == args.papers, seen
+    print(f"walked {len(samples)} pages of {args.limit} in {time.perf_counter() - walk_started:.1f}s")
+    report("page latency (all pages)", samples)
+    report("page latency (first 10 pages)", samples[:10])
+    report("page latency (last 10 pages)", samples[-10:])
+    print(f"{'page size':<44} max={max(sizes) / 1024:.0f}KB  mean={sum(sizes) / len(sizes) / 1024:.0f}KB")
+
+    # What the endpoint used to do: every row, text included, in one response.
+    started = time.perf_counter()
+    with Session(engine) as db:
+        papers = db.scalars(select(Paper).where(Paper.owner_id == user["id"])).all()
+        body = "[" + ",".join(PaperResponse.model_validate(paper).model_dump_json() for paper in papers) + "]"
+    elapsed = time.perf_counter() - started
+    loaded = args.papers * args.text_kb * 1024
+    print(f"{'old: one unpaginated response':<44} {elapsed * 1000:.0f}ms, {len(body) / 1e6:.1f}MB response, "
+          f"{loaded / 1e6:.0f}MB of text loaded")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=50000)
+    parser.add_argument("--text-kb", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,86 @@
+"""Pages/sec of each PDF extraction backend over a synthetic corpus.
+
+Builds multi-hundred-page text PDFs (one in every `--sparse-every` pages
+nearly empty, which the engine re-reads with pdfplumber) and extracts each
+document with every backend, serially, and with the page-parallel engine
+(extract_text_parallel) on a process pool.
+
+    python benchmarks/pdf_extraction.py [--sizes 200 400] [--workers 4]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import synthetic_pdf
+
+import PyPDF2
+
+from services.pdf_extractor import _extract_layout, _extract_pdfium, count_pages, extract_page_range, extract_text_parallel
+
+
+def pypdf2(path: str) -> int:
+    with open(path, "rb") as file:
+        return len("\n".join(page.extract_text() or "" for page in PyPDF2.PdfReader(file).pages))
+
+
+def pdfplumber(path: str) -> int:
+    return len("\n".join(_extract_layout(path, list(range(count_pages(path)))).values()))
+
+
+def pdfium(path: str) -> int:
+    return len("\n".join(_extract_pdfium(path, 0, count_pages(path))))
+
+
+def engine_serial(path: str) -> int:
+    # pdfium with pdfplumber for sparse pages, in one process.
+    return len("\n".join(extract_page_range(path, 0, count_pages(path))))
+
+
+def main(args):
+    corpus = []
+    for pages in args.sizes:
+        path = os.path.abspath(f"corpus-{pages}.pdf")
+        with open(path, "wb") as out:
+            out.write(synthetic_pdf(pages, sparse_every=args.sparse_every))
+        corpus.append((path, pages))
+    total_pages = sum(pages for _, pages in corpus)
+    sparse = f"every {args.sparse_every}th page sparse" if args.sparse_every else "no sparse pages"
+    print(f"corpus: {len(corpus)} PDFs, {total_pages} pages, {sparse}")
+
+    backends = [("pdfium", pdfium), ("engine, serial", engine_serial), ("PyPDF2", pypdf2)]
+    if not args.skip_pdfplumber:
+        backends.append(("pdfplumber", pdfplumber))
+    for name, extract in backends:
+        started = time.perf_counter()
+        for path, _ in corpus:
+            extract(path)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<32} {total_pages / elapsed:8.1f} pages/s  ({elapsed:.2f}s)")
+
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # Warm the workers so process start-up is not counted.
+        list(executor.map(count_pages, [path for path, _ in corpus] * args.workers))
+
+        async def parallel():
+            for path, _ in corpus:
+                await extract_text_parallel(path, executor)
+
+        started = time.perf_counter()
+        asyncio.run(parallel())
+        elapsed = time.perf_counter() - started
+        print(f"{f'engine, {args.workers} processes':<32} {total_pages / elapsed:8.1f} pages/s  ({elapsed:.2f}s)")
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 400])
+    parser.add_argument("--sparse-every", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--skip-pdfplumber", action="store_true", help="pdfplumber is by far the slowest")
+    main(parser.parse_args())
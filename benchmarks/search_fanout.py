@@ -0,0 +1,86 @@
+"""p50/p99 latency of an "All Sources" search against local stub upstreams.
+
+Compares the old shape of the search (arXiv, then Crossref, each on a new
+connection) with search_all_sources, which fans out concurrently over the
+shared keep-alive pool, and shows that a stalled upstream only costs its
+per-source timeout.
+
+    python benchmarks/search_fanout.py [--runs 50]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from common import Upstream, report
+
+import httpx
+
+import main  # noqa: F401  creates the tables
+from config import settings
+from schemas.paper import PaperSearchParams
+from services import search_service
+from services.http_client import close_http_client
+from services.search_service import SOURCES, run_source, search_all_sources, stop_search_tasks
+
+ROWS = 20
+
+
+def _params() -> PaperSearchParams:
+    # A new query every run, so nothing is answered from the search cache.
+    return PaperSearchParams(query=f"q{uuid.uuid4().hex[:12]}", source="All Sources", max_results=ROWS)
+
+
+async def sequential_fresh_connections(runs: int):
+    shared = search_service.get_http_client
+    client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=0), timeout=settings.HTTP_TIMEOUT)
+    search_service.get_http_client = lambda: client
+    try:
+        samples = []
+        for _ in range(runs):
+            params = _params()
+            started = time.perf_counter()
+            for name, source in SOURCES.items():
+                await run_source(name, source, params, source.start, ROWS // 2)
+            samples.append(time.perf_counter() - started)
+        return samples
+    finally:
+        search_service.get_http_client = shared
+        await client.aclose()
+
+
+async def concurrent_pooled(runs: int):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        results, _ = await search_all_sources(_params())
+        samples.append(time.perf_counter() - started)
+        assert results
+    return samples
+
+
+async def run(args):
+    upstream = Upstream(arxiv_delay=args.arxiv_delay, crossref_delay=args.crossref_delay)
+    upstream.configure()
+    try:
+        print(f"arXiv stub {args.arxiv_delay * 1000:.0f}ms, Crossref stub {args.crossref_delay * 1000:.0f}ms per page")
+        report("before: sequential, connection per request", await sequential_fresh_connections(args.runs))
+        report("after: concurrent, shared pool", await concurrent_pooled(args.runs))
+
+        settings.SEARCH_SOURCE_TIMEOUT = args.timeout
+        upstream.delays["crossref"] = args.timeout * 4
+        print(f"Crossref stalled at {upstream.delays['crossref'] * 1000:.0f}ms, per-source timeout {args.timeout * 1000:.0f}ms")
+        report("before: sequential, connection per request", await sequential_fresh_connections(max(args.runs // 10, 3)))
+        report("after: concurrent, partial results", await concurrent_pooled(max(args.runs // 10, 3)))
+    finally:
+        await stop_search_tasks()
+        await close_http_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--arxiv-delay", type=float, default=0.15)
+    parser.add_argument("--crossref-delay", type=float, default=0.10)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    asyncio.run(run(parser.parse_args()))
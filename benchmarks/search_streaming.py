@@ -0,0 +1,69 @@
+"""Time to first result of a search: buffered JSON against NDJSON streaming.
+
+Searches the app served in-process against local stub upstreams that
+spread each page over `--arxiv-delay` and `--crossref-delay` seconds, the
+way a large Atom feed trickles in. A buffered response shows nothing until
+every source has finished; with ?stream=true the first result line arrives
+as soon as arXiv's first entries are parsed. Every run uses a new query, so
+nothing is answered from the search cache.
+
+    python benchmarks/search_streaming.py [--runs 20] [--max-results 200]
+"""
+import argparse
+import json
+import time
+import uuid
+
+from common import Upstream, register, report, serve_app
+
+import httpx
+
+
+def buffered(client, body):
+    started = time.perf_counter()
+    response = client.post("/api/search/papers", json=body).raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed, len(response.json()["results"])
+
+
+def streamed(client, body):
+    started = time.perf_counter()
+    first, count = None, 0
+    with client.stream("POST", "/api/search/papers", params={"stream": "true"}, json=body) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line and json.loads(line)["event"] == "result":
+                count += 1
+                first = first or time.perf_counter() - started
+    return first, time.perf_counter() - started, count
+
+
+def main(args):
+    upstream = Upstream(arxiv_delay=args.arxiv_delay, crossref_delay=args.crossref_delay)
+    upstream.configure()
+    base_url = serve_app()
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        client.headers.update(register(client))
+        print(f"{args.max_results} results per search, arXiv page over {args.arxiv_delay}s, "
+              f"Crossref over {args.crossref_delay}s")
+        for source in ("arXiv", "All Sources"):
+            for label, search in (("buffered", buffered), ("stream=true", streamed)):
+                firsts, totals, counts = [], [], set()
+                for _ in range(args.runs):
+                    body = {"query": f"q{uuid.uuid4().hex[:8]}", "source": source, "max_results": args.max_results}
+                    first, total, count = search(client, body)
+                    firsts.append(first)
+                    totals.append(total)
+                    counts.add(count)
+                print(f"{source}, {label} ({'/'.join(map(str, sorted(counts)))} results)")
+                report("  time to first result", firsts)
+                report("  time to last result", totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--max-results", type=int, default=200)
+    parser.add_argument("--arxiv-delay", type=float, default=1.0)
+    parser.add_argument("--crossref-delay", type=float, default=0.5)
+    main(parser.parse_args())
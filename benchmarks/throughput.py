@@ -0,0 +1,67 @@
+"""Requests/sec of database-backed endpoints as in-flight requests grow.
+
+Starts the app as its own uvicorn process, seeds a user with a few hundred
+papers, then holds a fixed number of requests in flight against the
+library endpoints for a few seconds per level. With the async database
+layer, throughput should climb with concurrency until the worker's CPU is
+saturated, instead of staying flat at one request at a time. Against the
+default scratch SQLite database queries never wait on the network, so
+point BENCH_DATABASE_URL at Postgres to see the I/O overlap.
+
+    python benchmarks/throughput.py [--levels 1 2 4 8 16 32 64] [--workers 1]
+"""
+import argparse
+import asyncio
+import time
+
+from common import percentile, register, serve_app
+
+import httpx
+
+PATHS = ["/api/papers/?limit=20", "/api/workspaces/", "/api/documents/"]
+
+
+async def level(base_url: str, headers, concurrency: int, duration: float):
+    samples = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker(offset: int):
+            i = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                response = await client.get(PATHS[i % len(PATHS)])
+                response.raise_for_status()
+                samples.append(time.perf_counter() - started)
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(samples) / elapsed, samples
+
+
+def main(args):
+    base_url = serve_app(workers=args.workers)
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        headers = register(client)
+        for i in range(args.papers):
+            client.post("/api/papers/", json={"title": f"Paper {i}", "abstract": "Seeded."}, headers=headers).raise_for_status()
+        for i in range(10):
+            client.post("/api/workspaces/", json={"name": f"Workspace {i}"}, headers=headers).raise_for_status()
+
+    print(f"{args.workers} uvicorn worker(s), {args.duration:.0f}s per level, endpoints: {', '.join(PATHS)}")
+    for concurrency in args.levels:
+        rps, samples = asyncio.run(level(base_url, headers, concurrency, args.duration))
+        print(f"in flight={concurrency:<4} {rps:8.1f} req/s  p50={percentile(samples, 50) * 1000:7.1f}ms"
+              f"  p99={percentile(samples, 99) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--papers", type=int, default=300)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""recall@k and QPS of the related-papers index: IVF against brute force.
+
+Builds one owner's VectorStore from synthetic clustered embeddings (papers
+about a few hundred topics, several chunk vectors each) and runs
+related-paper queries. Brute-force NumPy is the baseline and the ground
+truth for recall@k; the IVF index is swept over nprobe.
+
+    python benchmarks/vector_search.py [--papers 10000] [--chunks 4] [--k 10]
+"""
+import argparse
+import time
+from typing import NamedTuple
+
+from common import report
+
+import numpy as np
+
+from config import settings
+from services.vector_index import VectorStore
+
+
+class Row(NamedTuple):
+    id: int
+    paper_id: int
+    vector: bytes
+
+
+def corpus(papers: int, chunks: int, topics: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim)).astype(np.float32)
+    topic = rng.integers(0, topics, papers)
+    rows = []
+    for paper_id in range(1, papers + 1):
+        base = centres[topic[paper_id - 1]] + 1.5 * rng.standard_normal(dim).astype(np.float32)
+        for _ in range(chunks):
+            vector = base + 1.0 * rng.standard_normal(dim).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            rows.append(Row(len(rows) + 1, paper_id, vector.astype(np.float32).tobytes()))
+    return rows
+
+
+def run_queries(store: VectorStore, paper_ids, k: int, exact: bool):
+    results, samples = [], []
+    started = time.perf_counter()
+    for paper_id in paper_ids:
+        t = time.perf_counter()
+        query = store.paper_vector(int(paper_id))
+        results.append([match for match, _ in store.search(query, k, exclude_id=int(paper_id), exact=exact)])
+        samples.append(time.perf_counter() - t)
+    return results, len(paper_ids) / (time.perf_counter() - started), samples
+
+
+def main(args):
+    rows = corpus(args.papers, args.chunks, args.topics, settings.EMBEDDING_DIM)
+    print(f"{args.papers} papers x {args.chunks} chunks = {len(rows)} vectors of {settings.EMBEDDING_DIM} dims "
+          f"({len(rows) * settings.EMBEDDING_DIM * 4 / 1e6:.0f}MB)")
+
+    settings.VECTOR_ANN_MIN_VECTORS = 1
+    started = time.perf_counter()
+    store = VectorStore.from_rows(rows)
+    print(f"store + IVF build ({len(store.ivf.lists)} lists): {time.perf_counter() - started:.2f}s")
+
+    queries = np.random.default_rng(1).choice(np.arange(1, args.papers + 1), args.queries, replace=False)
+    truth, qps, samples = run_queries(store, queries, args.k, exact=True)
+    print(f"{'brute force':<16} recall@{args.k}=1.000  QPS={qps:8.1f}")
+    report("  latency", samples)
+
+    for nprobe in args.nprobe:
+        settings.VECTOR_ANN_NPROBE = nprobe
+        found, qps, samples = run_queries(store, queries, args.k, exact=False)
+        recall = np.mean([len(set(a) & set(b)) / max(len(b), 1) for a, b in zip(found, truth)])
+        print(f"{f'IVF nprobe={nprobe}':<16} recall@{args.k}={recall:.3f}  QPS={qps:8.1f}")
+        report("  latency", samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--papers", type=int, default=10000)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    main(parser.parse_args())
@@ -1,10 +1,102 @@
-from sqlalchemy import create_engine
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from config import settings
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL,pool_pre_ping=True)
+
+def to_async_url(url: str):
+    url = make_url(url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+        # asyncpg takes `ssl`, not libpq's `sslmode`.
+        if "sslmode" in url.query:
+            sslmode = url.query["sslmode"]
+            url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait to check out a
+    connection and how often the pool runs dry."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def recreate(self):
+        # Dispose creates a fresh pool; keep the counters across it.
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.wait_total, pool.wait_max = self.wait_total, self.wait_max
+        return pool
+
+    def stats(self) -> Dict:
+        capacity = self.size() + max(self._max_overflow, 0)
+        in_use = self.checkedout()
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": in_use,
+            "idle": self.checkedin(),
+            "saturation": round(in_use / capacity, 3) if capacity else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+def _async_engine_options(url) -> Dict:
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        poolclass=MeteredPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if url.get_backend_name() == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        }
+    return options
+
+
+def _build_async_engine(url: str):
+    url = to_async_url(url)
+    return create_async_engine(url, **_async_engine_options(url))
+
+
+# Sync engine: schema creation at startup only, so it holds no pool of its own.
+engine = create_engine(DATABASE_URL, poolclass=NullPool)
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -12,13 +104,53 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine: used by every request handler and background job.
+async_engine = _build_async_engine(DATABASE_URL)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Optional replica for read-only GET endpoints; falls back to the primary.
+replica_engine = _build_async_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else None
+
+ReadSessionLocal = async_sessionmaker(
+    bind=replica_engine or async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+def _pool_stats(engine) -> Optional[Dict]:
+    pool = engine.sync_engine.pool
+    return pool.stats() if isinstance(pool, MeteredPool) else None
+
+
+def pool_stats() -> Dict:
+    return {
+        "primary": _pool_stats(async_engine),
+        "replica": _pool_stats(replica_engine) if replica_engine else None,
+    }
+
+
+async def dispose_engines():
+    await async_engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
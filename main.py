@@ -1,18 +1,56 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 import os
 import uvicorn
 
 
 from api import auth, users, workspaces, papers, documents, search, ai_tools
-from models import Base, engine
+from models import Base
+from database import engine, dispose_engines, pool_stats
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.auth import user_cache, password_hash_stats
+from services.http_client import get_http_client, close_http_client
+from services.search_service import search_cache, search_cache_stats, stop_search_tasks
+from services.catalog import init_catalog_index
+from services.schema_upgrade import upgrade_schema
+from services.fulltext import init_search_index
+from services.ingestion import start_ingestion, stop_ingestion, resume_pending_extractions, pending_jobs
+from services.pdf_fetch import pdf_fetch_stats
+from services.vector_index import vector_cache_stats
+from services.ai_jobs import start_ai_workers, stop_ai_workers, resume_ai_jobs, queued_jobs
+from services.ai_stream import ttft_stats
+from services.llm_client import llm_stats, close_llm_clients
+from services.analysis_cache import analysis_cache_stats
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+init_search_index(engine)
+init_catalog_index(engine)
 
 os.makedirs("uploads", exist_ok=True)
 
-app = FastAPI(title="ResearchHub AI API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_http_client()
+    start_ingestion()
+    await resume_pending_extractions()
+    start_ai_workers()
+    await resume_ai_jobs()
+    yield
+    await stop_ai_workers()
+    await close_llm_clients()
+    await stop_ingestion()
+    await stop_search_tasks()
+    await close_http_client()
+    await search_cache.close()
+    await user_cache.close()
+    await dispose_engines()
+
+
+app = FastAPI(title="ResearchHub AI API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -46,6 +85,20 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "search_cache": search_cache_stats(),
+        "user_cache": user_cache.info(),
+        "password_hashing": password_hash_stats(),
+        "ingestion": {"pending_jobs": pending_jobs(), "pdf_fetch": pdf_fetch_stats()},
+        "ai_jobs": {"queued": queued_jobs(), **ttft_stats()},
+        "llm": llm_stats(),
+        "analysis_cache": analysis_cache_stats(),
+        "vector_cache": vector_cache_stats(),
+        "database": pool_stats()
+    }
+
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
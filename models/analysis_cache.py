@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from models import Base
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    analysis_type = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
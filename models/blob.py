@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from models import Base
+
+class PaperBlob(Base):
+    __tablename__ = "paper_blobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False)
+    file_path = Column(String, nullable=False)
+    file_size = Column(Integer)
+    ref_count = Column(Integer, default=0, nullable=False)
+    
+    
+    extraction_status = Column(String, index=True)  # pending, processing, completed, failed
+    extracted_text = Column(Text)
+    extraction_error = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    
+    papers = relationship("Paper", back_populates="blob")
@@ -0,0 +1,22 @@
+from sqlalchemy import Index, Column, Integer, String, DateTime, Text, JSON
+from datetime import datetime
+from models import Base
+
+class CatalogEntry(Base):
+    """Every upstream search result seen, kept as the search response
+    record so /api/search can answer without the upstream APIs. Shared by
+    all users, so user supplied metadata (imports) never goes in here."""
+    __tablename__ = "search_catalog"
+    __table_args__ = (
+        Index("ix_search_catalog_origin_year", "origin", "year"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, nullable=False)  # see services.search_ranking.identity_keys
+    origin = Column(String, nullable=False)  # arXiv or Crossref
+    title = Column(String, nullable=False)
+    authors_text = Column(Text)  # lowercased, for author filters
+    search_text = Column(Text)  # lowercased title and abstract
+    year = Column(Integer, index=True)
+    record = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey
+from models import Base
+
+class PaperChunk(Base):
+    __tablename__ = "paper_chunks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    blob_id = Column(Integer, ForeignKey("paper_blobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    section = Column(String, nullable=False)
+    text = Column(Text, nullable=False)
+    tokens = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from datetime import datetime
+from models import Base
+
+class PaperEmbedding(Base):
+    __tablename__ = "paper_embeddings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    paper_id = Column(Integer, ForeignKey("papers.id", ondelete="CASCADE"), nullable=False, index=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    model = Column(String, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32, little-endian
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
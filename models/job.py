@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, JSON
+from datetime import datetime
+from models import Base
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String, nullable=False)  # summary, insights, literature_review
+    status = Column(String, index=True, nullable=False, default="queued")  # queued, running, completed, failed
+    progress = Column(Float, default=0.0)
+    payload = Column(JSON, default=dict)
+    error = Column(Text)
+    
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=1, nullable=False)
+    
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    analysis_id = Column(Integer, ForeignKey("analyses.id", ondelete="SET NULL"), nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    next_run_at = Column(DateTime)
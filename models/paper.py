@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, UniqueConstraint, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy.orm import relationship, query_expression
 from datetime import datetime
 from models import Base
 
 class Paper(Base):
     __tablename__ = "papers"
+    __table_args__ = (
+        Index("ix_papers_owner_id_id", "owner_id", "id"),
+        # A DOI identifies a paper within one user's library; imports
+        # upsert on it.
+        UniqueConstraint("owner_id", "doi", name="uq_papers_owner_id_doi"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -13,7 +19,7 @@ class Paper(Base):
     source = Column(String)  
     source_url = Column(String)
     pdf_url = Column(String)
-    doi = Column(String, unique=True, index=True)
+    doi = Column(String, index=True)
     publication_date = Column(DateTime)
     citation_count = Column(Integer, default=0)
     tags = Column(JSON, default=list)
@@ -22,6 +28,10 @@ class Paper(Base):
     file_path = Column(String)
     extracted_text = Column(Text)
     file_size = Column(Integer)
+    content_hash = Column(String(64), index=True)  # sha256 of the uploaded file
+    blob_id = Column(Integer, ForeignKey("paper_blobs.id"), nullable=True, index=True)
+    extraction_status = Column(String, index=True)  # pending, processing, completed, failed
+    extraction_error = Column(Text)
     
     
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -29,7 +39,11 @@ class Paper(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Filled by utils.aggregates.with_analyzed_flag
+    analyzed = query_expression()
+    
     
     owner = relationship("User", back_populates="papers")
+    blob = relationship("PaperBlob", back_populates="papers")
     workspaces = relationship("Workspace", secondary="workspace_papers", back_populates="papers")
     analyses = relationship("Analysis", back_populates="paper", cascade="all, delete-orphan")
\ No newline at end of file
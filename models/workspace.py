@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy.orm import relationship, query_expression
 from datetime import datetime
 from models import Base
 
@@ -7,12 +7,15 @@ from models import Base
 workspace_papers = Table(
     "workspace_papers",
     Base.metadata,
-    Column("workspace_id", Integer, ForeignKey("workspaces.id")),
-    Column("paper_id", Integer, ForeignKey("papers.id"))
+    Column("workspace_id", Integer, ForeignKey("workspaces.id"), index=True),
+    Column("paper_id", Integer, ForeignKey("papers.id"), index=True)
 )
 
 class Workspace(Base):
     __tablename__ = "workspaces"
+    __table_args__ = (
+        Index("ix_workspaces_owner_id_id", "owner_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -22,6 +25,9 @@ class Workspace(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Filled by utils.aggregates.with_paper_counts
+    papers_count = query_expression()
+    
    
     owner = relationship("User", back_populates="workspaces")
     papers = relationship("Paper", secondary=workspace_papers, back_populates="workspaces")
@@ -20,4 +20,20 @@ class AnalysisResponse(AnalysisBase):
     model_config = ConfigDict(
         from_attributes=True,
         populate_by_name=True
-    )
\ No newline at end of file
+    )
+
+class AIJobResponse(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    progress: float = 0.0
+    error: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 1
+    analysis_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -1,7 +1,9 @@
 # schemas/common.py
 
 from pydantic import BaseModel
+from typing import Optional
 
 class BackgroundTaskResponse(BaseModel):
     message: str
-    status: str
\ No newline at end of file
+    status: str
+    job_id: Optional[int] = None
\ No newline at end of file
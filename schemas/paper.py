@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional, List, Dict
 
@@ -19,16 +19,33 @@ class PaperResponse(PaperBase):
     id: int
     file_path: Optional[str] = None
     file_size: Optional[int] = None
+    extraction_status: Optional[str] = None
     owner_id: int
     is_public: bool
     created_at: datetime
     citation_count: int
+    analyzed: Optional[bool] = None
     
     class Config:
         from_attributes = True
 
 class PaperDetailResponse(PaperResponse):
     extracted_text: Optional[str] = None
+
+class PaperSearchHit(PaperResponse):
+    rank: float = 0.0
+    snippet: Optional[str] = None
+
+class RelatedPaperResponse(PaperResponse):
+    score: float = 0.0
+
+class PaperExtractionStatus(BaseModel):
+    id: int
+    extraction_status: Optional[str] = None
+    extraction_error: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
     
 class PaperSearchParams(BaseModel):
     query: str
@@ -36,4 +53,35 @@ class PaperSearchParams(BaseModel):
     year_from: Optional[int] = None
     year_to: Optional[int] = None
     author: Optional[str] = None
-    max_results: int = 20
\ No newline at end of file
+    max_results: int = 20  # page size
+    cursor: Optional[str] = None  # next_cursor from the previous page
+
+class PaperImport(BaseModel):
+    # Same shape as a search result (see services.search_service).
+    title: str
+    authors: List[str] = []
+    abstract: Optional[str] = None
+    source: Optional[str] = None
+    url: Optional[str] = None
+    pdf_url: Optional[str] = None
+    doi: Optional[str] = None
+    date: Optional[datetime] = None
+    citations: int = 0
+    tags: List[str] = []
+    workspace_id: Optional[int] = None
+
+    @field_validator("date", mode="before")
+    @classmethod
+    def parse_date(cls, value):
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d") if value else None
+        return value
+
+class BulkImportRequest(BaseModel):
+    papers: List[PaperImport] = Field(..., min_length=1, max_length=1000)
+    workspace_id: Optional[int] = None
+
+class BulkImportResponse(BaseModel):
+    created: int
+    updated: int
+    paper_ids: List[int]
@@ -0,0 +1,299 @@
+import asyncio
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from config import settings
+from database import AsyncSessionLocal
+from models.analysis import Analysis
+from models.job import AIJob
+from models.paper import Paper
+from services.ai_service import REVIEW_MAX_TOKENS, generate_literature_review
+from services.chunk_index import paper_chunks
+from services.context_budget import fit_chunks, prompt_budget, select_chunks
+from services.map_reduce import map_reduce_summaries, map_reduce_insights
+from services.llm_client import LLMError
+from services.ai_stream import open_stream, get_stream, token_sink, section_sink, close_stream
+from services.analysis_cache import analysis_cache_key, lookup_analysis, store_analysis
+
+# Jobs are rows in ai_jobs; the queue below only carries ids, so anything
+# lost with the process is picked up again by resume_ai_jobs.
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+_timers: Set[asyncio.Task] = set()
+
+
+def start_ai_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue()
+        for _ in range(settings.AI_JOB_CONCURRENCY):
+            _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_ai_workers():
+    global _queue
+    tasks = _workers + list(_timers)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+    _timers.clear()
+    _queue = None
+
+
+def queued_jobs() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+
+async def _dispatch_later(job_id: int, delay: float):
+    await asyncio.sleep(delay)
+    _queue.put_nowait(job_id)
+
+
+def _dispatch(job_id: int, delay: float = 0.0):
+    start_ai_workers()
+    if delay <= 0:
+        _queue.put_nowait(job_id)
+        return
+    task = asyncio.create_task(_dispatch_later(job_id, delay))
+    _timers.add(task)
+    task.add_done_callback(_timers.discard)
+
+
+class EmptyJobInput(Exception):
+    """None of the job's papers have anything to analyse. Not retried."""
+
+
+async def _text_inputs(db: AsyncSession, papers: List[Paper]) -> Dict:
+    # A fixed budget per paper, independent of how many are analysed
+    # together, so per-paper summaries stay cacheable across analyses.
+    chunked = [(p, chunks) for p, chunks in zip(papers, await paper_chunks(db, papers)) if chunks]
+    return {
+        "texts": [select_chunks(chunks, settings.PAPER_SUMMARY_INPUT_TOKENS) for _, chunks in chunked],
+        "titles": [p.title for p, _ in chunked]
+    }
+
+
+async def _review_inputs(db: AsyncSession, papers: List[Paper]) -> Dict:
+    # All papers share one prompt, so they share its context budget.
+    texts = fit_chunks(await paper_chunks(db, papers), prompt_budget(REVIEW_MAX_TOKENS, len(papers)))
+    return {"paper_data": [{
+        "title": p.title,
+        "authors": p.authors,
+        "text": text,
+        "year": p.publication_date.year if p.publication_date else None
+    } for p, text in zip(papers, texts)]}
+
+
+class JobType(NamedTuple):
+    inputs: Callable[[AsyncSession, List[Paper]], Awaitable[Dict]]
+    generate: Callable[..., Awaitable[str]]
+    title: str
+    reports_progress: bool = False
+    streams_sections: bool = False
+
+
+JOB_TYPES: Dict[str, JobType] = {
+    "summary": JobType(_text_inputs, map_reduce_summaries, "Summary of {} papers", reports_progress=True),
+    "insights": JobType(
+        _text_inputs, map_reduce_insights, "Insights from {} papers", reports_progress=True, streams_sections=True
+    ),
+    "literature_review": JobType(_review_inputs, generate_literature_review, "Literature Review of {} papers"),
+}
+
+
+def _analysis(job_type: str, user_id: int, paper_ids: List[int], inputs: Dict, content: str, cached: bool) -> Analysis:
+    metadata = {"paper_ids": paper_ids}
+    if "titles" in inputs:
+        metadata["paper_titles"] = inputs["titles"]
+    else:
+        metadata["paper_count"] = len(paper_ids)
+    if cached:
+        metadata["cached"] = True
+    return Analysis(
+        analysis_type=job_type,
+        title=JOB_TYPES[job_type].title.format(len(paper_ids)),
+        content=content,
+        analysis_metadata=metadata,
+        user_id=user_id
+    )
+
+
+async def _owned_papers(db: AsyncSession, user_id: int, paper_ids: List[int]) -> List[Paper]:
+    # Text comes from the chunk index, not the full extracted_text column.
+    result = await db.execute(select(Paper).options(defer(Paper.extracted_text)).where(
+        Paper.id.in_(paper_ids),
+        Paper.owner_id == user_id
+    ))
+    return result.scalars().all()
+
+
+async def submit_job(db: AsyncSession, user_id: int, job_type: str, paper_ids: List[int], papers: List[Paper]) -> AIJob:
+    # Identical inputs already analysed by the same model and prompt are
+    # answered from the cache as an already-completed job.
+    inputs = await JOB_TYPES[job_type].inputs(db, papers)
+    try:
+        content = await lookup_analysis(db, analysis_cache_key(job_type, inputs))
+    except LLMError:
+        # No usable provider: the job is queued anyway and fails with the
+        # configuration error.
+        content = None
+    if content is not None:
+        analysis = _analysis(job_type, user_id, paper_ids, inputs, content, cached=True)
+        db.add(analysis)
+        await db.flush()
+        now = datetime.utcnow()
+        job = AIJob(
+            job_type=job_type,
+            status="completed",
+            progress=1.0,
+            payload={"paper_ids": paper_ids},
+            analysis_id=analysis.id,
+            user_id=user_id,
+            started_at=now,
+            finished_at=now
+        )
+        db.add(job)
+        await db.commit()
+        return job
+
+    job = AIJob(
+        job_type=job_type,
+        status="queued",
+        payload={"paper_ids": paper_ids},
+        max_attempts=settings.AI_JOB_MAX_ATTEMPTS,
+        user_id=user_id
+    )
+    db.add(job)
+    await db.commit()
+    open_stream(job.id)
+    _dispatch(job.id)
+    return job
+
+
+async def report_progress(job_id: int, progress: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(AIJob).where(AIJob.id == job_id).values(progress=progress))
+        await db.commit()
+
+
+async def _execute(db: AsyncSession, job: AIJob) -> Analysis:
+    job_id, name, user_id = job.id, job.job_type, job.user_id
+    paper_ids = job.payload.get("paper_ids", [])
+    inputs = await JOB_TYPES[name].inputs(db, await _owned_papers(db, user_id, paper_ids))
+    if not any(inputs.values()):
+        # Papers deleted or emptied since submission: an empty result
+        # must not be generated, let alone cached.
+        raise EmptyJobInput("None of the papers have text content")
+    key = analysis_cache_key(name, inputs)
+
+    # Checked again here: an identical job may have finished while this
+    # one was queued.
+    content = await lookup_analysis(db, key, record=False)
+    cached = content is not None
+    if cached:
+        token_sink(job_id)(content)
+    else:
+        await report_progress(job_id, 0.1)
+        options = {"on_token": token_sink(job_id)}
+        if JOB_TYPES[name].reports_progress:
+            options["on_progress"] = partial(report_progress, job_id)
+        if JOB_TYPES[name].streams_sections:
+            options["on_section"] = section_sink(job_id)
+        content = await JOB_TYPES[name].generate(**inputs, **options)
+        await store_analysis(db, key, name, content)
+    return _analysis(name, user_id, paper_ids, inputs, content, cached)
+
+
+async def _claim(db: AsyncSession, job_id: int) -> Optional[AIJob]:
+    # Only one worker (in any process) can move a job out of "queued".
+    claimed = await db.execute(update(AIJob).where(
+        AIJob.id == job_id,
+        AIJob.status == "queued"
+    ).values(
+        status="running",
+        attempts=AIJob.attempts + 1,
+        started_at=datetime.utcnow(),
+        next_run_at=None
+    ))
+    await db.commit()
+    if claimed.rowcount != 1:
+        return None
+    return await db.get(AIJob, job_id)
+
+
+async def _run_job(job_id: int):
+    async with AsyncSessionLocal() as db:
+        job = await _claim(db, job_id)
+        if job is None:
+            return
+        attempts, max_attempts = job.attempts, job.max_attempts
+
+        try:
+            analysis = await _execute(db, job)
+            db.add(analysis)
+            await db.flush()
+            job.analysis_id = analysis.id
+            job.status = "completed"
+            job.progress = 1.0
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            close_stream(job_id, "done", {"status": "completed", "analysis_id": analysis.id})
+            return
+        except Exception as e:
+            print(f"Error running {job.job_type} job {job_id} (attempt {attempts}): {e}")
+            await db.rollback()
+            error = str(e)
+            # LLMClient has already retried transient provider errors.
+            retryable = not isinstance(e, EmptyJobInput) and getattr(e, "retryable", True)
+
+        if retryable and attempts < max_attempts:
+            delay = settings.AI_JOB_RETRY_BACKOFF * 2 ** (attempts - 1)
+            values = {"status": "queued", "error": error, "next_run_at": datetime.utcnow() + timedelta(seconds=delay)}
+        else:
+            delay = None
+            values = {"status": "failed", "error": error, "finished_at": datetime.utcnow()}
+        await db.execute(update(AIJob).where(AIJob.id == job_id).values(**values))
+        await db.commit()
+
+    if delay is None:
+        close_stream(job_id, "error", {"status": "failed", "error": error})
+        return
+    stream = get_stream(job_id)
+    if stream is not None:
+        stream.restart(error)
+    _dispatch(job_id, delay)
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_job(job_id)
+        except Exception as e:
+            print(f"Error running AI job {job_id}: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def resume_ai_jobs():
+    # Jobs that were running when the process stopped are retried from the
+    # start; queued ones keep their backoff schedule.
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(AIJob).where(AIJob.status == "running").values(status="queued"))
+        await db.commit()
+        result = await db.execute(
+            select(AIJob.id, AIJob.next_run_at).where(AIJob.status == "queued").order_by(AIJob.id)
+        )
+        pending = result.all()
+
+    now = datetime.utcnow()
+    for job_id, next_run_at in pending:
+        _dispatch(job_id, (next_run_at - now).total_seconds() if next_run_at else 0.0)
@@ -1,59 +1,46 @@
 import os
 import json
-from typing import List, Dict
-from groq import Groq
+from typing import List, Dict, Optional
 from config import settings
+from services.llm_client import TokenCallback, get_llm_client
+from services.context_budget import fit_texts, prompt_budget, truncate_tokens
 
-groq_client = Groq(api_key=settings.GROQ_API_KEY)
+# Bump whenever a prompt below changes: it is part of the analysis cache key.
+PROMPT_VERSION = "3"
 
+INSIGHTS_MAX_TOKENS = 2500
+REVIEW_MAX_TOKENS = 3000
 
-def generate_summaries(texts: List[str], titles: List[str]) -> str:
-    papers_block = []
-
-    for i in range(len(texts)):
-        block = (
-            f"Paper {i+1}: {titles[i]}\n"
-            f"Abstract/Text: {texts[i][:1000]}..."
-        )
-        papers_block.append(block)
 
-    combined_papers = "\n\n".join(papers_block)
-
-    prompt = f"""Please provide concise summaries of the following research papers:
-
-{combined_papers}
+async def summarize_paper(title: str, text: str, on_token: Optional[TokenCallback] = None) -> str:
+    # Map step: one paper at a time, so the result can be cached per paper.
+    # Callers pass the paper's selected chunks; the cut only guards the limit.
+    prompt = f"""Summarize the following research paper in at most 200 words, covering its key contributions, methods, and findings.
 
-Please provide a well-structured summary for each paper, highlighting the key contributions, methods, and findings.
+Title: {title}
+Text: {truncate_tokens(text, settings.PAPER_SUMMARY_INPUT_TOKENS)}
 """
 
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a research assistant specializing in summarizing academic papers."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error generating summary: {str(e)}"
-
+    return await get_llm_client().complete(
+        "You are a research assistant specializing in summarizing academic papers.",
+        prompt,
+        temperature=0.3,
+        max_tokens=400,
+        on_token=on_token
+    )
 
-def extract_insights(texts: List[str], titles: List[str]) -> str:
-    papers_block = []
 
-    for i in range(len(texts)):
-        block = (
-            f"Paper {i+1}: {titles[i]}\n"
-            f"Abstract/Text: {texts[i][:1000]}..."
-        )
-        papers_block.append(block)
+async def extract_insights_from_summaries(summaries: List[str], titles: List[str], on_token: Optional[TokenCallback] = None) -> str:
+    # Reduce step for insights: works from per-paper summaries, not full text.
+    summaries = fit_texts(summaries, prompt_budget(INSIGHTS_MAX_TOKENS, len(summaries)))
+    papers_block = [
+        f"Paper {i+1}: {titles[i]}\nSummary: {summaries[i]}"
+        for i in range(len(summaries))
+    ]
 
     combined_papers = "\n\n".join(papers_block)
 
-    prompt = f"""Extract the most important insights and trends from the following research papers:
+    prompt = f"""Extract the most important insights and trends from the following research paper summaries:
 
 {combined_papers}
 
@@ -65,22 +52,18 @@ Please identify:
 5. Potential applications
 """
 
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a research analyst extracting key insights from academic literature."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4,
-            max_tokens=2500
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error extracting insights: {str(e)}"
+    return await get_llm_client().complete(
+        "You are a research analyst extracting key insights from academic literature.",
+        prompt,
+        temperature=0.4,
+        max_tokens=INSIGHTS_MAX_TOKENS,
+        on_token=on_token
+    )
 
 
-def generate_literature_review(paper_data: List[Dict]) -> str:
+async def generate_literature_review(paper_data: List[Dict], on_token: Optional[TokenCallback] = None) -> str:
+    # Each paper's text is already fitted to the context budget, abstract
+    # first (see ai_jobs._review_inputs).
     papers_block = []
 
     for i, paper in enumerate(paper_data):
@@ -88,8 +71,7 @@ def generate_literature_review(paper_data: List[Dict]) -> str:
             f"Paper {i+1}: {paper['title']}\n"
             f"Authors: {', '.join(paper['authors'])}\n"
             f"Year: {paper.get('year', 'N/A')}\n"
-            f"Abstract: {paper.get('abstract', 'N/A')}\n"
-            f"Key Content: {paper.get('text', '')[:1500]}...\n"
+            f"Key Content: {paper.get('text', '')}\n"
         )
         papers_block.append(block)
 
@@ -109,16 +91,10 @@ The literature review should include:
 Write in formal academic style with proper transitions between sections.
 """
 
-    try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an academic researcher writing a comprehensive literature review."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=3000
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error generating literature review: {str(e)}"
\ No newline at end of file
+    return await get_llm_client().complete(
+        "You are an academic researcher writing a comprehensive literature review.",
+        prompt,
+        temperature=0.3,
+        max_tokens=REVIEW_MAX_TOKENS,
+        on_token=on_token
+    )
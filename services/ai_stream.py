@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+Event = Tuple[str, object]
+
+
+class JobStream:
+    """Fan-out of one job's LLM output to any number of SSE subscribers.
+
+    Text produced so far is buffered, so a client that connects late still
+    receives the whole response, along with any intermediate sections (such
+    as per-paper summaries) sent so far. All methods run on the event loop
+    thread."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.sections: List[Dict] = []
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def _broadcast(self, event: Optional[Event]):
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def token(self, text: str):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.chunks.append(text)
+        self._broadcast(("token", {"text": text}))
+
+    def section(self, data: Dict):
+        self.sections.append(data)
+        self._broadcast(("section", data))
+
+    def restart(self, error: str):
+        # A failed attempt will be retried; subscribers drop what they have.
+        self.chunks.clear()
+        self.sections.clear()
+        self._broadcast(("retry", {"error": error}))
+
+    def close(self, event: str, data: object):
+        self._broadcast((event, data))
+        self._broadcast(None)
+
+    async def events(self) -> AsyncIterator[Event]:
+        # Subscribe before replaying so nothing published meanwhile is lost.
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            for data in self.sections:
+                yield ("section", data)
+            if self.chunks:
+                yield ("token", {"text": "".join(self.chunks)})
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+def format_sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_streams: Dict[int, JobStream] = {}
+_ttft_count = 0
+_ttft_total = 0.0
+_ttft_max = 0.0
+
+
+def open_stream(job_id: int) -> JobStream:
+    stream = _streams.get(job_id)
+    if stream is None:
+        stream = _streams[job_id] = JobStream()
+    return stream
+
+
+def get_stream(job_id: int) -> Optional[JobStream]:
+    return _streams.get(job_id)
+
+
+def token_sink(job_id: int):
+    # Callback for the LLM client: each streamed delta goes to the job's
+    # subscribers.
+    return open_stream(job_id).token
+
+
+def section_sink(job_id: int):
+    return open_stream(job_id).section
+
+
+def close_stream(job_id: int, event: str, data: object):
+    global _ttft_count, _ttft_total, _ttft_max
+    stream = _streams.pop(job_id, None)
+    if stream is None:
+        return
+    if stream.first_token_at is not None:
+        ttft = stream.first_token_at - stream.started_at
+        _ttft_count += 1
+        _ttft_total += ttft
+        _ttft_max = max(_ttft_max, ttft)
+    stream.close(event, data)
+
+
+def ttft_stats() -> Dict:
+    return {
+        "streams": len(_streams),
+        "ttft_count": _ttft_count,
+        "ttft_avg_ms": round(_ttft_total / _ttft_count * 1000, 1) if _ttft_count else 0.0,
+        "ttft_max_ms": round(_ttft_max * 1000, 1),
+    }
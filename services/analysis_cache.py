@@ -0,0 +1,95 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.analysis_cache import AnalysisCacheEntry
+from services.ai_service import PROMPT_VERSION
+from services.llm_client import get_llm_client
+from utils.cache import CacheStats
+
+_stats = CacheStats()
+
+
+def current_model() -> str:
+    provider = get_llm_client().provider
+    return f"{provider.name}:{provider.model}"
+
+
+def analysis_cache_key(analysis_type: str, inputs: Dict[str, Any]) -> str:
+    # Inputs are exactly what the prompt is built from, so equal keys mean
+    # equal prompts for the same model and prompt version.
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+    raw = json.dumps([analysis_type, current_model(), PROMPT_VERSION, digest])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def lookup_analysis(db: AsyncSession, key: str, record: bool = True) -> Optional[str]:
+    # record=False for re-checks of a request already counted once.
+    result = await db.execute(select(AnalysisCacheEntry).where(AnalysisCacheEntry.cache_key == key))
+    entry = result.scalars().first()
+    if entry is None:
+        _stats.misses += record
+        return None
+
+    now = datetime.utcnow()
+    if entry.created_at < now - timedelta(seconds=settings.ANALYSIS_CACHE_TTL):
+        await db.delete(entry)
+        await db.commit()
+        _stats.expirations += 1
+        _stats.misses += record
+        return None
+
+    await db.execute(update(AnalysisCacheEntry).where(AnalysisCacheEntry.id == entry.id).values(
+        hits=AnalysisCacheEntry.hits + 1,
+        last_used_at=now
+    ))
+    await db.commit()
+    _stats.hits += record
+    return entry.content
+
+
+async def store_analysis(db: AsyncSession, key: str, analysis_type: str, content: str):
+    model = current_model()
+    db.add(AnalysisCacheEntry(
+        cache_key=key,
+        analysis_type=analysis_type,
+        model=model,
+        prompt_version=PROMPT_VERSION,
+        content=content
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another job stored the same analysis first.
+        await db.rollback()
+        return
+    await _evict(db)
+
+
+async def _evict(db: AsyncSession):
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.ANALYSIS_CACHE_TTL)
+    expired = await db.execute(delete(AnalysisCacheEntry).where(AnalysisCacheEntry.created_at < cutoff))
+    # Least recently used entries beyond the size limit.
+    overflow = await db.execute(delete(AnalysisCacheEntry).where(AnalysisCacheEntry.id.in_(
+        select(AnalysisCacheEntry.id)
+        .order_by(AnalysisCacheEntry.last_used_at.desc(), AnalysisCacheEntry.id.desc())
+        .offset(settings.ANALYSIS_CACHE_MAX_ENTRIES)
+        .scalar_subquery()
+    )))
+    await db.commit()
+    _stats.expirations += expired.rowcount or 0
+    _stats.evictions += overflow.rowcount or 0
+
+
+def analysis_cache_stats() -> Dict[str, Any]:
+    return {
+        "max_entries": settings.ANALYSIS_CACHE_MAX_ENTRIES,
+        "ttl": settings.ANALYSIS_CACHE_TTL,
+        **_stats.as_dict()
+    }
@@ -0,0 +1,112 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import AsyncSessionLocal, ReadSessionLocal
+from models.catalog import CatalogEntry
+from services.search_ranking import identity_keys
+
+# Postgres: GIN expression index for the catalog's text queries. Other
+# databases fall back to one LIKE per query term.
+PG_CATALOG_DOCUMENT = "to_tsvector('english', coalesce(search_text, ''))"
+
+
+def init_catalog_index(engine):
+    with engine.begin() as conn:
+        # Rows recorded from user imports by earlier versions were visible
+        # to every user's searches.
+        conn.execute(text("DELETE FROM search_catalog WHERE origin = 'import'"))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_search_catalog_text ON search_catalog USING GIN (({PG_CATALOG_DOCUMENT}))"
+            ))
+
+
+def _year(result: Dict) -> Optional[int]:
+    match = re.match(r"\d{4}", result.get("date") or "")
+    return int(match.group(0)) if match else None
+
+
+def _row(origin: str, result: Dict, now: datetime) -> Optional[Dict]:
+    keys = identity_keys(result)
+    if not keys or not result.get("title"):
+        return None
+    record = {k: v for k, v in result.items() if k != "score"}
+    return {
+        "key": keys[0],
+        "origin": origin,
+        "title": result["title"],
+        "authors_text": " ".join(result.get("authors") or []).lower(),
+        "search_text": f"{result['title']} {result.get('abstract') or ''}".lower(),
+        "year": _year(result),
+        "record": record,
+        "fetched_at": now,
+    }
+
+
+async def record_results(origin: str, results: List[Dict]):
+    # Upserts on the identity key, so the catalog keeps the latest copy of
+    # each paper. Only upstream results are recorded: the catalog answers
+    # every user's searches. Never fails the caller.
+    now = datetime.utcnow()
+    rows = {}
+    for result in results:
+        row = _row(origin, result, now)
+        if row:
+            rows[row["key"]] = row
+    if not rows:
+        return
+
+    try:
+        async with AsyncSessionLocal() as db:
+            dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+            stmt = dialect.insert(CatalogEntry).values(list(rows.values()))
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[CatalogEntry.key],
+                set_={column: stmt.excluded[column] for column in (
+                    "origin", "title", "authors_text", "search_text", "year", "record", "fetched_at"
+                )}
+            ))
+            await db.commit()
+    except Exception as e:
+        print(f"Error recording {len(rows)} {origin} results in the catalog: {e}")
+
+
+async def catalog_search(params, limit: int) -> List[Dict]:
+    """Catalog records matching the search params, most recently fetched
+    first. Relevance ranking is left to the caller."""
+    terms = re.findall(r"\w+", (params.query or "").lower())[:8]
+    if not terms:
+        return []
+
+    try:
+        return await _catalog_query(params, terms, limit)
+    except Exception as e:
+        print(f"Catalog search failed: {e}")
+        return []
+
+
+async def _catalog_query(params, terms: List[str], limit: int) -> List[Dict]:
+    async with ReadSessionLocal() as db:
+        stmt = select(CatalogEntry.record)
+        if db.bind.dialect.name == "postgresql":
+            stmt = stmt.where(
+                text(f"{PG_CATALOG_DOCUMENT} @@ websearch_to_tsquery('english', :query)").bindparams(query=params.query)
+            )
+        else:
+            for term in terms:
+                stmt = stmt.where(CatalogEntry.search_text.contains(term, autoescape=True))
+        if params.author:
+            stmt = stmt.where(CatalogEntry.authors_text.contains(params.author.lower(), autoescape=True))
+        if params.year_from:
+            stmt = stmt.where(CatalogEntry.year >= params.year_from)
+        if params.year_to:
+            stmt = stmt.where(CatalogEntry.year <= params.year_to)
+        if params.source == "arXiv":
+            stmt = stmt.where(CatalogEntry.origin == "arXiv")
+
+        result = await db.execute(stmt.order_by(CatalogEntry.fetched_at.desc()).limit(limit))
+        return list(result.scalars().all())
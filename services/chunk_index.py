@@ -0,0 +1,67 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.chunk import PaperChunk
+from models.paper import Paper
+from services.context_budget import Chunk, build_chunks
+from utils.aggregates import join_blob, paper_text
+
+
+async def store_chunks(db: AsyncSession, blob_id: int, chunks: List[Chunk]):
+    await db.execute(delete(PaperChunk).where(PaperChunk.blob_id == blob_id))
+    db.add_all([
+        PaperChunk(
+            blob_id=blob_id,
+            position=chunk.position,
+            section=chunk.section,
+            text=chunk.text,
+            tokens=chunk.tokens,
+            score=chunk.score
+        )
+        for chunk in chunks
+    ])
+    await db.commit()
+
+
+async def remove_chunks(db: AsyncSession, blob_id: int):
+    await db.execute(delete(PaperChunk).where(PaperChunk.blob_id == blob_id))
+    await db.commit()
+
+
+def _abstract_chunks(abstract: str) -> List[Chunk]:
+    # Kept ahead of the body in reading order.
+    return [chunk._replace(position=chunk.position - 10000) for chunk in build_chunks(abstract, "abstract")]
+
+
+async def paper_chunks(db: AsyncSession, papers: List[Paper]) -> List[List[Chunk]]:
+    # One query for every indexed paper; text that predates the index is
+    # chunked on the fly. Paper.extracted_text may be deferred.
+    indexed: Dict[int, List[Chunk]] = defaultdict(list)
+    blob_ids = {p.blob_id for p in papers if p.blob_id and p.extraction_status == "completed"}
+    if blob_ids:
+        result = await db.execute(
+            select(PaperChunk).where(PaperChunk.blob_id.in_(blob_ids)).order_by(PaperChunk.blob_id, PaperChunk.position)
+        )
+        for row in result.scalars():
+            indexed[row.blob_id].append(Chunk(row.position, row.section, row.text, row.tokens, row.score))
+
+    # Includes papers with no blob at all, whose text was stored directly.
+    unindexed = [p.id for p in papers if not indexed.get(p.blob_id)]
+    texts = {}
+    if unindexed:
+        result = await db.execute(join_blob(select(Paper.id, paper_text().label("extracted_text"))).where(
+            Paper.id.in_(unindexed),
+            paper_text().isnot(None)
+        ))
+        texts = {row.id: build_chunks(row.extracted_text or "") for row in result.all()}
+
+    chunked = []
+    for paper in papers:
+        chunks = list(indexed.get(paper.blob_id) or texts.get(paper.id) or [])
+        if paper.abstract and not any(chunk.section == "abstract" for chunk in chunks):
+            chunks = _abstract_chunks(paper.abstract) + chunks
+        chunked.append(chunks)
+    return chunked
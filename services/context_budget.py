@@ -0,0 +1,172 @@
+import re
+from typing import List, NamedTuple, Sequence
+
+from config import settings
+from services.llm_client import estimate_tokens
+
+
+class Chunk(NamedTuple):
+    position: int
+    section: str
+    text: str
+    tokens: int
+    score: float
+
+
+# Informativeness prior per section; references and acknowledgements are
+# dropped entirely.
+SECTION_WEIGHTS = {
+    "abstract": 3.0,
+    "conclusion": 2.5,
+    "introduction": 2.0,
+    "results": 1.6,
+    "discussion": 1.6,
+    "methods": 1.2,
+    "body": 1.0,
+    "front": 0.3,
+}
+
+_SECTION_NAMES = {
+    "abstract": "abstract",
+    "introduction": "introduction",
+    "background": "introduction",
+    "related work": "introduction",
+    "method": "methods",
+    "methods": "methods",
+    "methodology": "methods",
+    "approach": "methods",
+    "experiment": "results",
+    "experiments": "results",
+    "result": "results",
+    "results": "results",
+    "evaluation": "results",
+    "discussion": "discussion",
+    "conclusion": "conclusion",
+    "conclusions": "conclusion",
+    "future work": "conclusion",
+    "limitations": "conclusion",
+    "references": None,
+    "bibliography": None,
+    "acknowledgments": None,
+    "acknowledgements": None,
+}
+
+_HEADING_RE = re.compile(
+    r"^(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*(" + "|".join(sorted(_SECTION_NAMES, key=len, reverse=True)) + r")\b[\s:.]*$",
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r"[A-Za-z]{4,}")
+
+_encoding = None
+
+
+def _tokenizer():
+    # tiktoken is optional; without it token counts use the estimate.
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"Falling back to estimated token counts: {e}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _tokenizer()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    if limit <= 0:
+        return ""
+    encoding = _tokenizer()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= limit else encoding.decode(tokens[:limit])
+    return text[:limit * 4]
+
+
+def _sections(text: str, default: str):
+    section, lines = default, []
+    for line in text.splitlines():
+        match = _HEADING_RE.match(line.strip()) if len(line) < 60 else None
+        if match:
+            if lines:
+                yield section, lines
+            section, lines = _SECTION_NAMES[match.group(1).lower()], []
+        else:
+            lines.append(line)
+    if lines:
+        yield section, lines
+
+
+def _score(section: str, text: str, first: bool) -> float:
+    words = _WORD_RE.findall(text.lower())
+    diversity = len(set(words)) / len(words) if words else 0.0
+    return round(SECTION_WEIGHTS[section] * (0.6 + 0.4 * diversity) + (0.2 if first else 0.0), 4)
+
+
+def build_chunks(text: str, default_section: str = "front", chunk_tokens: int = None) -> List[Chunk]:
+    # Runs once per document at ingestion time (see services/chunk_index).
+    chunk_words = max(int((chunk_tokens or settings.CONTEXT_CHUNK_TOKENS) * 0.75), 1)
+    has_headings = any(_HEADING_RE.match(line.strip()) for line in text.splitlines() if len(line) < 60)
+    if not has_headings and default_section == "front":
+        default_section = "body"
+
+    chunks = []
+    for section, lines in _sections(text, default_section):
+        if section is None:
+            continue
+        words = " ".join(lines).split()
+        for start in range(0, len(words), chunk_words):
+            piece = " ".join(words[start:start + chunk_words])
+            chunks.append(Chunk(len(chunks), section, piece, count_tokens(piece), _score(section, piece, start == 0)))
+    return chunks
+
+
+def select_chunks(chunks: Sequence[Chunk], budget: int) -> str:
+    # Most informative chunks first, then restored to reading order.
+    chosen, used = [], 0
+    for chunk in sorted(chunks, key=lambda c: (-c.score, c.position)):
+        if used + chunk.tokens <= budget:
+            chosen.append(chunk)
+            used += chunk.tokens
+    if not chosen and chunks and budget > 0:
+        best = max(chunks, key=lambda c: (c.score, -c.position))
+        return truncate_tokens(best.text, budget)
+    return "\n...\n".join(chunk.text for chunk in sorted(chosen, key=lambda c: c.position))
+
+
+def allocate_budget(sizes: Sequence[int], budget: int) -> List[int]:
+    # Water-filling: an even share each, with whatever small documents
+    # don't use handed on to the larger ones.
+    shares = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for rank, index in enumerate(order):
+        share = min(sizes[index], remaining // (len(order) - rank))
+        shares[index] = share
+        remaining -= share
+    return shares
+
+
+def prompt_budget(max_tokens: int, papers: int) -> int:
+    # Context left for paper text after the reply, the instructions and a
+    # per-paper header.
+    overhead = settings.CONTEXT_PROMPT_OVERHEAD + 40 * papers
+    return max(settings.LLM_CONTEXT_TOKENS - max_tokens - overhead, 0)
+
+
+def fit_chunks(papers: Sequence[Sequence[Chunk]], budget: int) -> List[str]:
+    shares = allocate_budget([sum(c.tokens for c in chunks) for chunks in papers], budget)
+    return [select_chunks(chunks, share) for chunks, share in zip(papers, shares)]
+
+
+def fit_texts(texts: Sequence[str], budget: int, default_section: str = "body") -> List[str]:
+    # For text with no chunk index (e.g. generated summaries).
+    return fit_chunks([build_chunks(text or "", default_section) for text in texts], budget)
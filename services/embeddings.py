@@ -0,0 +1,100 @@
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+
+def chunk_text(text: str, chunk_words: int = None, overlap: int = None) -> List[str]:
+    chunk_words = chunk_words or settings.EMBEDDING_CHUNK_WORDS
+    overlap = overlap if overlap is not None else settings.EMBEDDING_CHUNK_OVERLAP
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks[:settings.EMBEDDING_MAX_CHUNKS]
+
+
+class HashingEmbedder:
+    """Offline fallback: signed feature hashing of unigrams and bigrams with
+    sublinear term frequency, L2-normalized. Deterministic across processes."""
+
+    name = "hashing-v1"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = _TOKEN_RE.findall(text.lower())
+            counts = {}
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                index, sign = self._bucket(feature)
+                matrix[row, index] += sign * (1.0 + np.log(count))
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self._model.encode(texts, batch_size=32, show_progress_bar=False)
+        return _normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+_embedder = None
+
+
+def get_embedder():
+    # A local CPU model is used when configured and installed; otherwise
+    # the hashing embedder keeps everything working offline.
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_MODEL:
+            try:
+                _embedder = SentenceTransformerEmbedder(settings.EMBEDDING_MODEL)
+            except Exception as e:
+                print(f"Falling back to hashing embeddings: {e}")
+        if _embedder is None:
+            _embedder = HashingEmbedder(settings.EMBEDDING_DIM)
+    return _embedder
+
+
+def embed_document(text: Optional[str]) -> Tuple[str, int, List[bytes]]:
+    # Runs in an ingestion worker process: returns the model name, vector
+    # dimension and one float32 buffer per chunk.
+    embedder = get_embedder()
+    chunks = chunk_text(text or "")
+    if not chunks:
+        return embedder.name, embedder.dim, []
+    vectors = embedder.embed(chunks)
+    return embedder.name, embedder.dim, [row.tobytes() for row in vectors]
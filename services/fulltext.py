@@ -0,0 +1,181 @@
+import html
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Postgres: these weighted tsvectors are stored in generated columns, kept
+# up to date by Postgres itself and GIN-indexed, so matching and ranking
+# never re-parse paper text. Text extracted from a PDF is stored once, on
+# its blob, so it is indexed there; papers index their own metadata (and
+# any text stored on the paper itself). Body text is capped below the 1MB
+# tsvector limit.
+PG_BODY = "setweight(to_tsvector('english', left(coalesce(extracted_text, ''), 500000)), 'C')"
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(abstract, '')), 'B') || "
+    f"{PG_BODY}"
+)
+PG_DOCUMENT_COLUMN = "search_vector"
+
+# Snippets are highlighted with control characters, then HTML-escaped and
+# given <b> tags, so paper text can never inject markup.
+_MARK_START, _MARK_STOP = "\x02", "\x03"
+PG_HEADLINE_OPTIONS = f"MaxFragments=2, MinWords=8, MaxWords=30, StartSel={_MARK_START}, StopSel={_MARK_STOP}"
+
+# SQLite: an FTS5 table keyed by paper id (rowid), maintained by
+# index_papers/remove_papers as papers change.
+SQLITE_FTS_TABLE = "papers_fts"
+SQLITE_ROWS = (
+    "SELECT p.id, p.title, p.abstract, coalesce(p.extracted_text, b.extracted_text) "
+    "FROM papers p LEFT JOIN paper_blobs b ON b.id = p.blob_id"
+)
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def init_search_index(engine):
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text(
+                f"ALTER TABLE papers ADD COLUMN IF NOT EXISTS {PG_DOCUMENT_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ({PG_DOCUMENT}) STORED"
+            ))
+            # Superseded by the index on the stored column.
+            conn.execute(text("DROP INDEX IF EXISTS ix_papers_search"))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_papers_search_vector ON papers USING GIN ({PG_DOCUMENT_COLUMN})"
+            ))
+            conn.execute(text(
+                f"ALTER TABLE paper_blobs ADD COLUMN IF NOT EXISTS {PG_DOCUMENT_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ({PG_BODY}) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_paper_blobs_search_vector ON paper_blobs USING GIN ({PG_DOCUMENT_COLUMN})"
+            ))
+        elif dialect == "sqlite":
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+                "USING fts5(title, abstract, body, tokenize='porter unicode61')"
+            ))
+            indexed = conn.execute(text(f"SELECT count(*) FROM {SQLITE_FTS_TABLE}")).scalar()
+            if not indexed:
+                conn.execute(text(f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, abstract, body) {SQLITE_ROWS}"))
+
+
+async def index_papers(db: AsyncSession, paper_ids: Optional[List[int]] = None, blob_id: Optional[int] = None):
+    if _dialect(db.bind) != "sqlite":
+        return
+
+    if paper_ids is not None:
+        if not paper_ids:
+            return
+        where, params = "p.id IN ({})".format(",".join(str(int(i)) for i in paper_ids)), {}
+    else:
+        where, params = "p.blob_id = :blob_id", {"blob_id": blob_id}
+
+    await db.execute(text(
+        f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN (SELECT p.id FROM papers p WHERE {where})"
+    ), params)
+    await db.execute(text(
+        f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, abstract, body) {SQLITE_ROWS} WHERE {where}"
+    ), params)
+    await db.commit()
+
+
+async def remove_papers(db: AsyncSession, paper_ids: List[int]):
+    if _dialect(db.bind) != "sqlite" or not paper_ids:
+        return
+
+    await db.execute(text(
+        f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid IN ({','.join(str(int(i)) for i in paper_ids)})"
+    ))
+    await db.commit()
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can't hit FTS5 query syntax.
+    terms = re.findall(r"\w+", query)
+    return " ".join('"{}"'.format(term) for term in terms)
+
+
+async def search_papers(
+    db: AsyncSession,
+    owner_id: int,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    workspace_id: Optional[int] = None
+) -> List[Dict]:
+    dialect = _dialect(db.bind)
+    params = {"owner_id": owner_id, "limit": limit, "offset": offset, "workspace_id": workspace_id}
+    workspace_filter = (
+        "AND p.id IN (SELECT paper_id FROM workspace_papers WHERE workspace_id = :workspace_id)"
+        if workspace_id else ""
+    )
+
+    if dialect == "postgresql":
+        params.update(query=query, headline_options=PG_HEADLINE_OPTIONS)
+        # Matches on the paper or on its blob's text, each found through its
+        # own GIN index, then ranked on both vectors together. Only the page
+        # of hits gets a headline, which does re-parse text.
+        sql = f"""
+            WITH q AS (SELECT websearch_to_tsquery('english', :query) AS q),
+            matches AS (
+                SELECT p.id FROM papers p, q
+                WHERE p.owner_id = :owner_id AND p.{PG_DOCUMENT_COLUMN} @@ q.q {workspace_filter}
+                UNION
+                SELECT p.id FROM paper_blobs b JOIN papers p ON p.blob_id = b.id, q
+                WHERE p.owner_id = :owner_id AND b.{PG_DOCUMENT_COLUMN} @@ q.q {workspace_filter}
+            ),
+            hits AS (
+                SELECT p.id, ts_rank_cd(
+                    p.{PG_DOCUMENT_COLUMN} || coalesce(b.{PG_DOCUMENT_COLUMN}, ''::tsvector), q.q, 32
+                ) AS rank
+                FROM matches m JOIN papers p ON p.id = m.id LEFT JOIN paper_blobs b ON b.id = p.blob_id, q
+                ORDER BY rank DESC, p.id DESC
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT hits.id, hits.rank,
+                   ts_headline('english', left(coalesce(p.extracted_text, b.extracted_text, p.abstract, ''), 100000),
+                               q.q, :headline_options) AS snippet
+            FROM hits JOIN papers p ON p.id = hits.id LEFT JOIN paper_blobs b ON b.id = p.blob_id, q
+            ORDER BY hits.rank DESC, hits.id DESC
+        """
+    elif dialect == "sqlite":
+        params["query"] = _fts5_query(query)
+        if not params["query"]:
+            return []
+        # bm25() is lower-is-better; columns weighted title > abstract > body.
+        sql = f"""
+            SELECT p.id, -bm25({SQLITE_FTS_TABLE}, 10.0, 4.0, 1.0) AS rank,
+                   snippet({SQLITE_FTS_TABLE}, -1, char(2), char(3), '...', 24) AS snippet
+            FROM {SQLITE_FTS_TABLE}
+            JOIN papers p ON p.id = {SQLITE_FTS_TABLE}.rowid
+            WHERE {SQLITE_FTS_TABLE} MATCH :query AND p.owner_id = :owner_id {workspace_filter}
+            ORDER BY rank DESC, p.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        params["query"] = f"%{query}%"
+        sql = f"""
+            SELECT p.id, 0.0 AS rank, substr(coalesce(p.abstract, ''), 1, 200) AS snippet
+            FROM papers p
+            WHERE p.owner_id = :owner_id AND (p.title LIKE :query OR p.abstract LIKE :query) {workspace_filter}
+            ORDER BY p.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+
+    result = await db.execute(text(sql), params)
+    rows = result.all()
+    return [{"id": row.id, "rank": float(row.rank or 0.0), "snippet": _snippet_html(row.snippet)} for row in rows]
+
+
+def _snippet_html(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    return html.escape(snippet, quote=False).replace(_MARK_START, "<b>").replace(_MARK_STOP, "</b>")
@@ -0,0 +1,33 @@
+import httpx
+from typing import Optional
+from config import settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT),
+        follow_redirects=True
+    )
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # The one shared client; the app lifespan calls this at startup, and
+    # scripts that use the services without the app get it on first use.
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import AsyncSessionLocal
+from models.blob import PaperBlob
+from models.paper import Paper
+from services.pdf_extractor import extract_text_parallel
+from services.fulltext import index_papers
+from services.embeddings import embed_document
+from services.vector_index import store_embeddings
+from services.context_budget import build_chunks
+from services.chunk_index import store_chunks
+from services.pdf_fetch import fetch_pdf
+from services.storage import acquire_blob, discard_blob
+from utils.aggregates import join_blob, paper_text
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_tasks: Set[asyncio.Task] = set()
+
+
+def start_ingestion():
+    global _executor, _slots
+    if _executor is None:
+        # spawn: workers must not inherit the server's threads and locks.
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _slots = asyncio.Semaphore(settings.EXTRACTION_WORKERS)
+
+
+async def stop_ingestion():
+    global _executor, _slots
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _slots = None
+
+
+def _track(coro):
+    start_ingestion()
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def schedule_extraction(blob_id: int, file_path: str):
+    _track(_run_extraction(blob_id, file_path))
+
+
+def schedule_embedding(paper_ids: List[int] = None, blob_id: int = None):
+    _track(_run_embedding(paper_ids, blob_id))
+
+
+def schedule_pdf_fetch(paper_id: int, url: str):
+    _track(_run_fetch(paper_id, url))
+
+
+def pending_jobs() -> int:
+    return len(_tasks)
+
+
+async def _set_blob_state(blob_id: int, **fields):
+    # Extraction state lives on the blob and its status is mirrored onto
+    # every paper that references it, in one transaction. The text itself
+    # stays on the blob only (see utils.aggregates.paper_text).
+    mirrored = {name: value for name, value in fields.items() if name != "extracted_text"}
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(PaperBlob).where(PaperBlob.id == blob_id).values(**fields))
+        await db.execute(update(Paper).where(Paper.blob_id == blob_id).values(**mirrored))
+        await db.commit()
+        if "extracted_text" in fields:
+            await index_papers(db, blob_id=blob_id)
+
+
+async def _run_extraction(blob_id: int, file_path: str):
+    async with _slots:
+        await _set_blob_state(blob_id, extraction_status="processing")
+        try:
+            text = await extract_text_parallel(file_path, _executor)
+        except Exception as e:
+            print(f"Error extracting text for blob {blob_id}: {e}")
+            await _set_blob_state(blob_id, extraction_status="failed", extraction_error=str(e))
+            return
+
+    await _set_blob_state(
+        blob_id,
+        extracted_text=text,
+        extraction_status="completed",
+        extraction_error=None
+    )
+    await _index_chunks(blob_id, text)
+    await _run_embedding(blob_id=blob_id)
+
+
+async def _index_chunks(blob_id: int, text: str):
+    # The chunk index lets AI jobs budget context without re-parsing text.
+    try:
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(_executor, build_chunks, text)
+        async with AsyncSessionLocal() as db:
+            await store_chunks(db, blob_id, chunks)
+    except Exception as e:
+        print(f"Error indexing chunks for blob {blob_id}: {e}")
+
+
+async def _embedding_inputs(paper_ids: List[int] = None, blob_id: int = None) -> Dict[str, List[Tuple[int, int]]]:
+    # Groups papers by the text to embed so shared content is embedded once.
+    stmt = join_blob(select(Paper.id, Paper.owner_id, Paper.title, Paper.abstract, paper_text().label("extracted_text")))
+    if blob_id is not None:
+        stmt = stmt.where(Paper.blob_id == blob_id)
+    else:
+        stmt = stmt.where(Paper.id.in_(paper_ids))
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(stmt)
+        groups = {}
+        for row in result.all():
+            text = row.extracted_text or row.abstract or row.title or ""
+            groups.setdefault(text, []).append((row.id, row.owner_id))
+        return groups
+
+
+async def _run_embedding(paper_ids: List[int] = None, blob_id: int = None):
+    groups = await _embedding_inputs(paper_ids, blob_id)
+    loop = asyncio.get_running_loop()
+    for text, papers in groups.items():
+        try:
+            async with _slots:
+                model, _, vectors = await loop.run_in_executor(_executor, embed_document, text)
+            async with AsyncSessionLocal() as db:
+                await store_embeddings(db, papers, model, vectors)
+        except Exception as e:
+            print(f"Error embedding papers {[paper_id for paper_id, _ in papers]}: {e}")
+
+
+async def _run_fetch(paper_id: int, url: str):
+    # Imported papers only carry a PDF link; the file is downloaded, stored
+    # as a blob like an upload, and goes through the same extraction.
+    try:
+        stored = await fetch_pdf(url)
+    except Exception as e:
+        print(f"Error fetching PDF for paper {paper_id}: {e}")
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Paper).where(Paper.id == paper_id, Paper.blob_id.is_(None)).values(
+                extraction_status="failed",
+                extraction_error=str(e)
+            ))
+            await db.commit()
+        return
+
+    async with AsyncSessionLocal() as db:
+        blob, created = await acquire_blob(db, stored)
+        attached = await db.execute(update(Paper).where(Paper.id == paper_id, Paper.blob_id.is_(None)).values(
+            blob_id=blob.id,
+            file_path=blob.file_path,
+            file_size=blob.file_size,
+            content_hash=blob.sha256
+        ))
+        if not attached.rowcount:
+            # Deleted while downloading.
+            await discard_blob(db, blob, created)
+            return
+        await db.commit()
+        if not created:
+            paper = await db.get(Paper, paper_id)
+            await copy_blob_state(db, paper, blob)
+            if paper.extraction_status == "completed":
+                await index_papers(db, [paper_id])
+                await _run_embedding([paper_id])
+            return
+
+    await _run_extraction(blob.id, blob.file_path)
+
+
+async def copy_blob_state(db: AsyncSession, paper: Paper, blob: PaperBlob):
+    # Called after the paper is committed: if extraction finished before
+    # the paper row existed, the paper would otherwise stay pending. A
+    # failed extraction is not copied; the new reference retries it.
+    await db.refresh(blob)
+    if blob.extraction_status == "completed":
+        paper.extraction_status = blob.extraction_status
+        paper.extraction_error = blob.extraction_error
+        await db.commit()
+    elif blob.extraction_status == "failed":
+        retry = await db.execute(
+            update(PaperBlob)
+            .where(PaperBlob.id == blob.id, PaperBlob.extraction_status == "failed")
+            .values(extraction_status="pending", extraction_error=None)
+        )
+        await db.commit()
+        if retry.rowcount:
+            schedule_extraction(blob.id, blob.file_path)
+
+
+async def resume_pending_extractions():
+    # Jobs interrupted by a restart are picked up again.
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(PaperBlob.id, PaperBlob.file_path).where(
+                PaperBlob.extraction_status.in_(["pending", "processing"])
+            )
+        )
+        unfinished = result.all()
+        result = await db.execute(
+            select(Paper.id, Paper.pdf_url).where(
+                Paper.blob_id.is_(None),
+                Paper.pdf_url.isnot(None),
+                Paper.extraction_status == "pending"
+            )
+        )
+        downloads = result.all()
+    for blob_id, file_path in unfinished:
+        schedule_extraction(blob_id, file_path)
+    for paper_id, url in downloads:
+        schedule_pdf_fetch(paper_id, url)
@@ -0,0 +1,342 @@
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from config import settings
+
+TokenCallback = Callable[[str], None]
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, retryable: bool = False, overloaded: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.overloaded = overloaded
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; only used for budgeting.
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Two refilling buckets, requests/min and tokens/min. A call waits
+    until both can cover it."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.capacity = (float(requests_per_minute), float(tokens_per_minute))
+        self.available = list(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for i, capacity in enumerate(self.capacity):
+            self.available[i] = min(capacity, self.available[i] + elapsed * capacity / 60.0)
+
+    async def acquire(self, tokens: int):
+        # A request larger than the whole budget waits for a full bucket.
+        needed = (1.0, min(float(tokens), self.capacity[1]))
+        async with self._lock:
+            while True:
+                self._refill()
+                waits = [
+                    (needed[i] - self.available[i]) * 60.0 / self.capacity[i]
+                    for i in range(2) if self.available[i] < needed[i]
+                ]
+                if not waits:
+                    self.available[0] -= needed[0]
+                    self.available[1] -= needed[1]
+                    return
+                await asyncio.sleep(max(waits))
+
+    def drain(self, seconds: float):
+        # Provider said 429: nothing goes out for `seconds`.
+        self._refill()
+        self.available[0] = min(self.available[0], -seconds * self.capacity[0] / 60.0)
+
+
+class AIMDLimiter:
+    """Concurrency limit that grows by one per window of successes and is
+    halved on overload (429) or when latency exceeds the target."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        async with self._changed:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                self.limit = max(float(self.minimum), self.limit / 2)
+            elif latency is not None:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._changed.notify_all()
+
+
+class ProviderStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_total = 0.0
+
+    def as_dict(self) -> Dict:
+        succeeded = self.requests - self.errors
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_avg_ms": round(self.latency_total / succeeded * 1000, 1) if succeeded > 0 else 0.0,
+        }
+
+
+class OpenAICompatibleProvider:
+    """Groq and OpenAI share the chat-completions API and SDK shape."""
+
+    def __init__(self, name: str, sdk_client, model: str, http_client: httpx.AsyncClient):
+        self.name = name
+        self.model = model
+        self._client = sdk_client
+        self._http = http_client
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int, on_token: Optional[TokenCallback]) -> str:
+        try:
+            if on_token is None:
+                response = await self._client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                return response.choices[0].message.content
+
+            parts = []
+            stream = await self._client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+            return "".join(parts)
+        except LLMError:
+            raise
+        except Exception as e:
+            raise _classify(e)
+
+    async def close(self):
+        await self._http.aclose()
+
+
+def _classify(error: Exception) -> LLMError:
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    retry_after = None
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+
+    if status == 429:
+        return LLMError(str(error), retryable=True, overloaded=True, retry_after=retry_after)
+    if status is not None:
+        return LLMError(str(error), retryable=status >= 500)
+    # No HTTP status: the SDKs' APIConnectionError/APITimeoutError, or
+    # transport errors raised by httpx directly.
+    kind = type(error).__name__
+    transient = isinstance(error, (httpx.TransportError, asyncio.TimeoutError)) or "Connection" in kind or "Timeout" in kind
+    return LLMError(str(error), retryable=transient)
+
+
+class StubProvider:
+    """Offline provider: echoes a short deterministic answer word by word."""
+
+    name = "stub"
+    model = "stub"
+
+    async def complete(self, messages: List[Dict], temperature: float, max_tokens: int, on_token: Optional[TokenCallback]) -> str:
+        prompt = messages[-1]["content"]
+        words = ["[stub]"] + prompt.split()[:min(max_tokens, 64)]
+        parts = []
+        for word in words:
+            text = word if not parts else " " + word
+            parts.append(text)
+            if on_token:
+                on_token(text)
+                await asyncio.sleep(0)
+        return "".join(parts)
+
+    async def close(self):
+        pass
+
+
+def _http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=10.0)
+    )
+
+
+def _build_provider(name: str):
+    # SDK retries are off: LLMClient owns retry and backoff.
+    if name == "groq":
+        from groq import AsyncGroq
+
+        http = _http_client()
+        client = AsyncGroq(api_key=settings.GROQ_API_KEY, http_client=http, max_retries=0)
+        return OpenAICompatibleProvider("groq", client, settings.LLM_MODEL or "llama-3.3-70b-versatile", http)
+    if name == "openai":
+        from openai import AsyncOpenAI
+
+        http = _http_client()
+        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=http, max_retries=0)
+        return OpenAICompatibleProvider("openai", client, settings.LLM_MODEL or "gpt-4o-mini", http)
+    if name == "stub":
+        return StubProvider()
+    raise LLMError(f"Unknown LLM provider {name!r}")
+
+
+class LLMClient:
+    def __init__(self, provider):
+        self.provider = provider
+        self.bucket = TokenBucket(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE)
+        self.limiter = AIMDLimiter(
+            initial=max(settings.LLM_MIN_CONCURRENCY, settings.LLM_MAX_CONCURRENCY // 2),
+            minimum=settings.LLM_MIN_CONCURRENCY,
+            maximum=settings.LLM_MAX_CONCURRENCY,
+            latency_target=settings.LLM_LATENCY_TARGET
+        )
+        self.stats = ProviderStats()
+
+    async def complete(
+        self,
+        system: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        on_token: Optional[TokenCallback] = None
+    ) -> str:
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        prompt_tokens = estimate_tokens(system) + estimate_tokens(prompt)
+        emitted = []
+
+        def forward(text: str):
+            emitted.append(text)
+            on_token(text)
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            await self.bucket.acquire(prompt_tokens + max_tokens)
+            await self.limiter.acquire()
+            self.stats.requests += 1
+            started = time.monotonic()
+            latency = None
+            error = None
+            try:
+                text = await self.provider.complete(messages, temperature, max_tokens, forward if on_token else None)
+                latency = time.monotonic() - started
+            except LLMError as e:
+                error = e
+            finally:
+                # The slot always goes back, shielded so a second cancel
+                # can't interrupt that either. A cancelled or crashed call
+                # carries no latency signal for the limit.
+                await asyncio.shield(self.limiter.release(latency=latency, overloaded=error is not None and error.overloaded))
+
+            if error is not None:
+                self.stats.errors += 1
+                self.stats.rate_limited += error.overloaded
+                # Output already streamed to the caller can't be taken back.
+                if not error.retryable or emitted or attempt == settings.LLM_MAX_RETRIES:
+                    raise error
+                # Full jitter on an exponential backoff, floored by Retry-After.
+                delay = random.uniform(0, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+                if error.retry_after:
+                    delay = max(delay, error.retry_after)
+                    self.bucket.drain(error.retry_after)
+                self.stats.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.stats.latency_total += latency
+            self.stats.prompt_tokens += prompt_tokens
+            self.stats.completion_tokens += estimate_tokens(text)
+            return text
+
+    def info(self) -> Dict:
+        return {
+            "provider": self.provider.name,
+            "model": self.provider.model,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            **self.stats.as_dict()
+        }
+
+    async def close(self):
+        await self.provider.close()
+
+
+_clients: Dict[str, LLMClient] = {}
+
+
+def default_provider() -> str:
+    # The stub is never picked implicitly: its echo text would be stored
+    # and served as real analyses.
+    if settings.LLM_PROVIDER:
+        return settings.LLM_PROVIDER
+    if settings.GROQ_API_KEY:
+        return "groq"
+    if settings.OPENAI_API_KEY:
+        return "openai"
+    raise LLMError("No LLM provider configured: set GROQ_API_KEY or OPENAI_API_KEY, or LLM_PROVIDER=stub for offline use")
+
+
+def get_llm_client(provider: Optional[str] = None) -> LLMClient:
+    name = provider or default_provider()
+    if name not in _clients:
+        _clients[name] = LLMClient(_build_provider(name))
+    return _clients[name]
+
+
+def llm_stats() -> Dict:
+    return {name: client.info() for name, client in _clients.items()}
+
+
+async def close_llm_clients():
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
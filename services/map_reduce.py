@@ -0,0 +1,145 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database import AsyncSessionLocal
+from services.ai_service import summarize_paper, extract_insights_from_summaries
+from services.analysis_cache import analysis_cache_key, lookup_analysis, store_analysis
+from services.llm_client import TokenCallback
+
+ProgressCallback = Callable[[float], Awaitable[None]]
+SectionCallback = Callable[[Dict], None]
+
+
+async def paper_summary(title: str, text: str, on_token: Optional[TokenCallback] = None) -> str:
+    # Keyed on the paper's own content, so a paper is summarized once no
+    # matter how many analyses it takes part in.
+    key = analysis_cache_key("paper_summary", {"title": title, "text": text})
+    async with AsyncSessionLocal() as db:
+        summary = await lookup_analysis(db, key)
+    if summary is not None:
+        if on_token:
+            on_token(summary)
+        return summary
+
+    summary = await summarize_paper(title, text, on_token)
+    async with AsyncSessionLocal() as db:
+        await store_analysis(db, key, "paper_summary", summary)
+    return summary
+
+
+async def map_summaries(
+    titles: List[str],
+    texts: List[str],
+    on_progress: Optional[ProgressCallback] = None,
+    on_token: Optional[Callable[[int], TokenCallback]] = None,
+    on_summary: Optional[Callable[[int, str], None]] = None
+) -> List[str]:
+    """Summarizes every paper concurrently (the LLM client bounds actual
+    concurrency) and returns the summaries in input order. `on_token(i)`
+    gives the token callback for paper i; `on_summary` fires as each paper
+    finishes, in completion order."""
+    finished = 0
+
+    async def summarize(index: int) -> str:
+        nonlocal finished
+        summary = await paper_summary(titles[index], texts[index], on_token(index) if on_token else None)
+        finished += 1
+        if on_progress:
+            await on_progress(0.1 + 0.8 * finished / len(titles))
+        if on_summary:
+            on_summary(index, summary)
+        return summary
+
+    tasks = [asyncio.ensure_future(summarize(index)) for index in range(len(titles))]
+    try:
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class SectionRelay:
+    """Merges the concurrently streamed per-paper summaries into one
+    document in paper order. The first unfinished paper streams live;
+    later papers are buffered and flushed as soon as every paper before
+    them is done. Each summary is stripped like a finished one would be."""
+
+    def __init__(self, titles: List[str], on_token: Optional[TokenCallback] = None):
+        self.titles = titles
+        self.on_token = on_token
+        self.parts: List[str] = []
+        self._buffers: List[List[str]] = [[] for _ in titles]
+        # Trailing whitespace is held back until more text follows it.
+        self._held = [""] * len(titles)
+        self._started = [False] * len(titles)
+        self._done = [False] * len(titles)
+        self._active = 0
+        if titles:
+            self._open(0)
+
+    def _emit(self, text: str):
+        self.parts.append(text)
+        if self.on_token:
+            self.on_token(text)
+
+    def _open(self, index: int):
+        separator = "" if index == 0 else "\n\n"
+        self._emit(f"{separator}**Paper {index + 1}: {self.titles[index]}**\n")
+        for text in self._buffers[index]:
+            self._emit(text)
+        self._buffers[index] = []
+
+    def sink(self, index: int) -> TokenCallback:
+        def on_token(text: str):
+            if not self._started[index]:
+                text = text.lstrip()
+                self._started[index] = bool(text)
+            body = text.rstrip()
+            if not body:
+                self._held[index] += text
+                return
+            text, self._held[index] = self._held[index] + body, text[len(body):]
+            if index == self._active:
+                self._emit(text)
+            else:
+                self._buffers[index].append(text)
+        return on_token
+
+    def finish(self, index: int, summary: str):
+        self._done[index] = True
+        while self._active < len(self.titles) and self._done[self._active]:
+            self._active += 1
+            if self._active < len(self.titles):
+                self._open(self._active)
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+async def map_reduce_summaries(
+    texts: List[str],
+    titles: List[str],
+    on_token: Optional[TokenCallback] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> str:
+    # The reduce step is plain composition, so the per-paper summaries are
+    # the output and stream to the client while they are generated.
+    relay = SectionRelay(titles, on_token)
+    await map_summaries(titles, texts, on_progress, on_token=relay.sink, on_summary=relay.finish)
+    return relay.text()
+
+
+async def map_reduce_insights(
+    texts: List[str],
+    titles: List[str],
+    on_token: Optional[TokenCallback] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    on_section: Optional[SectionCallback] = None
+) -> str:
+    # The per-paper summaries are only reduce input, not part of the
+    # answer; each is sent as a section as soon as it completes.
+    def section(index: int, summary: str):
+        on_section({"index": index, "title": titles[index], "text": summary})
+
+    summaries = await map_summaries(titles, texts, on_progress, on_summary=section if on_section else None)
+    return await extract_insights_from_summaries(summaries, titles, on_token)
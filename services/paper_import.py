@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.paper import Paper
+from models.workspace import Workspace, workspace_papers
+from schemas.paper import PaperImport
+from services.fulltext import index_papers
+from services.ingestion import schedule_embedding, schedule_pdf_fetch
+
+# Metadata refreshed when a DOI the user already has is imported again;
+# files, extracted text and workspaces are left alone.
+_REFRESHED_COLUMNS = (
+    "title", "authors", "abstract", "source", "source_url",
+    "publication_date", "citation_count", "tags",
+)
+
+
+class ImportResult(NamedTuple):
+    paper_ids: List[int]  # in input order
+    created: List[int]
+
+
+def _row(item: PaperImport, owner_id: int) -> Dict:
+    return {
+        "title": item.title,
+        "authors": item.authors,
+        "abstract": item.abstract,
+        "source": item.source,
+        "source_url": item.url,
+        "pdf_url": item.pdf_url or None,
+        "doi": item.doi or None,
+        "publication_date": item.date,
+        "citation_count": item.citations,
+        "tags": item.tags,
+        "extraction_status": "pending" if item.pdf_url else None,
+        "owner_id": owner_id,
+    }
+
+
+def _upsert(db: AsyncSession, rows: List[Dict]):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    now = datetime.utcnow()
+    stmt = dialect.insert(Paper).values([{**row, "created_at": now, "updated_at": now} for row in rows])
+    return stmt.on_conflict_do_update(
+        index_elements=[Paper.owner_id, Paper.doi],
+        set_={
+            **{column: stmt.excluded[column] for column in _REFRESHED_COLUMNS},
+            "pdf_url": func.coalesce(stmt.excluded.pdf_url, Paper.pdf_url),
+            "updated_at": now,
+        }
+    ).returning(Paper.id, Paper.doi)
+
+
+async def _link_workspaces(db: AsyncSession, links: List[tuple]):
+    if not links:
+        return
+    result = await db.execute(select(workspace_papers.c.workspace_id, workspace_papers.c.paper_id).where(
+        workspace_papers.c.workspace_id.in_({ws for ws, _ in links}),
+        workspace_papers.c.paper_id.in_({paper for _, paper in links})
+    ))
+    existing = set(result.all())
+    missing = [{"workspace_id": ws, "paper_id": paper} for ws, paper in dict.fromkeys(links) if (ws, paper) not in existing]
+    if missing:
+        await db.execute(insert(workspace_papers), missing)
+
+
+async def import_papers(
+    db: AsyncSession,
+    owner_id: int,
+    items: List[PaperImport],
+    workspace_id: Optional[int] = None
+) -> ImportResult:
+    """Creates or refreshes the owner's papers for `items` in one
+    transaction. Papers are matched on (owner_id, doi); papers without a
+    DOI are always created."""
+    rows = [_row(item, owner_id) for item in items]
+
+    # The same DOI twice in one batch is one paper; the last copy wins.
+    by_doi = {row["doi"]: row for row in rows if row["doi"]}
+    existing = set()
+    if by_doi:
+        result = await db.execute(select(Paper.doi).where(Paper.owner_id == owner_id, Paper.doi.in_(by_doi)))
+        existing = set(result.scalars().all())
+
+    ids_by_doi = {}
+    if by_doi:
+        result = await db.execute(_upsert(db, list(by_doi.values())))
+        ids_by_doi = {doi: paper_id for paper_id, doi in result.all()}
+
+    without_doi = [Paper(**row) for row in rows if not row["doi"]]
+    db.add_all(without_doi)
+    await db.flush()
+    fresh = iter(without_doi)
+    paper_ids = [ids_by_doi[row["doi"]] if row["doi"] else next(fresh).id for row in rows]
+
+    wanted = {item.workspace_id or workspace_id for item in items} - {None}
+    owned = set()
+    if wanted:
+        result = await db.execute(select(Workspace.id).where(Workspace.id.in_(wanted), Workspace.owner_id == owner_id))
+        owned = set(result.scalars().all())
+    await _link_workspaces(db, [
+        (item.workspace_id or workspace_id, paper_id)
+        for item, paper_id in zip(items, paper_ids)
+        if (item.workspace_id or workspace_id) in owned
+    ])
+    await db.commit()
+
+    created = list(dict.fromkeys(
+        paper_id for row, paper_id in zip(rows, paper_ids) if row["doi"] not in existing
+    ))
+    await index_papers(db, list(dict.fromkeys(paper_ids)))
+    if created:
+        schedule_embedding(created)
+    downloads = {paper_id: row["pdf_url"] for row, paper_id in zip(rows, paper_ids) if row["pdf_url"]}
+    for paper_id in created:
+        if paper_id in downloads:
+            schedule_pdf_fetch(paper_id, downloads[paper_id])
+    return ImportResult(paper_ids, created)
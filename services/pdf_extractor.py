@@ -1,29 +1,99 @@
+import asyncio
 import PyPDF2
 import pdfplumber
-from typing import Optional
+import pypdfium2 as pdfium
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple
 
-def extract_text_from_pdf(file_path: str) -> str:
-    
-    text = ""
-    
+from config import settings
+
+# Pages where pdfium finds less text than this are retried with pdfplumber,
+# whose layout analysis copes better with multi-column and odd encodings.
+MIN_PAGE_CHARS = 20
+
+
+def count_pages(file_path: str) -> int:
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        print(f"pdfium could not open {file_path}: {e}")
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+
+def plan_page_ranges(page_count: int, pages_per_range: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + pages_per_range, page_count))
+        for start in range(0, page_count, pages_per_range)
+    ]
+
+
+def _extract_pdfium(file_path: str, start: int, end: int) -> List[str]:
+    pages = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for index in range(start, end):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    return pages
+
+
+def _extract_layout(file_path: str, page_indexes: List[int]) -> dict:
+    texts = {}
     try:
-       
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-    except:
-        
+        with pdfplumber.open(file_path, pages=[i + 1 for i in page_indexes]) as pdf:
+            for index, page in zip(page_indexes, pdf.pages):
+                texts[index] = page.extract_text() or ""
+    except Exception as e:
+        print(f"pdfplumber failed on {file_path}: {e}")
         try:
             with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+                reader = PyPDF2.PdfReader(file)
+                for index in page_indexes:
+                    texts[index] = reader.pages[index].extract_text() or ""
         except Exception as e:
-            print(f"Error extracting text: {e}")
-            text = "Error extracting text from PDF"
-    
-    return text.strip()
\ No newline at end of file
+            print(f"PyPDF2 failed on {file_path}: {e}")
+    return texts
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    try:
+        pages = _extract_pdfium(file_path, start, end)
+    except Exception as e:
+        print(f"pdfium failed on {file_path} pages {start}-{end}: {e}")
+        pages = [""] * (end - start)
+
+    sparse = [start + i for i, text in enumerate(pages) if len(text.strip()) < MIN_PAGE_CHARS]
+    if sparse:
+        for index, text in _extract_layout(file_path, sparse).items():
+            if len(text.strip()) > len(pages[index - start].strip()):
+                pages[index - start] = text
+
+    return [text.strip() for text in pages]
+
+
+def _join_pages(pages: List[str]) -> str:
+    return "\n".join(text for text in pages if text)
+
+
+async def extract_text_parallel(file_path: str, executor: Optional[Executor] = None) -> str:
+    # Splits the document into page ranges and extracts them concurrently
+    # on the given (process) executor; pages are reassembled in order.
+    loop = asyncio.get_running_loop()
+    page_count = await loop.run_in_executor(executor, count_pages, file_path)
+    ranges = plan_page_ranges(page_count, settings.EXTRACTION_PAGES_PER_TASK)
+
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(executor, extract_page_range, file_path, start, end)
+        for start, end in ranges
+    ))
+    return _join_pages([text for chunk in chunks for text in chunk])
@@ -0,0 +1,164 @@
+import asyncio
+import ipaddress
+import os
+import random
+import socket
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from config import settings
+from services.http_client import get_http_client
+from services.storage import StoredUpload, UploadTooLarge, receive_stream
+
+
+class FetchError(Exception):
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class HostLimiter:
+    """Politeness towards one host: a few requests at a time, and
+    successive requests spaced at least `interval` seconds apart."""
+
+    def __init__(self, concurrency: int, interval: float):
+        self.interval = interval
+        self._slots = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def __aenter__(self):
+        await self._slots.acquire()
+        try:
+            async with self._lock:
+                delay = self._next_at - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_at = time.monotonic() + self.interval
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+    def back_off(self, seconds: float):
+        # The host asked us to slow down: nobody calls it for `seconds`.
+        self._next_at = max(self._next_at, time.monotonic() + seconds)
+
+
+_hosts: Dict[str, HostLimiter] = {}
+_slots: Optional[asyncio.Semaphore] = None
+_stats = {"fetched": 0, "failed": 0, "retries": 0, "bytes": 0}
+
+
+def _host_limiter(url: str) -> HostLimiter:
+    host = urlparse(url).netloc.lower()
+    if host not in _hosts:
+        _hosts[host] = HostLimiter(settings.PDF_FETCH_PER_HOST, settings.PDF_FETCH_HOST_INTERVAL)
+    return _hosts[host]
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_pdf(path: str) -> bool:
+    with open(path, "rb") as f:
+        return b"%PDF" in f.read(1024)
+
+
+async def _pinned(url: httpx.URL) -> Tuple[httpx.URL, Dict, Dict]:
+    """Checks that `url` points at a public host and pins the request to
+    the address that was checked, so a second DNS answer can't send the
+    connection somewhere internal. Returns the URL, headers and extensions
+    to request it with."""
+    if url.scheme not in ("http", "https") or not url.host:
+        raise FetchError(f"Unsupported PDF URL {url}")
+    host = url.host
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, url.port or (443 if url.scheme == "https" else 80), type=socket.SOCK_STREAM
+        )
+    except socket.gaierror:
+        raise FetchError(f"Could not resolve {host}", retryable=True)
+
+    addresses = [ipaddress.ip_address(info[4][0]) for info in infos]
+    if host.lower() not in settings.PDF_FETCH_PRIVATE_HOSTS and any(
+        not address.is_global or address.is_multicast for address in addresses
+    ):
+        raise FetchError(f"{host} is not a public host")
+
+    extensions = {"sni_hostname": host} if url.scheme == "https" else {}
+    return url.copy_with(host=str(addresses[0])), {"Host": url.netloc.decode("ascii")}, extensions
+
+
+async def _download(url: str, limiter: HostLimiter) -> StoredUpload:
+    # Redirects are followed here rather than by the client, so every hop
+    # is checked before it is requested.
+    try:
+        target = httpx.URL(url)
+    except httpx.InvalidURL:
+        raise FetchError(f"Invalid PDF URL {url}")
+    async with limiter:
+        for _ in range(settings.PDF_FETCH_MAX_REDIRECTS + 1):
+            pinned, headers, extensions = await _pinned(target)
+            async with get_http_client().stream(
+                "GET", pinned, headers=headers, extensions=extensions,
+                follow_redirects=False, timeout=settings.PDF_FETCH_TIMEOUT
+            ) as response:
+                if response.is_redirect:
+                    target = target.join(response.headers["location"])
+                    continue
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise FetchError(f"HTTP {response.status_code} from {url}", retryable=True, retry_after=_retry_after(response))
+                if response.status_code >= 400:
+                    raise FetchError(f"HTTP {response.status_code} from {url}")
+                stored = await receive_stream(response.aiter_bytes(settings.UPLOAD_CHUNK_SIZE))
+            break
+        else:
+            raise FetchError(f"Too many redirects from {url}")
+
+    if not _is_pdf(stored.path):
+        os.remove(stored.path)
+        raise FetchError(f"{url} did not return a PDF")
+    return stored
+
+
+async def fetch_pdf(url: str) -> StoredUpload:
+    """Downloads `url` into the upload temp dir, ready for acquire_blob."""
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PDF_FETCH_CONCURRENCY)
+    limiter = _host_limiter(url)
+
+    for attempt in range(settings.PDF_FETCH_MAX_RETRIES + 1):
+        try:
+            async with _slots:
+                stored = await _download(url, limiter)
+            _stats["fetched"] += 1
+            _stats["bytes"] += stored.size
+            return stored
+        except (FetchError, httpx.TransportError, UploadTooLarge) as e:
+            retryable = isinstance(e, httpx.TransportError) or getattr(e, "retryable", False)
+            if not retryable or attempt == settings.PDF_FETCH_MAX_RETRIES:
+                _stats["failed"] += 1
+                raise
+            delay = random.uniform(0, settings.PDF_FETCH_RETRY_BASE_DELAY * 2 ** attempt)
+            retry_after = getattr(e, "retry_after", None)
+            if retry_after:
+                delay = max(delay, retry_after)
+                limiter.back_off(retry_after)
+            _stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+
+def pdf_fetch_stats() -> Dict:
+    return {"hosts": len(_hosts), **_stats}
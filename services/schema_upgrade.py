@@ -0,0 +1,81 @@
+from sqlalchemy import inspect, text
+
+from models import Base
+
+
+def _add_missing_columns(conn, table) -> set:
+    # Only nullable columns are ever added to existing tables, so existing
+    # rows need no value. Returns the names of the columns added.
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    compiler = conn.dialect.ddl_compiler(conn.dialect, None)
+    added = set()
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        spec = compiler.get_column_specification(column)
+        for foreign_key in column.foreign_keys:
+            target = foreign_key.column
+            spec += f" REFERENCES {target.table.name} ({target.name})"
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {spec}"))
+        added.add(column.name)
+    return added
+
+
+def _backfill_papers(conn, added: set):
+    # Text extracted before extraction was tracked is complete as it is.
+    if "extraction_status" in added:
+        conn.execute(text(
+            "UPDATE papers SET extraction_status = 'completed' WHERE extracted_text IS NOT NULL"
+        ))
+
+
+def _drop_copied_blob_text(conn):
+    # Earlier versions copied a blob's extracted text into every paper
+    # sharing it; it is read from the blob now.
+    conn.execute(text(
+        "UPDATE papers SET extracted_text = NULL "
+        "WHERE extracted_text IS NOT NULL AND blob_id IN "
+        "(SELECT id FROM paper_blobs WHERE extracted_text IS NOT NULL)"
+    ))
+
+
+def _drop_global_doi_unique(conn):
+    # Earlier versions made a DOI unique across all users' libraries.
+    inspector = inspect(conn)
+    for constraint in inspector.get_unique_constraints("papers"):
+        if constraint["column_names"] == ["doi"] and constraint.get("name"):
+            conn.execute(text(f'ALTER TABLE papers DROP CONSTRAINT "{constraint["name"]}"'))
+    for index in inspector.get_indexes("papers"):
+        if index["column_names"] == ["doi"] and index["unique"]:
+            conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+            conn.execute(text(f'CREATE INDEX "{index["name"]}" ON papers (doi)'))
+
+
+def _add_owner_doi_unique(conn):
+    # Imports upsert with ON CONFLICT (owner_id, doi), which needs a unique
+    # constraint or index on exactly those columns.
+    inspector = inspect(conn)
+    covered = [c["column_names"] for c in inspector.get_unique_constraints("papers")]
+    covered += [i["column_names"] for i in inspector.get_indexes("papers") if i["unique"]]
+    if ["owner_id", "doi"] not in covered:
+        conn.execute(text("CREATE UNIQUE INDEX uq_papers_owner_id_doi ON papers (owner_id, doi)"))
+
+
+def upgrade_schema(engine):
+    """Brings tables created by earlier versions up to the current models.
+    Runs after create_all, which only creates missing tables, so changes to
+    existing ones are applied here; every step checks first and is safe to
+    rerun."""
+    with engine.begin() as conn:
+        # Columns added since a table was created (extraction state, content
+        # hashes, blob references), then any index those tables lack.
+        for table in Base.metadata.sorted_tables:
+            added = _add_missing_columns(conn, table)
+            if table.name == "papers":
+                _backfill_papers(conn, added)
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        _drop_copied_blob_text(conn)
+        _drop_global_doi_unique(conn)
+        _add_owner_doi_unique(conn)
@@ -0,0 +1,149 @@
+import math
+import re
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_DOI_RE = re.compile(r"10\.\d{4,9}/\S+")
+_ARXIV_RE = re.compile(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?$|^10\.48550/arxiv\.(.+)$")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "with", "we", "our",
+}
+
+# BM25F: title matches count double; both fields share one saturation.
+FIELD_WEIGHTS = {"title": 2.0, "abstract": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def _doi(result: Dict) -> Optional[str]:
+    match = _DOI_RE.search((result.get("doi") or result.get("url") or "").lower())
+    return match.group(0).rstrip(".") if match else None
+
+
+def _arxiv_id(result: Dict) -> Optional[str]:
+    # arXiv links carry the id (minus version); Crossref lists arXiv
+    # preprints under the 10.48550/arXiv.<id> DOI.
+    for value in (result.get("url"), result.get("pdf_url"), _doi(result)):
+        match = _ARXIV_RE.search((value or "").lower())
+        if match:
+            return match.group(1) or match.group(2)
+    return None
+
+
+def title_fingerprint(title: Optional[str]) -> Optional[str]:
+    tokens = _TOKEN_RE.findall((title or "").lower())
+    return " ".join(tokens) if len(tokens) >= 3 else None
+
+
+def identity_keys(result: Dict) -> List[str]:
+    keys = []
+    doi = _doi(result)
+    if doi:
+        keys.append(f"doi:{doi}")
+    arxiv_id = _arxiv_id(result)
+    if arxiv_id:
+        keys.append(f"arxiv:{arxiv_id}")
+    fingerprint = title_fingerprint(result.get("title"))
+    if fingerprint:
+        keys.append(f"title:{fingerprint}")
+    return keys
+
+
+def _merge_into(kept: Dict, other: Dict):
+    # The first copy seen is kept; gaps are filled from later ones.
+    for field in ("doi", "pdf_url", "url", "date"):
+        if not kept.get(field) and other.get(field):
+            kept[field] = other[field]
+    if len(other.get("abstract") or "") > len(kept.get("abstract") or ""):
+        kept["abstract"] = other["abstract"]
+    kept["citations"] = max(kept.get("citations") or 0, other.get("citations") or 0)
+    kept["tags"] = list(dict.fromkeys((kept.get("tags") or []) + (other.get("tags") or [])))
+
+
+class ResultIndex:
+    """Deduplicates search results in one pass: every identity key (DOI,
+    arXiv id, title fingerprint) maps to the result that first claimed
+    it, so each candidate costs a few dict lookups."""
+
+    def __init__(self):
+        self.results: List[Dict] = []
+        self._keys: Dict[str, int] = {}
+
+    def add(self, result: Dict) -> bool:
+        """Returns False if `result` duplicates one already added."""
+        keys = identity_keys(result)
+        position = next((self._keys[key] for key in keys if key in self._keys), None)
+        created = position is None
+        if created:
+            position = len(self.results)
+            self.results.append(dict(result))
+        else:
+            _merge_into(self.results[position], result)
+        for key in keys:
+            self._keys.setdefault(key, position)
+        return created
+
+
+def merge_results(results: List[Dict]) -> List[Dict]:
+    index = ResultIndex()
+    for result in results:
+        index.add(result)
+    return index.results
+
+
+def _stem(term: str) -> str:
+    # Plural folding only; the match pattern adds an optional "s" back.
+    return term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term
+
+
+def rank_results(results: List[Dict], query: Optional[str]) -> List[Dict]:
+    """Orders results by BM25F relevance of title and abstract to `query`.
+    Term statistics come from the candidates themselves. Ties keep their
+    incoming order."""
+    terms = {_stem(term) for term in _tokens(query)}
+    if not terms or not results:
+        return results
+
+    # One regex scan per field finds only the query terms; nothing else is
+    # tokenized. Per result and field: (length in words, matched terms).
+    pattern = re.compile(r"\b(" + "|".join(sorted(map(re.escape, terms), key=len, reverse=True)) + r")s?\b")
+    fields = list(FIELD_WEIGHTS.items())
+    docs = []
+    totals = [0] * len(fields)
+    document_frequency: Dict[str, int] = {}
+    for result in results:
+        doc = []
+        for i, (name, _) in enumerate(fields):
+            text = (result.get(name) or "").lower()
+            length = text.count(" ") + 1 if text else 0
+            totals[i] += length
+            doc.append((length, pattern.findall(text)))
+        for term in {term for _, hits in doc for term in hits}:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+        docs.append(doc)
+
+    count = len(results)
+    averages = [(total / count) or 1.0 for total in totals]
+    idf = {
+        term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+        for term, df in document_frequency.items()
+    }
+
+    scored = []
+    for result, doc in zip(results, docs):
+        tf: Dict[str, float] = {}
+        for (length, hits), (_, weight), average in zip(doc, fields, averages):
+            if hits:
+                increment = weight / (1 - BM25_B + BM25_B * length / average)
+                for term in hits:
+                    tf[term] = tf.get(term, 0.0) + increment
+        score = sum(idf[term] * f * (BM25_K1 + 1) / (f + BM25_K1) for term, f in tf.items())
+        scored.append({**result, "score": round(score, 4)})
+
+    scored.sort(key=lambda r: -r["score"])
+    return scored
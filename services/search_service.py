@@ -1,11 +1,74 @@
-import httpx
+import asyncio
+import hashlib
+import json
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import List, Dict
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 import urllib.parse
 
-async def search_arxiv(params) -> List[Dict]:
-    base_url = "http://export.arxiv.org/api/query"
+from config import settings
+from services.http_client import get_http_client
+from services.search_ranking import ResultIndex, identity_keys, merge_results, rank_results
+from services.catalog import catalog_search, record_results
+from utils.cache import build_cache, SingleFlight
+
+search_cache = build_cache(
+    namespace="search",
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=settings.SEARCH_CACHE_TTL
+)
+search_flight = SingleFlight()
+_tasks: Set[asyncio.Task] = set()
+_stats = {"catalog_served": 0, "background_refreshes": 0, "upstream_failures": 0}
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH_NS = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+
+class SourcePage:
+    """Filled in by a source while it streams a page: where the next page
+    starts, or None when the source has nothing more."""
+
+    def __init__(self):
+        self.next = None
+
+
+def _arxiv_result(entry) -> Dict:
+    ns = {"atom": "http://www.w3.org/2005/Atom"}
+    title = entry.find("atom:title", ns).text.strip()
+    summary = entry.find("atom:summary", ns).text.strip()
+    
+    
+    authors = []
+    for author in entry.findall("atom:author", ns):
+        name = author.find("atom:name", ns).text
+        authors.append(name)
+    
+    
+    published = entry.find("atom:published", ns).text[:10]
+    
+   
+    links = {}
+    for link in entry.findall("atom:link", ns):
+        if link.get("title") == "pdf":
+            links["pdf"] = link.get("href")
+        elif link.get("rel") == "alternate":
+            links["abstract"] = link.get("href")
+    
+    return {
+        "title": title,
+        "authors": authors,
+        "abstract": summary[:500] + "...",
+        "source": "arXiv",
+        "url": links.get("abstract", ""),
+        "pdf_url": links.get("pdf", ""),
+        "date": published,
+        "citations": 0, 
+        "tags": ["arXiv"]
+    }
+
+async def arxiv_entries(params, start: int, rows: int, page: SourcePage) -> AsyncIterator[Dict]:
+    base_url = f"{settings.ARXIV_BASE_URL}/query"
     
     query_parts = []
     if params.query:
@@ -26,64 +89,76 @@ async def search_arxiv(params) -> List[Dict]:
     
     params_dict = {
         "search_query": query_string,
-        "start": 0,
-        "max_results": min(params.max_results, 50),
+        "start": start,
+        "max_results": rows,
         "sortBy": "submittedDate",
         "sortOrder": "descending"
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(base_url, params=params_dict)
-        
-    if response.status_code != 200:
-        return []
+    # The Atom feed is parsed as it arrives: each entry is yielded as soon
+    # as its closing tag is read and then cleared, so memory stays flat
+    # however large the page.
+    parser = ET.XMLPullParser(events=("end",))
+    count, total = 0, None
+    async with get_http_client().stream("GET", base_url, params=params_dict) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            parser.feed(chunk)
+            for _, element in parser.read_events():
+                if element.tag == f"{ATOM_NS}entry":
+                    count += 1
+                    yield _arxiv_result(element)
+                    element.clear()
+                elif element.tag == f"{OPENSEARCH_NS}totalResults":
+                    total = int(element.text or 0)
+    parser.close()
     
-    root = ET.fromstring(response.text)
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
+    if count == rows and (total is None or start + count < total):
+        page.next = start + count
+
+def _crossref_result(item: Dict) -> Dict:
+    title = item.get("title", ["Untitled"])[0]
     
-    results = []
-    for entry in root.findall("atom:entry", ns):
-        title = entry.find("atom:title", ns).text.strip()
-        summary = entry.find("atom:summary", ns).text.strip()
-        
-        
-        authors = []
-        for author in entry.findall("atom:author", ns):
-            name = author.find("atom:name", ns).text
+    
+    authors = []
+    for author in item.get("author", []):
+        name = f"{author.get('given', '')} {author.get('family', '')}".strip()
+        if name:
             authors.append(name)
-        
-        
-        published = entry.find("atom:published", ns).text[:10]
-        
-       
-        links = {}
-        for link in entry.findall("atom:link", ns):
-            if link.get("title") == "pdf":
-                links["pdf"] = link.get("href")
-            elif link.get("rel") == "alternate":
-                links["abstract"] = link.get("href")
-        
-        results.append({
-            "title": title,
-            "authors": authors,
-            "abstract": summary[:500] + "...",
-            "source": "arXiv",
-            "url": links.get("abstract", ""),
-            "pdf_url": links.get("pdf", ""),
-            "date": published,
-            "citations": 0, 
-            "tags": ["arXiv"]
-        })
-    
-    return results
-
-async def search_crossref(params) -> List[Dict]:
-    
-    base_url = "https://api.crossref.org/works"
     
+    
+    published = item.get("published", {}).get("date-parts", [[None]])[0]
+    if published[0]:
+        date_str = f"{published[0]}-{published[1] if len(published) > 1 else '01'}-{published[2] if len(published) > 2 else '01'}"
+    else:
+        date_str = "2025-01-01"
+    
+   
+    doi = item.get("DOI", "")
+    url = f"https://doi.org/{doi}" if doi else ""
+    
+    return {
+        "title": title,
+        "authors": authors,
+        "abstract": item.get("abstract", "No abstract available.")[:500] + "...",
+        "source": item.get("container-title", ["Unknown"])[0],
+        "url": url,
+        "doi": doi,
+        "date": date_str,
+        "citations": item.get("is-referenced-by-count", 0),
+        "tags": ["Crossref"]
+    }
+
+async def crossref_entries(params, cursor: str, rows: int, page: SourcePage) -> AsyncIterator[Dict]:
+    
+    base_url = f"{settings.CROSSREF_BASE_URL}/works"
+    
+    # Crossref's deep paging: "*" starts a cursor, each response carries
+    # the next one.
     query_params = {
         "query": params.query,
-        "rows": min(params.max_results, 50),
+        "rows": rows,
+        "cursor": cursor,
         "sort": "published",
         "order": "desc"
     }
@@ -97,46 +172,299 @@ async def search_crossref(params) -> List[Dict]:
         if params.year_to:
             query_params["filter"] = f"until-pub-date:{params.year_to}"
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(base_url, params=query_params)
-        
-    if response.status_code != 200:
-        return []
+    response = await get_http_client().get(base_url, params=query_params)
+    response.raise_for_status()
     
-    data = response.json()
-    results = []
+    message = response.json().get("message", {})
+    items = message.get("items", [])
+    if len(items) == rows and message.get("next-cursor"):
+        page.next = message["next-cursor"]
     
-    for item in data.get("message", {}).get("items", []):
-        title = item.get("title", ["Untitled"])[0]
-        
-        
-        authors = []
-        for author in item.get("author", []):
-            name = f"{author.get('given', '')} {author.get('family', '')}".strip()
-            if name:
-                authors.append(name)
-        
-        
-        published = item.get("published", {}).get("date-parts", [[None]])[0]
-        if published[0]:
-            date_str = f"{published[0]}-{published[1] if len(published) > 1 else '01'}-{published[2] if len(published) > 2 else '01'}"
-        else:
-            date_str = "2025-01-01"
-        
-       
-        doi = item.get("DOI", "")
-        url = f"https://doi.org/{doi}" if doi else ""
-        
-        results.append({
-            "title": title,
-            "authors": authors,
-            "abstract": item.get("abstract", "No abstract available.")[:500] + "...",
-            "source": item.get("container-title", ["Unknown"])[0],
-            "url": url,
-            "doi": doi,
-            "date": date_str,
-            "citations": item.get("is-referenced-by-count", 0),
-            "tags": ["Crossref"]
-        })
-    
-    return results
\ No newline at end of file
+    for item in items:
+        yield _crossref_result(item)
+
+
+class Source(NamedTuple):
+    entries: Callable[..., AsyncIterator[Dict]]
+    start: object  # position of the first page
+
+
+SOURCES = {
+    "arXiv": Source(arxiv_entries, 0),
+    "Crossref": Source(crossref_entries, "*"),
+}
+
+
+def select_sources(params) -> Dict[str, Source]:
+    sources = {}
+    if not params.source or params.source == "All Sources" or params.source == "arXiv":
+        sources["arXiv"] = SOURCES["arXiv"]
+    if not params.source or params.source == "All Sources":
+        sources["Crossref"] = SOURCES["Crossref"]
+    return sources
+
+
+# Cursor state entry: digests of the identity keys of results a page
+# served from the catalog, in whole or to fill it up. Later pages go
+# upstream, so anything already sent is skipped there.
+SERVED = "served"
+
+
+def _digest(key: str) -> str:
+    return hashlib.sha1(key.encode()).hexdigest()[:10]
+
+
+def _served_keys(results: List[Dict]) -> List[str]:
+    return sorted({_digest(key) for result in results for key in identity_keys(result)})
+
+
+def _served(state: Optional[Dict]) -> Set[str]:
+    served = (state or {}).get(SERVED)
+    return {str(key) for key in served} if isinstance(served, list) else set()
+
+
+def _was_served(result: Dict, served: Set[str]) -> bool:
+    return bool(served) and any(_digest(key) in served for key in identity_keys(result))
+
+
+def _next_state(next_state: Dict, served: Set[str]) -> Dict:
+    # {} still means every source is exhausted.
+    if next_state and served:
+        next_state[SERVED] = sorted(served)
+    return next_state
+
+
+def _positions(params, state: Optional[Dict]) -> Dict[str, Tuple[Source, object]]:
+    # Without a cursor every selected source starts at its first page; with
+    # one, only sources that still have results are asked again.
+    sources = select_sources(params)
+    if state is None:
+        return {name: (source, source.start) for name, source in sources.items()}
+    return {name: (source, state[name]) for name, source in sources.items() if name in state}
+
+
+def _page_size(params) -> int:
+    return min(max(params.max_results, 1), settings.SEARCH_MAX_PAGE_SIZE)
+
+
+def _page_rows(params, sources: int) -> int:
+    # The requested page size is split across the sources being queried.
+    return -(-_page_size(params) // max(sources, 1))
+
+
+def _track(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def stop_search_tasks():
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+def _normalize_text(value) -> str:
+    return " ".join(value.lower().split()) if value else ""
+
+
+def search_cache_key(source: str, params, position, rows: int) -> str:
+    normalized = {
+        "source": source,
+        "query": _normalize_text(params.query),
+        "author": _normalize_text(params.author),
+        "year_from": params.year_from,
+        "year_to": params.year_to,
+        "position": position,
+        "rows": rows
+    }
+    raw = json.dumps(normalized, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def cached_search(name: str, source: Source, params, position, rows: int) -> Dict:
+    key = search_cache_key(name, params, position, rows)
+    cached = await search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fetch():
+        page = SourcePage()
+        results = [result async for result in source.entries(params, position, rows, page)]
+        fresh = {"results": results, "next": page.next}
+        await search_cache.set(key, fresh)
+        _track(record_results(name, results))
+        return fresh
+
+    return await search_flight.do(key, fetch)
+
+
+async def streamed_search(name: str, source: Source, params, position, rows: int, page: SourcePage) -> AsyncIterator[Dict]:
+    # Same cache as cached_search; a miss is relayed entry by entry and
+    # stored once the page is complete.
+    key = search_cache_key(name, params, position, rows)
+    cached = await search_cache.get(key)
+    if cached is not None:
+        page.next = cached["next"]
+        for result in cached["results"]:
+            yield result
+        return
+
+    results = []
+    upstream = SourcePage()
+    async for result in source.entries(params, position, rows, upstream):
+        results.append(result)
+        yield result
+    page.next = upstream.next
+    await search_cache.set(key, {"results": results, "next": upstream.next})
+    _track(record_results(name, results))
+
+
+def search_cache_stats() -> Dict:
+    return {
+        **search_cache.info(),
+        "coalesced": search_flight.coalesced,
+        "inflight": search_flight.inflight,
+        **_stats
+    }
+
+
+async def run_source(name: str, source: Source, params, position, rows: int) -> Dict:
+    # A slow or failing upstream only costs its own results, never the
+    # whole response.
+    try:
+        return await asyncio.wait_for(cached_search(name, source, params, position, rows), timeout=settings.SEARCH_SOURCE_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"{name} search timed out after {settings.SEARCH_SOURCE_TIMEOUT}s")
+    except Exception as e:
+        print(f"{name} search failed: {e}")
+    _stats["upstream_failures"] += 1
+    return {"results": [], "next": None}
+
+
+async def _serve_from_catalog(params, positions: Dict, rows: int, local: List[Dict]) -> bool:
+    # Stale-while-revalidate: a first page the catalog can fill on its own
+    # is answered from it unless every upstream page is already cached;
+    # the missing pages are then fetched (and cached, and recorded) in the
+    # background.
+    if len(local) < _page_size(params):
+        return False
+    stale = [
+        (name, source, position) for name, (source, position) in positions.items()
+        if await search_cache.get(search_cache_key(name, params, position, rows)) is None
+    ]
+    if not stale:
+        return False
+    _stats["catalog_served"] += 1
+    for name, source, position in stale:
+        _stats["background_refreshes"] += 1
+        _track(run_source(name, source, params, position, rows))
+    return True
+
+
+def _catalog_page(params, positions: Dict, local: List[Dict]) -> Tuple[List[Dict], Dict]:
+    # Later pages go upstream starting from the first page, which the
+    # background refresh will have cached by then, minus what this page
+    # already sent.
+    results = rank_results(merge_results(local), params.query)[:_page_size(params)]
+    next_state = {name: position for name, (_, position) in positions.items()}
+    return results, _next_state(next_state, set(_served_keys(results)))
+
+
+def _fill_from_catalog(params, index: ResultIndex, local: List[Dict]) -> List[Dict]:
+    # An upstream that is down, slow or short on results leaves room on the
+    # page; catalog matches take it instead of the page coming back empty.
+    added = []
+    room = _page_size(params) - len(index.results)
+    for result in rank_results(local, params.query):
+        if room <= 0:
+            break
+        if index.add(result):
+            added.append(result)
+            room -= 1
+    return added
+
+
+async def search_all_sources(params, state: Optional[Dict] = None) -> Tuple[List[Dict], Dict]:
+    """One page from every source, deduplicated across sources and ranked
+    by relevance to the query. First pages may come from the local catalog
+    (see _serve_from_catalog). Returns the results and the cursor state
+    for the next page ({} when all sources are exhausted)."""
+    positions = _positions(params, state)
+    rows = _page_rows(params, len(positions))
+    local = await catalog_search(params, settings.SEARCH_CATALOG_CANDIDATES) if state is None else []
+    if await _serve_from_catalog(params, positions, rows, local):
+        return _catalog_page(params, positions, local)
+
+    pages = await asyncio.gather(*(
+        run_source(name, source, params, position, rows) for name, (source, position) in positions.items()
+    ))
+
+    served = _served(state)
+    index = ResultIndex()
+    next_state = {}
+    for name, page in zip(positions, pages):
+        for result in page["results"]:
+            if not _was_served(result, served):
+                index.add(result)
+        if page["next"] is not None:
+            next_state[name] = page["next"]
+    # Catalog rows used to fill the page may still turn up upstream later.
+    served.update(_served_keys(_fill_from_catalog(params, index, local)))
+    return rank_results(index.results, params.query), _next_state(next_state, served)
+
+
+async def stream_all_sources(params, state: Optional[Dict], page: SourcePage) -> AsyncIterator[Dict]:
+    """Like search_all_sources, but yields results as any source produces
+    them: duplicates of a result already sent are dropped, and there is no
+    reranking. page.next holds the next cursor state once iteration ends."""
+    positions = _positions(params, state)
+    rows = _page_rows(params, len(positions))
+    local = await catalog_search(params, settings.SEARCH_CATALOG_CANDIDATES) if state is None else []
+    if await _serve_from_catalog(params, positions, rows, local):
+        results, page.next = _catalog_page(params, positions, local)
+        for result in results:
+            yield result
+        return
+
+    served = _served(state)
+    queue: asyncio.Queue = asyncio.Queue()
+    index = ResultIndex()
+    next_state = {}
+
+    async def pump(name: str, source: Source, position):
+        source_page = SourcePage()
+
+        async def drain():
+            async for result in streamed_search(name, source, params, position, rows, source_page):
+                await queue.put(result)
+
+        try:
+            await asyncio.wait_for(drain(), timeout=settings.SEARCH_SOURCE_TIMEOUT)
+            if source_page.next is not None:
+                next_state[name] = source_page.next
+        except asyncio.TimeoutError:
+            print(f"{name} search timed out after {settings.SEARCH_SOURCE_TIMEOUT}s")
+        except Exception as e:
+            print(f"{name} search failed: {e}")
+        finally:
+            queue.put_nowait(None)
+
+    tasks = [asyncio.create_task(pump(name, source, position)) for name, (source, position) in positions.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            result = await queue.get()
+            if result is None:
+                remaining -= 1
+                continue
+            if not _was_served(result, served) and index.add(result):
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+    for result in _fill_from_catalog(params, index, local):
+        served.update(_served_keys([result]))
+        yield result
+    page.next = _next_state(next_state, served)
@@ -0,0 +1,239 @@
+import hashlib
+import os
+import tempfile
+from typing import AsyncIterator, Dict, List, NamedTuple, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.blob import PaperBlob
+from services.chunk_index import remove_chunks
+
+
+# Plain form fields sent alongside an upload (title, workspace ids).
+MAX_FORM_FIELD_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+class StoredUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "blobs", sha256[:2], f"{sha256}.pdf")
+
+
+class MultipartUpload(NamedTuple):
+    stored: StoredUpload
+    filename: str
+    fields: Dict[str, str]
+
+
+async def receive_multipart(
+    content_type: str,
+    body: AsyncIterator[bytes],
+    file_field: str = "file",
+    max_size: int = None
+) -> MultipartUpload:
+    """Parses a multipart/form-data body as it arrives off the socket. The
+    `file_field` part is passed chunk by chunk to receive_stream; other
+    parts are small form fields, returned as text."""
+    mime, params = parse_options_header(content_type or "")
+    if mime != b"multipart/form-data" or not params.get(b"boundary"):
+        raise InvalidUpload("Expected a multipart/form-data body")
+
+    fields: Dict[str, str] = {}
+    file_data: List[bytes] = []
+    upload = {}
+    # Current part: its raw headers, then its kind ("file", "field" or
+    # None to skip) and, for fields, the value read so far.
+    part = {}
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, header=b"", value=b"", kind=None, data=b"")
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header"].lower()] = part["value"]
+        part["header"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        if filename is None:
+            part["kind"] = "field"
+        elif part["name"] == file_field and "filename" not in upload:
+            upload["filename"] = filename.decode("utf-8", "replace")
+            if os.path.splitext(upload["filename"])[1].lower() not in settings.ALLOWED_EXTENSIONS:
+                allowed = "/".join(sorted(ext.lstrip(".").upper() for ext in settings.ALLOWED_EXTENSIONS))
+                raise InvalidUpload(f"Only {allowed} files are allowed")
+            part["kind"] = "file"
+
+    def on_part_data(data, start, end):
+        if part["kind"] == "file":
+            file_data.append(data[start:end])
+        elif part["kind"] == "field":
+            part["data"] += data[start:end]
+            if len(part["data"]) > MAX_FORM_FIELD_SIZE:
+                raise InvalidUpload(f"Form field {part['name']!r} is too large")
+
+    def on_part_end():
+        if part["kind"] == "field":
+            fields[part["name"]] = part["data"].decode("utf-8", "replace")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async def file_chunks():
+        async for chunk in body:
+            parser.write(chunk)
+            yield b"".join(file_data)
+            file_data.clear()
+        parser.finalize()
+        yield b"".join(file_data)
+
+    # An oversized or rejected file stops the read right there; the rest
+    # of the body is never consumed.
+    stored = await receive_stream(file_chunks(), max_size)
+    if "filename" not in upload:
+        os.remove(stored.path)
+        raise InvalidUpload(f"Missing file field {file_field!r}")
+    return MultipartUpload(stored=stored, filename=upload["filename"], fields=fields)
+
+
+async def receive_stream(chunks: AsyncIterator[bytes], max_size: int = None) -> StoredUpload:
+    # Single pass over the content: size is enforced chunk by chunk and the
+    # content hash is computed while the bytes are written to a temp file
+    # on the same filesystem as the blob store, so adopting it is a rename.
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+                hasher.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return StoredUpload(path=tmp_path, size=size, sha256=hasher.hexdigest())
+
+
+def _adopt_file(tmp_path: str, path: str):
+    # The new copy always replaces whatever is at `path`: same content, and
+    # an atomic rename, so a file a concurrent release is unlinking can't
+    # be mistaken for a live one.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
+
+
+async def acquire_blob(db: AsyncSession, stored: StoredUpload) -> Tuple[PaperBlob, bool]:
+    """Takes a reference on the blob for `stored`, creating it if the content
+    is new. Returns the blob and whether it was created.
+
+    Nothing is committed: the caller commits the reference together with
+    the row that holds it, or hands both to discard_blob."""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    try:
+        for _ in range(3):
+            result = await db.execute(
+                dialect.insert(PaperBlob).values(
+                    sha256=stored.sha256,
+                    file_path=blob_path(stored.sha256),
+                    file_size=stored.size,
+                    ref_count=1,
+                    extraction_status="pending"
+                ).on_conflict_do_nothing(index_elements=[PaperBlob.sha256]).returning(PaperBlob.id)
+            )
+            created = result.scalar() is not None
+            if not created:
+                result = await db.execute(
+                    update(PaperBlob)
+                    .where(PaperBlob.sha256 == stored.sha256)
+                    .values(ref_count=PaperBlob.ref_count + 1)
+                )
+                if not result.rowcount:
+                    # Released and deleted between the two statements.
+                    continue
+
+            blob = await db.scalar(
+                select(PaperBlob)
+                .where(PaperBlob.sha256 == stored.sha256)
+                .execution_options(populate_existing=True)
+            )
+            _adopt_file(stored.path, blob.file_path)
+            return blob, created
+    finally:
+        if os.path.exists(stored.path):
+            os.remove(stored.path)
+
+    raise RuntimeError(f"Could not store blob {stored.sha256}")
+
+
+async def discard_blob(db: AsyncSession, blob: PaperBlob, created: bool):
+    """Rolls back an uncommitted acquire_blob."""
+    if created and os.path.exists(blob.file_path):
+        # Nobody else can reference the row before it commits.
+        os.remove(blob.file_path)
+    await db.rollback()
+
+
+async def release_blob(db: AsyncSession, blob_id: int):
+    """Drops a reference on the blob and commits, along with anything else
+    pending in `db`. The last reference deletes the blob and its file."""
+    await db.execute(
+        update(PaperBlob)
+        .where(PaperBlob.id == blob_id)
+        .values(ref_count=PaperBlob.ref_count - 1)
+    )
+    # Conditional delete: a concurrent acquire that bumped the count back
+    # up keeps the blob alive.
+    result = await db.execute(
+        delete(PaperBlob)
+        .where(PaperBlob.id == blob_id, PaperBlob.ref_count <= 0)
+        .returning(PaperBlob.file_path)
+    )
+    file_path = result.scalar()
+    # Unlinked before the commit, while the row is still locked: an acquire
+    # of the same content waits for this transaction and then puts its own
+    # copy in place.
+    if file_path is not None and os.path.exists(file_path):
+        os.remove(file_path)
+    await db.commit()
+
+    if file_path is not None:
+        await remove_chunks(db, blob_id)
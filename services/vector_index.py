@@ -0,0 +1,293 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.embedding import PaperEmbedding
+from models.workspace import workspace_papers
+from utils.cache import CacheStats
+
+
+class IVFIndex:
+    """Inverted-file ANN index: vectors are clustered with spherical k-means
+    and a query only scans the `nprobe` clusters closest to it."""
+
+    def __init__(self, vectors: np.ndarray, nlist: int, iterations: int = 8, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(vectors)))
+        centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = self._assign(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignment = self._assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        self.centroids = centroids
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, batch: int = 16384) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch):
+            assignment[start:start + batch] = np.argmax(vectors[start:start + batch] @ centroids.T, axis=1)
+        return assignment
+
+    def updated(self, keep: Optional[np.ndarray], vectors: np.ndarray, start: int) -> "IVFIndex":
+        """A copy with the rows where `keep` is False dropped (surviving rows
+        renumbered in order) and `vectors`, numbered from `start`, added to
+        the lists of their nearest centroids. Centroids are not retrained."""
+        index = IVFIndex.__new__(IVFIndex)
+        index.centroids = self.centroids
+        lists = self.lists
+        if keep is not None:
+            renumber = np.cumsum(keep) - 1
+            lists = [renumber[rows[keep[rows]]] for rows in lists]
+        if len(vectors):
+            assignment = self._assign(vectors, self.centroids)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(len(lists) + 1))
+            added = start + order
+            lists = [np.concatenate([rows, added[bounds[i]:bounds[i + 1]]]) for i, rows in enumerate(lists)]
+        index.lists = lists
+        return index
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nprobe = min(nprobe, len(self.lists))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([self.lists[i] for i in closest])
+
+
+class VectorStore:
+    """Chunk vectors of one owner's papers as a single contiguous float32
+    matrix, with parallel arrays mapping each row to its embedding row id
+    and paper id."""
+
+    def __init__(self, row_ids: np.ndarray, paper_ids: np.ndarray, vectors: np.ndarray, ivf: Optional[IVFIndex] = None, clustered: int = 0):
+        self.row_ids = row_ids
+        self.paper_ids = paper_ids
+        self.vectors = vectors
+        self.ivf = ivf
+        # Store size when the IVF centroids were last trained.
+        self.clustered = clustered
+        if len(vectors) >= settings.VECTOR_ANN_MIN_VECTORS and (ivf is None or len(vectors) >= 2 * clustered):
+            self.ivf = IVFIndex(vectors, nlist=int(np.sqrt(len(vectors))))
+            self.clustered = len(vectors)
+        elif len(vectors) < settings.VECTOR_ANN_MIN_VECTORS:
+            self.ivf = None
+
+    @staticmethod
+    def _arrays(rows, dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32)
+        row_ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+        paper_ids = np.fromiter((row.paper_id for row in rows), dtype=np.int64, count=len(rows))
+        vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32).reshape(len(rows), dim)
+        return row_ids, paper_ids, vectors
+
+    @classmethod
+    def from_rows(cls, rows) -> "VectorStore":
+        # Vectors are stored as raw float32 buffers, so their byte length
+        # gives the dimension without loading the embedding model here.
+        dim = len(rows[0].vector) // 4 if rows else 0
+        return cls(*cls._arrays(rows, dim))
+
+    def updated(self, rows, live_row_ids: Optional[np.ndarray] = None) -> "VectorStore":
+        """A copy with `rows` appended and, if `live_row_ids` is given, every
+        other existing row dropped. The IVF lists are updated in place of a
+        re-clustering until the store has doubled in size."""
+        keep = None
+        row_ids, paper_ids, vectors = self.row_ids, self.paper_ids, self.vectors
+        if live_row_ids is not None:
+            keep = np.isin(row_ids, live_row_ids)
+            row_ids, paper_ids, vectors = row_ids[keep], paper_ids[keep], vectors[keep]
+        start = len(row_ids)
+        added = self._arrays(rows, self.vectors.shape[1])
+        ivf = self.ivf.updated(keep, added[2], start) if self.ivf is not None else None
+        return VectorStore(
+            np.concatenate([row_ids, added[0]]),
+            np.concatenate([paper_ids, added[1]]),
+            np.concatenate([vectors, added[2]]),
+            ivf=ivf,
+            clustered=self.clustered
+        )
+
+    def __len__(self):
+        return len(self.paper_ids)
+
+    def paper_vector(self, paper_id: int) -> Optional[np.ndarray]:
+        rows = self.vectors[self.paper_ids == paper_id]
+        if not len(rows):
+            return None
+        mean = rows.mean(axis=0)
+        norm = np.linalg.norm(mean)
+        return mean / norm if norm else mean
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        allowed_ids: Optional[np.ndarray] = None,
+        exclude_id: Optional[int] = None,
+        exact: bool = False
+    ) -> List[Tuple[int, float]]:
+        if self.ivf is not None and not exact:
+            rows = self.ivf.candidates(query, settings.VECTOR_ANN_NPROBE)
+        else:
+            rows = np.arange(len(self.paper_ids))
+
+        candidate_ids = self.paper_ids[rows]
+        keep = np.ones(len(rows), dtype=bool)
+        if allowed_ids is not None:
+            keep &= np.isin(candidate_ids, allowed_ids)
+        if exclude_id is not None:
+            keep &= candidate_ids != exclude_id
+        rows, candidate_ids = rows[keep], candidate_ids[keep]
+        if not len(rows):
+            return []
+
+        # A paper scores as its best-matching chunk.
+        scores = self.vectors[rows] @ query
+        results = []
+        seen = set()
+        for index in np.argsort(-scores):
+            paper_id = int(candidate_ids[index])
+            if paper_id in seen:
+                continue
+            seen.add(paper_id)
+            results.append((paper_id, float(scores[index])))
+            if len(results) == k:
+                break
+        return results
+
+
+# (owner_id, model) -> ((row count, max row id), store), least recently used first
+# and bounded by the total number of vectors held. The signature check
+# keeps every worker process consistent with the table without extra
+# messaging.
+_stores: "OrderedDict[Tuple[int, str], Tuple[Tuple[int, int], VectorStore]]" = OrderedDict()
+_stats = CacheStats()
+
+
+def _cache_store(key: Tuple[int, str], signature: Tuple[int, int], store: VectorStore):
+    _stores[key] = (signature, store)
+    _stores.move_to_end(key)
+    held = sum(len(cached) for _, cached in _stores.values())
+    while held > settings.VECTOR_CACHE_MAX_VECTORS and len(_stores) > 1:
+        _, (_, evicted) = _stores.popitem(last=False)
+        held -= len(evicted)
+        _stats.evictions += 1
+
+
+async def _owner_store(db: AsyncSession, owner_id: int, model: str) -> VectorStore:
+    owned = (PaperEmbedding.owner_id == owner_id, PaperEmbedding.model == model)
+    result = await db.execute(select(func.count(PaperEmbedding.id), func.max(PaperEmbedding.id)).where(*owned))
+    signature = tuple(result.one())
+
+    key = (owner_id, model)
+    cached = _stores.get(key)
+    if cached and cached[0] == signature:
+        _stores.move_to_end(key)
+        _stats.hits += 1
+        return cached[1]
+    _stats.misses += 1
+
+    # Embedding rows are only ever inserted (with growing ids) or deleted,
+    # so a cached store needs just the rows past its max id, plus the live
+    # ids when some of its rows are gone.
+    if cached and cached[0][1] is not None:
+        (count, max_id), store = cached
+        result = await db.execute(
+            select(PaperEmbedding.id, PaperEmbedding.paper_id, PaperEmbedding.vector)
+            .where(*owned, PaperEmbedding.id > max_id)
+            .order_by(PaperEmbedding.id)
+        )
+        rows = result.all()
+        live_row_ids = None
+        if count + len(rows) != signature[0]:
+            result = await db.execute(select(PaperEmbedding.id).where(*owned, PaperEmbedding.id <= max_id))
+            live_row_ids = np.array(result.scalars().all(), dtype=np.int64)
+        store = await asyncio.to_thread(store.updated, rows, live_row_ids)
+    else:
+        result = await db.execute(
+            select(PaperEmbedding.id, PaperEmbedding.paper_id, PaperEmbedding.vector)
+            .where(*owned)
+            .order_by(PaperEmbedding.id)
+        )
+        rows = result.all()
+        # Building the matrix (and the IVF clustering for large owners) is
+        # CPU work; keep it off the event loop.
+        store = await asyncio.to_thread(VectorStore.from_rows, rows)
+
+    _cache_store(key, signature, store)
+    return store
+
+
+def vector_cache_stats() -> Dict:
+    return {
+        "owners": len(_stores),
+        "vectors": sum(len(store) for _, store in _stores.values()),
+        "max_vectors": settings.VECTOR_CACHE_MAX_VECTORS,
+        **_stats.as_dict()
+    }
+
+
+async def related_papers(
+    db: AsyncSession,
+    owner_id: int,
+    paper_id: int,
+    k: int = 10,
+    workspace_id: Optional[int] = None
+) -> List[Tuple[int, float]]:
+    # Vectors are only comparable within one model; the paper's own
+    # embeddings (written by ingestion) say which one to search, so the web
+    # process never needs the model itself.
+    model = await db.scalar(
+        select(PaperEmbedding.model)
+        .where(PaperEmbedding.owner_id == owner_id, PaperEmbedding.paper_id == paper_id)
+        .limit(1)
+    )
+    if model is None:
+        return []
+    store = await _owner_store(db, owner_id, model)
+    query = store.paper_vector(paper_id)
+    if query is None:
+        return []
+
+    allowed_ids = None
+    if workspace_id:
+        result = await db.execute(
+            select(workspace_papers.c.paper_id).where(workspace_papers.c.workspace_id == workspace_id)
+        )
+        allowed_ids = np.array(result.scalars().all(), dtype=np.int64)
+
+    return store.search(query, k, allowed_ids=allowed_ids, exclude_id=paper_id)
+
+
+async def store_embeddings(db: AsyncSession, papers: List[Tuple[int, int]], model: str, vectors: List[bytes]):
+    # papers: (paper_id, owner_id) pairs that share the embedded text.
+    paper_ids = [paper_id for paper_id, _ in papers]
+    await db.execute(delete(PaperEmbedding).where(PaperEmbedding.paper_id.in_(paper_ids)))
+    db.add_all([
+        PaperEmbedding(paper_id=paper_id, owner_id=owner_id, chunk_index=index, model=model, vector=vector)
+        for paper_id, owner_id in papers
+        for index, vector in enumerate(vectors)
+    ])
+    await db.commit()
+
+
+async def remove_embeddings(db: AsyncSession, paper_ids: List[int]):
+    await db.execute(delete(PaperEmbedding).where(PaperEmbedding.paper_id.in_(paper_ids)))
+    await db.commit()
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# The app reads its settings and creates its engines at import time, so
+# the environment is pointed at a scratch directory and SQLite database
+# before anything from the repo is imported.
+_workdir = tempfile.mkdtemp(prefix="researchhub-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["GROQ_API_KEY"] = ""
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["CACHE_BACKEND"] = "memory"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def register(client) -> dict:
+    """Registers a new user and returns its auth headers."""
+    name = uuid.uuid4().hex[:12]
+    email = f"{name}@example.com"
+    response = client.post("/api/auth/register", json={"email": email, "username": name, "password": "pw"})
+    assert response.status_code == 200, response.text
+    token = client.post("/api/auth/token", data={"username": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def auth(client):
+    return register(client)
+
+
+def make_pdf(*pages: str) -> bytes:
+    """A minimal text PDF, one page per argument."""
+    objects = ["<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    kids = []
+    for page in pages:
+        stream = "BT /F1 12 Tf 50 750 Td 14 TL " + " ".join(
+            "({}) Tj T*".format(line.replace("(", "").replace(")", "")) for line in page.split("\n")
+        ) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+            "/Resources << /Font << /F1 1 0 R >> >> >>"
+        )
+        kids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [{}] /Count {} >>".format(" ".join(f"{kid} 0 R" for kid in kids), len(kids))
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {len(objects)} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def upload_pdf(client, auth, content: bytes, filename: str = "paper.pdf") -> dict:
+    response = client.post("/api/papers/upload", files={"file": (filename, content, "application/pdf")}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def wait_for_extraction(client, auth, paper_id: int) -> dict:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/papers/{paper_id}/status", headers=auth).json()
+        if status["extraction_status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.05)
+    pytest.fail(f"paper {paper_id} still {status['extraction_status']}")
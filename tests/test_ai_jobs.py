@@ -0,0 +1,165 @@
+import time
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from api.ai_tools import _job_events
+from conftest import register
+from config import settings
+from database import AsyncSessionLocal
+from models.paper import Paper
+from services import ai_jobs
+from services.analysis_cache import analysis_cache_key, lookup_analysis
+
+
+def _paper(client, auth) -> int:
+    # A unique abstract per test keeps the analysis cache key unique too.
+    response = client.post("/api/papers/", json={
+        "title": "Attention Is All You Need",
+        "abstract": f"We propose the Transformer, based solely on attention. {uuid.uuid4().hex}"
+    }, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _wait(client, auth, job_id: int, statuses=("completed", "failed")) -> dict:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/ai-tools/jobs/{job_id}", headers=auth).json()
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"job {job_id} stuck in {job['status']}")
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "AI_JOB_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "AI_JOB_MAX_ATTEMPTS", 2)
+
+
+def _generate(monkeypatch, job_type: str, generate):
+    monkeypatch.setitem(ai_jobs.JOB_TYPES, job_type, ai_jobs.JOB_TYPES[job_type]._replace(generate=generate))
+
+
+def test_job_completes_and_identical_job_hits_cache(client, auth):
+    paper_id = _paper(client, auth)
+
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [paper_id]}, headers=auth).json()
+    assert submitted["status"] == "queued"
+    job = _wait(client, auth, submitted["job_id"])
+    assert job["status"] == "completed"
+    assert job["attempts"] == 1
+    assert job["progress"] == 1.0
+    analysis = client.get(f"/api/ai-tools/analyses/{job['analysis_id']}", headers=auth).json()
+    assert "Attention Is All You Need" in analysis["content"]
+    assert analysis["analysis_metadata"]["paper_titles"] == ["Attention Is All You Need"]
+
+    # Same inputs, model and prompt: answered from the cache at submit time.
+    repeat = client.post("/api/ai-tools/summaries", json={"paper_ids": [paper_id]}, headers=auth).json()
+    assert repeat["status"] == "completed"
+    job = client.get(f"/api/ai-tools/jobs/{repeat['job_id']}", headers=auth).json()
+    cached = client.get(f"/api/ai-tools/analyses/{job['analysis_id']}", headers=auth).json()
+    assert cached["content"] == analysis["content"]
+    assert cached["analysis_metadata"]["cached"] is True
+
+
+def test_failed_attempt_is_retried(client, auth, monkeypatch, fast_retries):
+    calls = []
+
+    async def flaky(texts, titles, on_token=None, on_progress=None):
+        calls.append(titles)
+        if len(calls) == 1:
+            raise RuntimeError("provider hiccup")
+        return "recovered"
+
+    _generate(monkeypatch, "summary", flaky)
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [_paper(client, auth)]}, headers=auth).json()
+    job = _wait(client, auth, submitted["job_id"])
+    assert job["status"] == "completed"
+    assert job["attempts"] == 2
+    assert job["error"] is None
+    assert len(calls) == 2
+
+
+def test_job_fails_after_max_attempts(client, auth, monkeypatch, fast_retries):
+    async def broken(texts, titles, on_token=None, on_progress=None, on_section=None):
+        raise RuntimeError("provider down")
+
+    _generate(monkeypatch, "insights", broken)
+    submitted = client.post("/api/ai-tools/insights", json={"paper_ids": [_paper(client, auth)]}, headers=auth).json()
+    job = _wait(client, auth, submitted["job_id"])
+    assert job["status"] == "failed"
+    assert job["attempts"] == 2
+    assert job["error"] == "provider down"
+    assert job["analysis_id"] is None
+
+    # A job that has already failed streams its error from the database.
+    events = client.get(f"/api/ai-tools/jobs/{submitted['job_id']}/stream", headers=auth).text
+    assert "event: error" in events and "provider down" in events
+
+
+def test_other_users_cannot_see_job(client, auth):
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [_paper(client, auth)]}, headers=auth).json()
+    other = register(client)
+    assert client.get(f"/api/ai-tools/jobs/{submitted['job_id']}", headers=other).status_code == 404
+    assert client.get(f"/api/ai-tools/jobs/{submitted['job_id']}/stream", headers=other).status_code == 404
+
+
+def test_event_stream_ends_when_job_is_gone(client):
+    async def collect():
+        return [event async for event in _job_events(10 ** 9)]
+
+    events = client.portal.call(collect)
+    assert len(events) == 1
+    assert events[0].startswith("event: error")
+    assert "Job not found" in events[0]
+
+
+def test_paper_without_blob_is_analysed_from_its_extracted_text(client, auth, monkeypatch):
+    paper_id = _paper(client, auth)
+    body = f"Multi-head attention lets the model attend to several subspaces. {uuid.uuid4().hex}"
+
+    async def set_text():
+        # Text stored on the paper itself, as before the blob store existed.
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Paper).where(Paper.id == paper_id).values(extracted_text=body))
+            await db.commit()
+
+    client.portal.call(set_text)
+    seen = []
+
+    async def capture(texts, titles, on_token=None, on_progress=None):
+        seen.extend(texts)
+        return "summary"
+
+    _generate(monkeypatch, "summary", capture)
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [paper_id]}, headers=auth).json()
+    assert _wait(client, auth, submitted["job_id"])["status"] == "completed"
+    assert len(seen) == 1 and body in seen[0]
+
+
+def test_job_with_no_text_left_fails_without_caching(client, auth, monkeypatch, fast_retries):
+    calls = []
+
+    async def no_text(db, papers):
+        return {"texts": [], "titles": []}
+
+    async def generate(texts, titles, on_token=None, on_progress=None):
+        calls.append(titles)
+        return ""
+
+    monkeypatch.setitem(ai_jobs.JOB_TYPES, "summary", ai_jobs.JOB_TYPES["summary"]._replace(inputs=no_text, generate=generate))
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [_paper(client, auth)]}, headers=auth).json()
+    job = _wait(client, auth, submitted["job_id"])
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+    assert job["error"] == "None of the papers have text content"
+    assert calls == []
+
+    async def cached():
+        async with AsyncSessionLocal() as db:
+            return await lookup_analysis(db, analysis_cache_key("summary", {"texts": [], "titles": []}), record=False)
+
+    assert client.portal.call(cached) is None
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import uuid
+from typing import List
+
+import pytest
+
+from api.ai_tools import _job_events
+from services.llm_client import get_llm_client
+
+TOKENS = ["The ", "papers ", "agree ", "on ", "attention."]
+
+
+class FakeStreamingProvider:
+    """Streams TOKENS one by one. With a gate, everything after the first
+    token waits until the test opens it."""
+
+    name = "fake"
+
+    def __init__(self, gated: bool):
+        self.model = f"fake-stream-{uuid.uuid4().hex[:8]}"  # fresh analysis cache keys
+        self.gated = gated
+        self.gate = None
+        self.finished = False
+
+    async def complete(self, messages, temperature, max_tokens, on_token):
+        self.gate = self.gate or asyncio.Event()
+        for index, token in enumerate(TOKENS):
+            if on_token:
+                on_token(token)
+            if index == 0 and self.gated:
+                await self.gate.wait()
+            await asyncio.sleep(0)
+        self.finished = True
+        return "".join(TOKENS)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def provider(request, monkeypatch):
+    fake = FakeStreamingProvider(gated=getattr(request, "param", False))
+    monkeypatch.setattr(get_llm_client(), "provider", fake)
+    return fake
+
+
+def _papers(client, auth) -> List[int]:
+    return [client.post("/api/papers/", json={
+        "title": f"Paper {i}",
+        "authors": ["A. Author"],
+        "abstract": f"Attention mechanisms, take {i}."
+    }, headers=auth).json()["id"] for i in range(2)]
+
+
+def _events(body: str):
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        yield lines["event"], json.loads(lines["data"])
+
+
+def test_stream_sends_tokens_then_done(client, auth, provider):
+    response = client.post(
+        "/api/ai-tools/literature-review", params={"stream": "true"},
+        json={"paper_ids": _papers(client, auth)}, headers=auth
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = list(_events(response.text))
+    assert [event for event, _ in events] == ["token"] * len(TOKENS) + ["done"]
+    assert "".join(data["text"] for _, data in events[:-1]) == "".join(TOKENS)
+
+    analysis_id = events[-1][1]["analysis_id"]
+    analysis = client.get(f"/api/ai-tools/analyses/{analysis_id}", headers=auth).json()
+    assert analysis["content"] == "".join(TOKENS)
+
+
+@pytest.mark.parametrize("provider", [True], indirect=True)
+def test_first_token_arrives_before_generation_finishes(client, auth, provider):
+    job = client.post("/api/ai-tools/literature-review", json={"paper_ids": _papers(client, auth)}, headers=auth).json()
+
+    async def consume():
+        received = []
+        async for event in _job_events(job["job_id"]):
+            received.append((event, provider.finished))
+            if len(received) == 1:
+                provider.gate.set()
+        return received
+
+    received = client.portal.call(asyncio.wait_for, consume(), 30)
+    first_event, finished_then = received[0]
+    assert first_event.startswith("event: token")
+    assert json.loads(first_event.split("data: ", 1)[1]) == {"text": TOKENS[0]}
+    assert finished_then is False
+    assert received[-1][0].startswith("event: done")
+
+
+def test_summary_streams_the_map_step(client, auth, provider):
+    response = client.post(
+        "/api/ai-tools/summaries", params={"stream": "true"},
+        json={"paper_ids": _papers(client, auth)}, headers=auth
+    )
+    events = list(_events(response.text))
+    assert events[-1][0] == "done"
+    tokens = [data["text"] for event, data in events[:-1]]
+    assert {event for event, _ in events[:-1]} == {"token"}
+    # Per-paper summaries are forwarded as they stream, not one piece each.
+    assert TOKENS[0].strip() in tokens and len(tokens) > 2 * len(TOKENS)
+
+    analysis = client.get(f"/api/ai-tools/analyses/{events[-1][1]['analysis_id']}", headers=auth).json()
+    assert analysis["content"] == "".join(tokens)
+    assert analysis["content"] == (
+        "**Paper 1: Paper 0**\nThe papers agree on attention."
+        "\n\n**Paper 2: Paper 1**\nThe papers agree on attention."
+    )
+
+
+def test_insights_send_each_paper_summary_as_a_section(client, auth, provider):
+    response = client.post(
+        "/api/ai-tools/insights", params={"stream": "true"},
+        json={"paper_ids": _papers(client, auth)}, headers=auth
+    )
+    events = list(_events(response.text))
+    assert [event for event, _ in events] == ["section"] * 2 + ["token"] * len(TOKENS) + ["done"]
+    sections = sorted((data for _, data in events[:2]), key=lambda data: data["index"])
+    assert [(data["title"], data["text"]) for data in sections] == [
+        ("Paper 0", "".join(TOKENS)), ("Paper 1", "".join(TOKENS))
+    ]
+
+    analysis = client.get(f"/api/ai-tools/analyses/{events[-1][1]['analysis_id']}", headers=auth).json()
+    assert analysis["content"] == "".join(TOKENS)
@@ -0,0 +1,74 @@
+import os
+import uuid
+
+from sqlalchemy import select
+
+from conftest import make_pdf, register, upload_pdf, wait_for_extraction
+from database import AsyncSessionLocal
+from models.blob import PaperBlob
+from models.paper import Paper
+
+
+def _rows(client, paper_ids):
+    async def load():
+        async with AsyncSessionLocal() as db:
+            papers = (await db.execute(select(Paper).where(Paper.id.in_(paper_ids)))).scalars().all()
+            blob_ids = {paper.blob_id for paper in papers}
+            blobs = (await db.execute(select(PaperBlob).where(PaperBlob.id.in_(blob_ids)))).scalars().all()
+            return papers, blobs
+
+    return client.portal.call(load)
+
+
+def test_shared_pdf_text_is_stored_once_on_the_blob(client, auth):
+    word = f"zyx{uuid.uuid4().hex[:8]}"
+    content = make_pdf(f"Introduction\nSparse attention with {word} kernels.")
+    other = register(client)
+    first = upload_pdf(client, auth, content)
+    assert wait_for_extraction(client, auth, first["id"])["extraction_status"] == "completed"
+    second = upload_pdf(client, other, content)
+    assert wait_for_extraction(client, other, second["id"])["extraction_status"] == "completed"
+
+    papers, blobs = _rows(client, [first["id"], second["id"]])
+    assert len(blobs) == 1 and word in blobs[0].extracted_text
+    assert [paper.extracted_text for paper in papers] == [None, None]
+
+    # Readers get the text through the blob.
+    for paper, headers in ((first, auth), (second, other)):
+        assert word in client.get(f"/api/papers/{paper['id']}", headers=headers).json()["extracted_text"]
+        hits = client.get("/api/papers/search", params={"q": word}, headers=headers).json()
+        assert [hit["id"] for hit in hits] == [paper["id"]]
+
+
+def _blob(client, sha256):
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(PaperBlob).where(PaperBlob.sha256 == sha256))
+
+    return client.portal.call(load)
+
+
+def test_blob_is_counted_per_paper_and_removed_with_the_last(client, auth):
+    content = make_pdf(f"Reference counting {uuid.uuid4().hex}")
+    other = register(client)
+    uploads = [(upload_pdf(client, auth, content), auth), (upload_pdf(client, auth, content), auth),
+               (upload_pdf(client, other, content), other)]
+    for paper, headers in uploads:
+        assert wait_for_extraction(client, headers, paper["id"])["extraction_status"] == "completed"
+
+    papers, _ = _rows(client, [paper["id"] for paper, _ in uploads])
+    assert len({paper.blob_id for paper in papers}) == 1
+    sha256 = papers[0].content_hash
+    blob = _blob(client, sha256)
+    assert blob.ref_count == 3
+    assert {paper["file_path"] for paper, _ in uploads} == {blob.file_path}
+
+    for expected, (paper, headers) in zip((2, 1), uploads):
+        assert client.delete(f"/api/papers/{paper['id']}", headers=headers).status_code == 200
+        assert _blob(client, sha256).ref_count == expected
+        assert os.path.exists(blob.file_path)
+
+    paper, headers = uploads[2]
+    assert client.delete(f"/api/papers/{paper['id']}", headers=headers).status_code == 200
+    assert _blob(client, sha256) is None
+    assert not os.path.exists(blob.file_path)
@@ -0,0 +1,52 @@
+import uuid
+
+from conftest import register
+from services.fulltext import _MARK_START, _MARK_STOP, _snippet_html
+
+
+def _paper(client, auth, title: str, abstract: str) -> int:
+    response = client.post("/api/papers/", json={"title": title, "abstract": abstract}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _search(client, auth, q: str, **params):
+    response = client.get("/api/papers/search", params={"q": q, **params}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_title_matches_rank_above_abstract_matches(client, auth):
+    word = f"zyx{uuid.uuid4().hex[:8]}"
+    in_abstract = _paper(client, auth, "Graph neural networks", f"We compare against {word} baselines.")
+    in_title = _paper(client, auth, f"The {word} method", "A study of convergence.")
+    _paper(client, auth, "Unrelated work", "Nothing to see here.")
+    _paper(client, register(client), f"Someone else's {word}", f"Also about {word}.")
+
+    hits = _search(client, auth, word)
+    assert [hit["id"] for hit in hits] == [in_title, in_abstract]
+    assert hits[0]["rank"] > hits[1]["rank"]
+
+    assert [hit["id"] for hit in _search(client, auth, word, limit=1, offset=1)] == [in_abstract]
+
+
+def test_snippets_escape_paper_text_and_mark_matches(client, auth):
+    word = f"zyx{uuid.uuid4().hex[:8]}"
+    _paper(client, auth, "Injected markup", f'Uses <script>alert("x")</script> & {word} tags.')
+
+    snippet = _search(client, auth, word)[0]["snippet"]
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert f"<b>{word}</b>" in snippet
+
+
+def test_query_syntax_in_user_input_is_searched_as_text(client, auth):
+    word = f"zyx{uuid.uuid4().hex[:8]}"
+    paper_id = _paper(client, auth, f"Quoted {word}", "Abstract.")
+    assert [hit["id"] for hit in _search(client, auth, f'{word}" (*')] == [paper_id]
+    assert _search(client, auth, '"(*)"') == []
+
+
+def test_snippet_html():
+    assert _snippet_html(None) is None
+    assert _snippet_html(f"a < b {_MARK_START}match{_MARK_STOP} & c") == "a &lt; b <b>match</b> &amp; c"
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services.llm_client import LLMClient, LLMError, get_llm_client
+
+
+class HangingProvider:
+    name = "hanging"
+    model = "hanging"
+
+    def __init__(self):
+        self.started = 0
+
+    async def complete(self, messages, temperature, max_tokens, on_token):
+        self.started += 1
+        await asyncio.sleep(3600)
+
+    async def close(self):
+        pass
+
+
+class FailingProvider(HangingProvider):
+    async def complete(self, messages, temperature, max_tokens, on_token):
+        raise ValueError("unexpected payload")
+
+
+def _client(provider) -> LLMClient:
+    client = LLMClient(provider)
+    client.limiter.limit = 4.0
+    return client
+
+
+def test_cancelled_calls_release_their_slots():
+    async def scenario():
+        provider = HangingProvider()
+        client = _client(provider)
+        calls = [asyncio.create_task(client.complete("s", "p", 0.0, 10)) for _ in range(4)]
+        while provider.started < 4:
+            await asyncio.sleep(0)
+        assert client.limiter.in_flight == 4
+
+        for call in calls:
+            call.cancel()
+        await asyncio.gather(*calls, return_exceptions=True)
+        assert client.limiter.in_flight == 0
+        # No latency signal from a cancelled call: the limit is unchanged.
+        assert client.limiter.limit == 4.0
+
+        # The freed slots are usable again.
+        again = asyncio.create_task(client.complete("s", "p", 0.0, 10))
+        while provider.started < 5:
+            await asyncio.sleep(0)
+        again.cancel()
+        await asyncio.gather(again, return_exceptions=True)
+        assert client.limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_unexpected_errors_release_their_slots():
+    async def scenario():
+        client = _client(FailingProvider())
+        with pytest.raises(ValueError):
+            await client.complete("s", "p", 0.0, 10)
+        assert client.limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_non_retryable_llm_error_is_raised_after_release():
+    class Rejecting(HangingProvider):
+        async def complete(self, messages, temperature, max_tokens, on_token):
+            raise LLMError("bad request", retryable=False)
+
+    async def scenario():
+        client = _client(Rejecting())
+        with pytest.raises(LLMError):
+            await client.complete("s", "p", 0.0, 10)
+        assert client.limiter.in_flight == 0
+        assert client.stats.errors == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def unconfigured(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "")
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+
+
+def test_stub_is_never_the_implicit_default(unconfigured):
+    with pytest.raises(LLMError, match="No LLM provider configured"):
+        get_llm_client()
+
+
+def test_unknown_provider_is_an_error():
+    with pytest.raises(LLMError, match="Unknown LLM provider"):
+        get_llm_client("gorq")
+
+
+def test_job_fails_when_no_provider_is_configured(client, auth, unconfigured):
+    paper = client.post("/api/papers/", json={"title": "Unconfigured", "abstract": "Some text."}, headers=auth).json()
+    submitted = client.post("/api/ai-tools/summaries", json={"paper_ids": [paper["id"]]}, headers=auth).json()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/ai-tools/jobs/{submitted['job_id']}", headers=auth).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+    assert "No LLM provider configured" in job["error"]
@@ -0,0 +1,61 @@
+import uuid
+
+from conftest import register
+
+
+def _item(doi, title, **fields):
+    return {"title": title, "authors": ["A. Author"], "abstract": "An abstract.", "doi": doi, **fields}
+
+
+def _import(client, auth, papers, **body):
+    response = client.post("/api/search/import/bulk", json={"papers": papers, **body}, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _library(client, auth):
+    return {paper["id"]: paper for paper in client.get("/api/papers/", headers=auth).json()}
+
+
+def test_reimport_updates_the_owners_paper(client, auth):
+    doi = f"10.1234/{uuid.uuid4().hex}"
+    first = _import(client, auth, [_item(doi, "Draft title", citations=1), _item(None, "No DOI")])
+    assert (first["created"], first["updated"]) == (2, 0)
+
+    again = _import(client, auth, [_item(doi, "Final title", citations=7), _item(None, "No DOI")])
+    assert (again["created"], again["updated"]) == (1, 1)
+    assert again["paper_ids"][0] == first["paper_ids"][0]
+
+    library = _library(client, auth)
+    assert len(library) == 3
+    paper = library[first["paper_ids"][0]]
+    assert (paper["title"], paper["citation_count"]) == ("Final title", 7)
+
+
+def test_same_doi_is_a_separate_paper_per_owner(client, auth):
+    doi = f"10.1234/{uuid.uuid4().hex}"
+    other = register(client)
+    mine = _import(client, auth, [_item(doi, "My copy")])
+    theirs = _import(client, other, [_item(doi, "Their copy")])
+    assert theirs["created"] == 1
+    assert theirs["paper_ids"] != mine["paper_ids"]
+
+    assert [paper["title"] for paper in _library(client, auth).values()] == ["My copy"]
+    assert [paper["title"] for paper in _library(client, other).values()] == ["Their copy"]
+
+
+def test_duplicate_dois_in_one_batch_are_one_paper(client, auth):
+    doi = f"10.1234/{uuid.uuid4().hex}"
+    result = _import(client, auth, [_item(doi, "First"), _item(doi, "Second")])
+    assert result["created"] == 1
+    assert result["paper_ids"][0] == result["paper_ids"][1]
+    assert [paper["title"] for paper in _library(client, auth).values()] == ["Second"]
+
+
+def test_reimport_into_a_workspace_links_once(client, auth):
+    workspace = client.post("/api/workspaces/", json={"name": "Reading"}, headers=auth).json()
+    doi = f"10.1234/{uuid.uuid4().hex}"
+    for _ in range(2):
+        result = _import(client, auth, [_item(doi, "Linked")], workspace_id=workspace["id"])
+    papers = client.get("/api/papers/", params={"workspace_id": workspace["id"]}, headers=auth).json()
+    assert [paper["id"] for paper in papers] == result["paper_ids"]
@@ -0,0 +1,103 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import settings
+from services import pdf_fetch
+from services.pdf_fetch import FetchError, fetch_pdf
+
+PDF = b"%PDF-1.4\n" + b"0" * 4096 + b"\n%%EOF\n"
+
+
+class StubPDFHandler(BaseHTTPRequestHandler):
+    """Serves a PDF at /paper.pdf; /redirect?to=URL answers with a 302."""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.path == "/paper.pdf":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(PDF)))
+            self.end_headers()
+            self.wfile.write(PDF)
+        elif self.path.startswith("/redirect?to="):
+            self.send_response(302)
+            self.send_header("Location", self.path.split("=", 1)[1])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPDFHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_fetches(monkeypatch):
+    monkeypatch.setattr(pdf_fetch, "_hosts", {})
+    monkeypatch.setattr(settings, "PDF_FETCH_HOST_INTERVAL", 0.0)
+    monkeypatch.setattr(settings, "PDF_FETCH_MAX_RETRIES", 0)
+
+
+def _fetch(client, url: str):
+    return client.portal.call(fetch_pdf, url)
+
+
+def _base(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_private_hosts_are_refused(client, stub_server):
+    with pytest.raises(FetchError, match="not a public host"):
+        _fetch(client, f"{_base(stub_server)}/paper.pdf")
+    assert stub_server.requests == []
+
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://example.com/paper.pdf", "not a url"])
+def test_only_http_urls_are_fetched(client, url):
+    with pytest.raises(FetchError):
+        _fetch(client, url)
+
+
+def test_allowed_host_is_fetched_through_redirects(client, stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_FETCH_PRIVATE_HOSTS", ["127.0.0.1"])
+    stored = _fetch(client, f"{_base(stub_server)}/redirect?to=/paper.pdf")
+    try:
+        assert stored.size == len(PDF)
+        with open(stored.path, "rb") as f:
+            assert f.read() == PDF
+    finally:
+        os.remove(stored.path)
+    assert stub_server.requests == ["/redirect?to=/paper.pdf", "/paper.pdf"]
+
+
+def test_every_redirect_hop_is_checked(client, stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_FETCH_PRIVATE_HOSTS", ["127.0.0.1"])
+    internal = f"http://localhost:{stub_server.server_address[1]}/paper.pdf"
+    with pytest.raises(FetchError, match="localhost is not a public host"):
+        _fetch(client, f"{_base(stub_server)}/redirect?to={internal}")
+    assert stub_server.requests == [f"/redirect?to={internal}"]
+
+
+def test_redirect_loops_are_cut_off(client, stub_server, monkeypatch):
+    monkeypatch.setattr(settings, "PDF_FETCH_PRIVATE_HOSTS", ["127.0.0.1"])
+    monkeypatch.setattr(settings, "PDF_FETCH_MAX_REDIRECTS", 2)
+    loop = "/redirect?to=/redirect?to=/redirect?to=/redirect?to=/paper.pdf"
+    with pytest.raises(FetchError, match="Too many redirects"):
+        _fetch(client, f"{_base(stub_server)}{loop}")
+    assert len(stub_server.requests) == 3
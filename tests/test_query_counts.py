@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from conftest import register
+from database import async_engine
+from services.ingestion import pending_jobs
+from utils.query_counter import count_queries
+
+
+def _populate(client, auth, workspaces: int, papers_per_workspace: int):
+    for w in range(workspaces):
+        workspace = client.post("/api/workspaces/", json={"name": f"W{w}"}, headers=auth).json()
+        for p in range(papers_per_workspace):
+            response = client.post("/api/papers/", json={
+                "title": f"Paper {w}-{p}",
+                "abstract": "A study of things.",
+                "workspace_ids": [workspace["id"]]
+            }, headers=auth)
+            assert response.status_code == 200, response.text
+
+
+def _count(client, auth, path: str) -> int:
+    # New papers are embedded in the background on the same engine.
+    deadline = time.monotonic() + 30
+    while pending_jobs() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # First call warms the user cache so both sizes are measured alike.
+    client.get(path, headers=auth)
+    with count_queries(async_engine) as counter:
+        response = client.get(path, headers=auth)
+    assert response.status_code == 200, response.text
+    return counter.count
+
+
+@pytest.mark.parametrize("path", ["/api/dashboard", "/api/workspaces/", "/api/papers/"])
+def test_list_endpoints_use_constant_queries(client, auth, path):
+    _populate(client, auth, workspaces=1, papers_per_workspace=1)
+    small = _count(client, auth, path)
+
+    _populate(client, auth, workspaces=6, papers_per_workspace=4)
+    large = _count(client, auth, path)
+
+    assert large == small
+    assert large <= 4
+
+
+def test_workspace_paper_counts_only_see_own_links(client, auth):
+    _populate(client, auth, workspaces=2, papers_per_workspace=3)
+    # Another user's links in the same table must not affect the counts.
+    _populate(client, register(client), workspaces=2, papers_per_workspace=5)
+
+    dashboard = client.get("/api/dashboard", headers=auth).json()
+    assert [ws["papers"] for ws in dashboard["workspaces"]] == [3, 3]
+    assert dashboard["stats"]["total_papers"] == 6
+
+    workspaces = client.get("/api/workspaces/", headers=auth).json()
+    assert sorted(ws["papers_count"] for ws in workspaces) == [3, 3]
+    detail = client.get(f"/api/workspaces/{workspaces[0]['id']}", headers=auth).json()
+    assert detail["papers_count"] == 3
@@ -0,0 +1,29 @@
+import time
+import uuid
+
+from conftest import make_pdf, upload_pdf, wait_for_extraction
+from services import embeddings
+
+
+def test_related_papers_rank_by_shared_text_without_loading_the_embedder(client, auth):
+    word = f"zyx{uuid.uuid4().hex[:8]}"
+    texts = [
+        f"Sparse attention kernels for {word} transformers on long documents.",
+        f"Long document transformers with sparse attention and {word} kernels.",
+        "Soil moisture estimation from satellite radar over farmland.",
+    ]
+    papers = [upload_pdf(client, auth, make_pdf(text), f"{i}.pdf") for i, text in enumerate(texts)]
+    for paper in papers:
+        assert wait_for_extraction(client, auth, paper["id"])["extraction_status"] == "completed"
+
+    # Embeddings are written after extraction completes.
+    deadline = time.monotonic() + 60
+    while True:
+        related = client.get(f"/api/papers/{papers[0]['id']}/related", headers=auth).json()
+        if len(related) == 2 or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert [match["id"] for match in related] == [papers[1]["id"], papers[2]["id"]]
+    assert related[0]["score"] > related[1]["score"]
+    # Embedding happens in the ingestion workers only.
+    assert embeddings._embedder is None
@@ -0,0 +1,110 @@
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import main  # noqa: F401  registers every model on Base.metadata
+from models import Base
+from models.paper import Paper
+from services.schema_upgrade import upgrade_schema
+
+# The users and papers tables as the first release created them.
+BASELINE_PAPERS = [
+    """CREATE TABLE users (
+        id INTEGER NOT NULL,
+        email VARCHAR NOT NULL,
+        username VARCHAR NOT NULL,
+        full_name VARCHAR,
+        hashed_password VARCHAR NOT NULL,
+        is_active BOOLEAN,
+        created_at DATETIME,
+        updated_at DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE papers (
+        id INTEGER NOT NULL,
+        title VARCHAR NOT NULL,
+        authors JSON,
+        abstract TEXT,
+        source VARCHAR,
+        source_url VARCHAR,
+        pdf_url VARCHAR,
+        doi VARCHAR,
+        publication_date DATETIME,
+        citation_count INTEGER,
+        tags JSON,
+        file_path VARCHAR,
+        extracted_text TEXT,
+        file_size INTEGER,
+        owner_id INTEGER NOT NULL,
+        is_public BOOLEAN,
+        created_at DATETIME,
+        updated_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(owner_id) REFERENCES users (id)
+    )""",
+    "CREATE INDEX ix_papers_id ON papers (id)",
+    "CREATE UNIQUE INDEX ix_papers_doi ON papers (doi)",
+]
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for statement in BASELINE_PAPERS:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO users (id, email, username, hashed_password) VALUES (1, 'a', 'a', 'x'), (2, 'b', 'b', 'x')"
+        ))
+        conn.execute(text(
+            "INSERT INTO papers (title, doi, owner_id, extracted_text) VALUES ('Old', '10.1/x', 1, 'Old text')"
+        ))
+    yield engine
+    engine.dispose()
+
+
+def _upgrade(engine):
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(engine)
+
+
+def test_doi_becomes_unique_per_owner(baseline):
+    _upgrade(baseline)
+    _upgrade(baseline)  # reruns are no-ops
+
+    with baseline.begin() as conn:
+        conn.execute(text("INSERT INTO papers (title, doi, owner_id) VALUES ('Same DOI', '10.1/x', 2)"))
+        # The import upsert's conflict target now exists.
+        conn.execute(text(
+            "INSERT INTO papers (title, doi, owner_id) VALUES ('Renamed', '10.1/x', 1) "
+            "ON CONFLICT (owner_id, doi) DO UPDATE SET title = excluded.title"
+        ))
+        titles = conn.execute(text("SELECT owner_id, title FROM papers ORDER BY owner_id")).all()
+    assert titles == [(1, "Renamed"), (2, "Same DOI")]
+
+    with pytest.raises(IntegrityError):
+        with baseline.begin() as conn:
+            conn.execute(text("INSERT INTO papers (title, doi, owner_id) VALUES ('Duplicate', '10.1/x', 2)"))
+
+
+def test_papers_gain_columns_added_since(baseline):
+    _upgrade(baseline)
+    _upgrade(baseline)
+
+    with Session(baseline) as db:
+        paper = db.scalars(select(Paper)).one()
+        assert (paper.extraction_status, paper.blob_id, paper.content_hash) == ("completed", None, None)
+    indexes = {index["name"] for index in inspect(baseline).get_indexes("papers")}
+    assert {"ix_papers_blob_id", "ix_papers_content_hash", "ix_papers_extraction_status", "ix_papers_owner_id_id"} <= indexes
+    workspace_indexes = {index["name"] for index in inspect(baseline).get_indexes("workspace_papers")}
+    assert {"ix_workspace_papers_paper_id", "ix_workspace_papers_workspace_id"} <= workspace_indexes
+
+
+def test_current_schema_is_left_alone(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'current.db'}")
+    Base.metadata.create_all(bind=engine)
+    before = sorted(index["name"] for index in inspect(engine).get_indexes("papers"))
+    upgrade_schema(engine)
+    assert sorted(index["name"] for index in inspect(engine).get_indexes("papers")) == before
+    engine.dispose()
@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from schemas.paper import PaperSearchParams
+from services import search_service
+from services.search_service import Source, cached_search
+from utils import cache
+from utils.cache import SingleFlight, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the cache's clock moves; the event loop keeps real time.
+    now = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _source(calls, delay=0.0):
+    async def entries(params, start, rows, page):
+        calls.append(start)
+        await asyncio.sleep(delay)
+        yield {"title": f"{params.query} result", "authors": [], "abstract": "", "source": "arXiv",
+               "url": f"http://arxiv.org/abs/{params.query}", "pdf_url": "", "date": "2024-01-01",
+               "citations": 0, "tags": []}
+
+    return Source(entries, 0)
+
+
+async def _drain_background():
+    while search_service._tasks:
+        await asyncio.gather(*search_service._tasks, return_exceptions=True)
+
+
+def test_concurrent_identical_searches_reach_upstream_once(client):
+    calls = []
+    source = _source(calls, delay=0.2)
+    params = PaperSearchParams(query=uuid.uuid4().hex, source="arXiv", max_results=5)
+
+    async def burst():
+        before = search_service.search_flight.coalesced
+        pages = await asyncio.gather(*(cached_search("arXiv", source, params, 0, 5) for _ in range(10)))
+        return pages, search_service.search_flight.coalesced - before
+
+    pages, coalesced = client.portal.call(burst)
+    client.portal.call(_drain_background)
+    assert calls == [0]
+    assert coalesced == 9
+    assert all(page == pages[0] for page in pages)
+    assert search_service.search_flight.inflight == 0
+
+    # Later calls are answered from the cache.
+    client.portal.call(cached_search, "arXiv", source, params, 0, 5)
+    assert calls == [0]
+
+
+def test_a_caller_giving_up_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "page"
+
+    async def run():
+        impatient = asyncio.ensure_future(asyncio.wait_for(flight.do("k", fetch), timeout=0.01))
+        patient = asyncio.ensure_future(flight.do("k", fetch))
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        return await patient
+
+    assert asyncio.run(run()) == "page"
+    assert calls == [1] and flight.inflight == 0
+
+
+def test_entries_expire_after_their_ttl(clock):
+    store = TTLCache(max_entries=10, ttl=60)
+
+    async def run():
+        await store.set("a", 1)
+        await store.set("b", 2, ttl=600)
+        clock[0] += 59
+        assert await store.get("a") == 1
+        clock[0] += 2
+        assert await store.get("a") is None
+        assert await store.get("b") == 2
+
+    asyncio.run(run())
+    assert store.stats.expirations == 1
+    assert (store.stats.hits, store.stats.misses) == (2, 1)
+    assert store.info()["size"] == 1
+
+
+def test_expired_search_pages_are_fetched_again(client, clock):
+    calls = []
+    source = _source(calls)
+    params = PaperSearchParams(query=uuid.uuid4().hex, source="arXiv", max_results=5)
+
+    client.portal.call(cached_search, "arXiv", source, params, 0, 5)
+    clock[0] += search_service.search_cache.ttl - 1
+    client.portal.call(cached_search, "arXiv", source, params, 0, 5)
+    assert calls == [0]
+
+    clock[0] += 2
+    client.portal.call(cached_search, "arXiv", source, params, 0, 5)
+    client.portal.call(_drain_background)
+    assert calls == [0, 0]
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models.catalog import CatalogEntry
+from schemas.paper import PaperSearchParams
+from services import search_service
+from services.catalog import record_results
+from services.search_service import Source, SourcePage, search_all_sources, stream_all_sources
+
+PAGE_SIZE = 5
+
+
+def _upstream(word: str, count: int):
+    return [{
+        "title": f"Quantum {word} study number {i}",
+        "authors": ["A. Author"],
+        "abstract": f"On {word}.",
+        "source": "arXiv",
+        "url": f"http://arxiv.org/abs/{word}.{i:04d}",
+        "pdf_url": "",
+        "date": "2024-01-01",
+        "citations": 0,
+        "tags": ["arXiv"]
+    } for i in range(count)]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # A unique word keeps this test's catalog rows and cache keys apart.
+    word = uuid.uuid4().hex[:10]
+    results = _upstream(word, 3 * PAGE_SIZE)
+    withheld = set()  # indexes left off a short first page
+
+    async def entries(params, start, rows, page):
+        for index in range(start, min(start + rows, len(results))):
+            if start > 0 or index not in withheld:
+                yield dict(results[index])
+        if start + rows < len(results):
+            page.next = start + rows
+
+    monkeypatch.setitem(search_service.SOURCES, "arXiv", Source(entries, 0))
+    return word, results, withheld
+
+
+async def _drain_background():
+    while search_service._tasks:
+        await asyncio.gather(*search_service._tasks, return_exceptions=True)
+
+
+async def _search(params, state, stream: bool):
+    if not stream:
+        return await search_all_sources(params, state)
+    page = SourcePage()
+    results = [result async for result in stream_all_sources(params, state, page)]
+    return results, page.next
+
+
+def _all_pages(client, params, stream: bool):
+    seen, state, pages = [], None, 0
+    while True:
+        page, state = client.portal.call(_search, params, state, stream)
+        client.portal.call(_drain_background)
+        seen.extend(result["title"] for result in page)
+        pages += 1
+        if not state:
+            return seen, pages
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_pages_after_a_catalog_page_do_not_repeat_it(client, upstream, stream):
+    word, results, _ = upstream
+    # The catalog already knows the first two upstream pages.
+    client.portal.call(record_results, "arXiv", results[:2 * PAGE_SIZE])
+
+    params = PaperSearchParams(query=word, source="arXiv", max_results=PAGE_SIZE)
+    seen, pages = _all_pages(client, params, stream)
+    assert pages > 1
+    assert len(seen) == len(set(seen))
+    assert set(seen) == {result["title"] for result in results}
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_catalog_results_filling_a_short_page_are_not_repeated(client, upstream, stream):
+    word, results, withheld = upstream
+    # Upstream's first page comes back short; the one catalog match, which
+    # upstream only returns on its second page, fills the gap.
+    withheld.update({0, 1})
+    client.portal.call(record_results, "arXiv", [results[PAGE_SIZE]])
+
+    params = PaperSearchParams(query=word, source="arXiv", max_results=PAGE_SIZE)
+    seen, _ = _all_pages(client, params, stream)
+    assert results[PAGE_SIZE]["title"] in seen[:PAGE_SIZE]
+    assert len(seen) == len(set(seen))
+    assert set(seen) == {result["title"] for result in results[2:]}
+
+
+def test_imports_stay_out_of_the_shared_catalog(client, auth, upstream):
+    word, results, _ = upstream
+    imported = {**results[0], "doi": f"10.1234/{word}"}
+    response = client.post("/api/search/import/bulk", json={"papers": [imported]}, headers=auth)
+    assert response.status_code == 200, response.text
+
+    async def rows():
+        async with AsyncSessionLocal() as db:
+            return (await db.execute(
+                select(CatalogEntry.key).where(CatalogEntry.search_text.contains(word))
+            )).scalars().all()
+
+    assert client.portal.call(rows) == []
@@ -0,0 +1,73 @@
+from services.search_ranking import ResultIndex, identity_keys, merge_results, rank_results
+
+
+def _result(title, **fields):
+    return {"title": title, "authors": [], "abstract": "", "url": "", "pdf_url": "", "citations": 0, "tags": [], **fields}
+
+
+def test_identity_keys_normalize_doi_and_arxiv_links():
+    crossref = _result("Attention Is All You Need", doi="10.48550/arXiv.1706.03762")
+    arxiv = _result("Attention is all you need.", url="http://arxiv.org/abs/1706.03762v5")
+    assert identity_keys(crossref) == [
+        "doi:10.48550/arxiv.1706.03762", "arxiv:1706.03762", "title:attention is all you need"
+    ]
+    assert identity_keys(arxiv) == ["arxiv:1706.03762", "title:attention is all you need"]
+    assert identity_keys(_result("Short title")) == []
+
+
+def test_duplicates_by_doi_arxiv_id_or_title_merge_into_the_first():
+    results = [
+        _result("Deep residual learning", url="https://doi.org/10.1109/CVPR.2016.90", citations=10, tags=["Crossref"]),
+        _result("Deep Residual Learning for Image Recognition", doi="10.1109/cvpr.2016.90", citations=50,
+                abstract="A longer abstract about residual networks.", tags=["cs.CV"]),
+        _result("Attention Is All You Need", url="http://arxiv.org/abs/1706.03762v1", tags=["arXiv"]),
+        _result("Attention is all you need", doi="10.5555/3295222", pdf_url="http://example.org/a.pdf"),
+        _result("Some other paper entirely", pdf_url="http://arxiv.org/pdf/1706.03762v2.pdf"),
+        _result("An unrelated paper title"),
+    ]
+    merged = merge_results(results)
+    assert [r["title"] for r in merged] == [
+        "Deep residual learning", "Attention Is All You Need", "An unrelated paper title"
+    ]
+    resnet, attention, _ = merged
+    assert resnet["citations"] == 50
+    assert resnet["abstract"] == "A longer abstract about residual networks."
+    assert resnet["tags"] == ["Crossref", "cs.CV"]
+    assert (attention["doi"], attention["pdf_url"]) == ("10.5555/3295222", "http://example.org/a.pdf")
+    # Inputs are left as they were.
+    assert results[0]["citations"] == 10
+
+
+def test_result_index_reports_new_results():
+    index = ResultIndex()
+    assert index.add(_result("Graph attention networks explained"))
+    assert not index.add(_result("Graph Attention Networks, explained"))
+    assert len(index.results) == 1
+
+
+def test_title_matches_outrank_abstract_matches():
+    results = [
+        _result("A survey of reinforcement learning", abstract="We review transformers briefly here."),
+        _result("Efficient transformers for long inputs", abstract="Sparse attention over documents."),
+        _result("Protein folding", abstract="No relevant terms."),
+        _result("Vision transformers for image patches", abstract="Transformers applied to image grids."),
+    ]
+    ranked = rank_results(results, "the transformers")
+    assert [r["title"] for r in ranked] == [
+        "Vision transformers for image patches", "Efficient transformers for long inputs",
+        "A survey of reinforcement learning", "Protein folding",
+    ]
+    assert ranked[0]["score"] > ranked[1]["score"] > ranked[2]["score"] > ranked[3]["score"] == 0
+
+
+def test_rarer_terms_weigh_more_and_ties_keep_their_order():
+    results = [
+        _result("Learning with graphs", abstract="Graph learning.", url="first"),
+        _result("Learning with graphs", abstract="Graph learning.", url="second"),
+        _result("Learning quantum circuits", abstract="Quantum learning.", url="third"),
+    ]
+    ranked = rank_results(results, "quantum learning")
+    assert [r["url"] for r in ranked] == ["third", "first", "second"]
+    assert ranked[1]["score"] == ranked[2]["score"]
+    # Stopword-only queries leave the order untouched.
+    assert rank_results(results, "of the") is results
@@ -0,0 +1,80 @@
+import os
+import uuid
+
+import pytest
+
+from config import settings
+from conftest import make_pdf
+
+LIMIT = 4096
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", LIMIT)
+
+
+def _multipart(content: bytes, filename: str = "paper.pdf"):
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    return f"multipart/form-data; boundary={boundary}", head + content + f"\r\n--{boundary}--\r\n".encode()
+
+
+def _temp_files():
+    tmp_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+    return set(os.listdir(tmp_dir)) if os.path.isdir(tmp_dir) else set()
+
+
+def _paper_count(client, auth) -> int:
+    return len(client.get("/api/papers/", headers=auth).json())
+
+
+def test_oversized_content_length_is_rejected_before_reading(client, auth, small_limit):
+    content_type, body = _multipart(b"%PDF-1.4\n" + b"0" * (LIMIT + 128 * 1024))
+    response = client.post("/api/papers/upload", content=body, headers={**auth, "Content-Type": content_type})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large"
+    assert _paper_count(client, auth) == 0
+
+
+def test_oversized_chunked_upload_is_cut_off(client, auth, small_limit):
+    before = _temp_files()
+    content_type, body = _multipart(b"%PDF-1.4\n" + b"0" * (4 * LIMIT))
+
+    def chunks():
+        # No Content-Length: the body goes out with chunked transfer encoding.
+        for start in range(0, len(body), 1024):
+            yield body[start:start + 1024]
+
+    response = client.post("/api/papers/upload", content=chunks(), headers={**auth, "Content-Type": content_type})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File too large"
+    assert _paper_count(client, auth) == 0
+    assert _temp_files() == before
+
+
+def test_upload_within_the_limit_is_stored(client, auth, small_limit):
+    content = make_pdf(f"Small paper {uuid.uuid4().hex}")
+    assert len(content) < LIMIT
+    content_type, body = _multipart(content)
+
+    def chunks():
+        yield body[:100]
+        yield body[100:]
+
+    response = client.post("/api/papers/upload", content=chunks(), headers={**auth, "Content-Type": content_type})
+    assert response.status_code == 200, response.text
+    assert response.json()["file_size"] == len(content)
+
+
+def test_other_file_types_are_rejected(client, auth):
+    before = _temp_files()
+    content_type, body = _multipart(b"not a pdf", filename="notes.txt")
+    response = client.post("/api/papers/upload", content=body, headers={**auth, "Content-Type": content_type})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Only PDF files are allowed"
+    assert _temp_files() == before
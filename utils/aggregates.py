@@ -0,0 +1,46 @@
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import with_expression
+
+from models.analysis import Analysis
+from models.blob import PaperBlob
+from models.paper import Paper
+from models.workspace import Workspace, workspace_papers
+
+
+def paper_count():
+    # Correlated per workspace row, so the count only touches the links of
+    # the workspaces being returned (workspace_papers.workspace_id index).
+    return select(func.count(workspace_papers.c.paper_id)).where(
+        workspace_papers.c.workspace_id == Workspace.id
+    ).correlate(Workspace).scalar_subquery()
+
+
+def with_paper_counts(stmt):
+    # Counted in the same query instead of loading each workspace's papers
+    # collection.
+    return stmt.options(with_expression(Workspace.papers_count, paper_count()))
+
+
+def with_analyzed_flag(stmt):
+    return stmt.options(
+        with_expression(Paper.analyzed, exists().where(Analysis.paper_id == Paper.id))
+    )
+
+
+def paper_text():
+    # The text of an uploaded or fetched PDF is stored once, on its blob;
+    # text on the paper row itself predates the blob store. Use with
+    # join_blob.
+    return func.coalesce(Paper.extracted_text, PaperBlob.extracted_text)
+
+
+def join_blob(stmt):
+    return stmt.outerjoin(PaperBlob, PaperBlob.id == Paper.blob_id)
+
+
+async def count_workspace_papers(db, workspace_id: int) -> int:
+    return await db.scalar(
+        select(func.count(workspace_papers.c.paper_id)).where(
+            workspace_papers.c.workspace_id == workspace_id
+        )
+    )
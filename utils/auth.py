@@ -1,14 +1,19 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Set
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
 from models.user import User
 from schemas.user import TokenData
-from database import get_db
+from database import get_db, get_read_db
+from utils.cache import TTLCache, build_cache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
@@ -19,6 +24,46 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the
+# event loop. Admission is bounded so a login storm is shed with 503s
+# instead of queueing every request behind it.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_pending = 0
+_hash_rejected = 0
+
+
+async def _run_hashing(fn, *args):
+    global _hash_pending, _hash_rejected
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        _hash_rejected += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+
+def password_hash_stats() -> dict:
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "pending": _hash_pending,
+        "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+        "rejected": _hash_rejected,
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -29,23 +74,95 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Authenticated users, keyed by token subject (email). Holds profile
+# columns only; the password hash is never cached.
+user_cache = build_cache(
+    namespace="users",
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL
+)
+
+# Verified JWTs -> subject, each kept until the token's own expiry. Always
+# in-process: re-verifying a signature is cheaper than a network hop.
+token_cache = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+_CACHED_USER_FIELDS = ("id", "email", "username", "full_name", "is_active", "created_at", "updated_at")
+_invalidations: Set[asyncio.Task] = set()
+
+
+def _user_to_cache(user: User) -> dict:
+    data = {field: getattr(user, field) for field in _CACHED_USER_FIELDS}
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+
+def _user_from_cache(data: dict) -> User:
+    data = dict(data)
+    for field in ("created_at", "updated_at"):
+        if data[field] is not None:
+            data[field] = datetime.fromisoformat(data[field])
+    return User(**data)
+
+
+def invalidate_user(email: str):
+    # Safe to call from sync code (ORM events): the delete is scheduled on
+    # the running loop.
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(user_cache.delete(email))
+    _invalidations.add(task)
+    task.add_done_callback(_invalidations.discard)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.email)
+    # An email change leaves the old subject cached as well.
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        invalidate_user(old_email)
+
+
+async def _token_subject(token: str) -> Optional[str]:
+    subject = await token_cache.get(token)
+    if subject is not None:
+        return subject
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    token_data = TokenData(username=payload.get("sub"))
+    if token_data.username is None:
+        return None
+
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        await token_cache.set(token, token_data.username, ttl=expires_in)
+    return token_data.username
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+    username = await _token_subject(token)
+    if username is None:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.email == token_data.username).first()
+
+    cached = await user_cache.get(username)
+    if cached is not None:
+        return _user_from_cache(cached)
+
+    result = await db.execute(select(User).where(User.email == username))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    await user_cache.set(username, _user_to_cache(user))
     return user
-
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import settings
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def clear(self):
+        self._data.clear()
+
+    async def close(self):
+        pass
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            **self.stats.as_dict()
+        }
+
+
+class RedisCache:
+    """JSON-serialized cache stored in Redis. Eviction is left to Redis
+    (key TTLs plus its maxmemory policy), so `evictions` stays at zero."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, namespace: str, ttl: float):
+        import redis.asyncio as aioredis
+
+        self.ttl = ttl
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._redis = aioredis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self._key(key))
+        except Exception as e:
+            print(f"Redis cache get failed: {e}")
+            self.stats.errors += 1
+            raw = None
+
+        if raw is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            await self._redis.set(self._key(key), json.dumps(value, default=str), ex=int(ttl or self.ttl))
+        except Exception as e:
+            print(f"Redis cache set failed: {e}")
+            self.stats.errors += 1
+
+    async def delete(self, key: str):
+        try:
+            await self._redis.delete(self._key(key))
+        except Exception as e:
+            print(f"Redis cache delete failed: {e}")
+            self.stats.errors += 1
+
+    async def clear(self):
+        try:
+            async for key in self._redis.scan_iter(match=f"{self.namespace}:*"):
+                await self._redis.delete(key)
+        except Exception as e:
+            print(f"Redis cache clear failed: {e}")
+            self.stats.errors += 1
+
+    async def close(self):
+        await self._redis.close()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "namespace": self.namespace,
+            "ttl": self.ttl,
+            **self.stats.as_dict()
+        }
+
+
+def build_cache(namespace: str, max_entries: int, ttl: float, backend: Optional[str] = None):
+    backend = backend or settings.CACHE_BACKEND
+    if backend == "redis":
+        return RedisCache(settings.REDIS_URL, namespace, ttl)
+    return TTLCache(max_entries, ttl)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The call runs as its own task, so a caller that gives up (timeout or
+    disconnect) does not cancel the work the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller has gone away.
+            task.exception()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,35 @@
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    """Counts SQL statements run on `engine` inside the block, e.g. to assert
+    that a listing endpoint stays at a constant number of queries:
+
+        with count_queries(async_engine) as counter:
+            client.get("/api/dashboard", headers=auth)
+        assert counter.count <= 5, counter.statements
+    """
+    # Async engines emit their events on the underlying sync engine.
+    engine = getattr(engine, "sync_engine", engine)
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)